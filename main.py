@@ -1,98 +1,290 @@
 import time
+# Referencia para medir el arranque en frío (antes de cualquier import pesado)
+PROCESS_STARTED_AT = time.perf_counter()
+
+import argparse
 import sys
 from datetime import datetime, timedelta
-from src.driver import get_driver
-from src.notifications import send_telegram_message
-from src.config import SEARCH_INTERVAL
-from src.listener import check_telegram_replies
+from src.notifications import outbox
+from src.config import SEARCH_ENGINE, SEARCH_WORKERS, JOB_SEARCH_URLS, SHARD_COUNT, SHARD_INDEX, SHARDED
+from src.history import history
+from src.metrics import metrics
+from src.profiling import cycle_profiler
+from src.scheduler import SearchScheduler
+from src.listener import check_telegram_replies, start_telegram_listener
 
-def main():
-    print("========================================")
-    print("🤖 LINKEDIN BOT - STARTING")
-    print("========================================")
+# Códigos de salida de 'python main.py --once' (para cron / timers de systemd)
+EXIT_OK = 0
+EXIT_CYCLE_ERROR = 1      # Excepción durante el ciclo
+EXIT_SESSION_LOST = 2     # Posible sesión cerrada o bloqueo (corrida abortada o casi sin ofertas)
+EXIT_BROWSER_ERROR = 3    # Chrome no pudo arrancar
+
+class CycleRunner:
+    """
+    Ejecuta UN ciclo de búsqueda sobre las URLs indicadas con el motor configurado
+    (Selenium, workers en paralelo o HTTP). Lo usan tanto el modo continuo como --once.
+
+    Selenium y Chrome se cargan recién cuando el ciclo los necesita: un --once sin URLs
+    pendientes termina sin importar Selenium ni tocar el historial.
+    """
 
-    # Notificación de inicio de servicio
-    send_telegram_message("🤖 <b>Buscando chamba por LinkedIn</b>")
+    def __init__(self):
+        self._driver_manager = None
+        self.worker_pool = None
+        self.url_reports = []
+        self.cold_start_reported = False
+
+    @property
+    def driver_manager(self):
+        # El navegador se mantiene vivo entre ciclos (chequeo de salud + reciclado preventivo)
+        if self._driver_manager is None:
+            from src.driver import DriverManager
+            self._driver_manager = DriverManager()
+        return self._driver_manager
+
+    def _profile_cookies(self):
+        """Cookies del perfil de Chrome para el motor HTTP (solo si LinkedIn rechaza las consultas anónimas)."""
+        from src.driver import get_linkedin_cookies
+        return get_linkedin_cookies(self.driver_manager.acquire())
+
+    def run(self, due):
+        """Recorre las URLs 'due' [(url_index, url)] y retorna un código de salida (EXIT_*)."""
+        due_indexes = [url_index for url_index, _ in due]
+        due_urls = [url for _, url in due]
+        bot = None
+        status = EXIT_OK
+
+        print(f"\n🕒 Iniciando ciclo de búsqueda: {datetime.now().strftime('%H:%M:%S')}")
+        print(f"   🗓️ Búsquedas pendientes: {', '.join(f'#{url_index + 1}' for url_index in due_indexes) or 'ninguna'}")
+        # Cada oferta se procesa una sola vez por ciclo aunque aparezca en varias URLs
+        history.start_cycle()
+        metrics.start_cycle()
+        # Perfilado opcional del ciclo (PROFILE_MODE); sin efecto si está en "off"
+        cycle_profiler.start()
 
-    while True:
-        driver = None
         try:
-            print(f"\n🕒 Iniciando ciclo de búsqueda: {datetime.now().strftime('%H:%M:%S')}")
-            
-            # 1. Start Driver
-            try:
-                driver = get_driver()
-                # ESTRATEGIA 'EAGER': Carga rápida, interactuamos antes de que carguen todos los assets
-                driver.page_load_strategy = 'eager'
-            except Exception as e:
-                print(f"❌ Error crítico al iniciar Chrome: {e}")
-                # Si falla el driver, esperamos un poco y reintentamos en vez de salir
-                time.sleep(60) 
-                continue
-
-            # 2. Lógica Principal
-            print("⏳ Iniciando navegación...")
-            time.sleep(2)
-            
-            # --- Módulo de Automatización de LinkedIn ---
-            from src.linkedin import LinkedInBot
-            
-            # Instanciamos el bot con el driver ya configurado
-            bot = LinkedInBot(driver)
-            
-            # 'Login' (en realidad solo verificado de sesión persistente)
-            bot.login()
-            
-            # Ejecutamos la búsqueda maestra
-            bot.search()
-            
+            if SEARCH_ENGINE == "http":
+                # Motor sin navegador: Chrome solo se abre si hacen falta las cookies del perfil
+                from src.linkedin_http import LinkedInHttpBot
+                bot = LinkedInHttpBot(cookie_source=self._profile_cookies)
+                bot.login()
+                bot.search(due_urls, due_indexes)
+                if self._driver_manager is not None:
+                    self._driver_manager.release()
+            elif SEARCH_WORKERS > 1:
+                # Modo paralelo: cada worker mantiene su propio navegador entre ciclos
+                from src.workers import SearchWorkerPool
+                if self.worker_pool is None:
+                    self.worker_pool = SearchWorkerPool(SEARCH_WORKERS)
+                self.worker_pool.run(due_urls, due_indexes)
+            else:
+                # 1. Start Driver (o reutilizar el del ciclo anterior si sigue sano)
+                try:
+                    driver = self.driver_manager.acquire()
+                except Exception as e:
+                    print(f"❌ Error crítico al iniciar Chrome: {e}")
+                    return EXIT_BROWSER_ERROR
+
+                # 2. Lógica Principal
+                # (Sin espera fija: el bot espera condiciones concretas de carga en cada navegación)
+                print("⏳ Iniciando navegación...")
+
+                # --- Módulo de Automatización de LinkedIn ---
+                from src.linkedin import LinkedInBot
+
+                # Instanciamos el bot con el driver ya configurado
+                bot = LinkedInBot(driver, driver_manager=self.driver_manager)
+
+                # 'Login' (en realidad solo verificado de sesión persistente)
+                bot.login()
+
+                # Ejecutamos la búsqueda maestra (solo las URLs que tocan en este ciclo)
+                bot.search(due_urls, due_indexes)
+
+                # Liberamos la página de LinkedIn mientras descansamos (el navegador queda abierto)
+                self.driver_manager.release()
+
+            status = self._session_status(bot)
             print(f"✅ Ciclo terminado.")
-            send_telegram_message(f"✅ <b>Ciclo finalizado.</b>\nDescansando {SEARCH_INTERVAL} minutos...")
 
-        except KeyboardInterrupt:
-            print("\n👋 Bot detenido manualmente.")
-            if driver: driver.quit()
-            sys.exit(0)
         except Exception as e:
             print(f"\n❌ Error en ejecución principal: {e}")
-            send_telegram_message(f"⚠️ <b>Error en el ciclo:</b> {e}")
+            outbox.enqueue(f"⚠️ <b>Error en el ciclo:</b> {e}")
+            status = EXIT_CYCLE_ERROR
+
         finally:
-            if driver:
-                print("🔒 Cerrando navegador para liberar memoria...")
+            # Reportes por URL (alimentan al planificador)
+            self.url_reports = list(getattr(bot, "url_reports", []))
+            if self.worker_pool is not None:
+                self.url_reports += [report for result in self.worker_pool.results for report in result.get("url_reports", [])]
+
+            self._report_cold_start()
+
+            # Resumen del ciclo (metrics/metrics.jsonl, metrics/linkedini.prom y /status)
+            print(metrics.format_summary(metrics.end_cycle()))
+            cycle_profiler.stop()
+
+        return status
+
+    def _session_status(self, bot):
+        """EXIT_SESSION_LOST si la corrida se abortó o casi no trajo ofertas (mismo criterio que el aviso de sesión)."""
+        if bot is None and self.worker_pool is not None:
+            results = self.worker_pool.results
+            aborted = any(result["aborted"] for result in results)
+            total_cards = sum(result["cards"] for result in results)
+        else:
+            aborted = getattr(bot, "aborted", False)
+            total_cards = getattr(bot, "total_cards_seen", 0)
+        return EXIT_SESSION_LOST if aborted or total_cards < 10 else EXIT_OK
+
+    def _report_cold_start(self):
+        """Tiempo desde que arrancó el proceso hasta la primera navegación (solo el primer ciclo)."""
+        if self.cold_start_reported or metrics.first_navigation_at is None:
+            return
+        self.cold_start_reported = True
+        cold_start = metrics.first_navigation_at - PROCESS_STARTED_AT
+        metrics.observe("arranque_en_frio", cold_start)
+        print(f"🥶 Arranque en frío: {cold_start:.1f}s desde el inicio del proceso hasta la primera navegación")
+
+    def close(self):
+        """Cierra los navegadores (principal y de los workers)."""
+        if self._driver_manager is not None:
+            print("🔒 Cerrando navegador...")
+            self._driver_manager.quit()
+        if self.worker_pool:
+            self.worker_pool.shutdown()
+
+def shard_urls():
+    """
+    URLs de este proceso como pares (url_index, url). En modo shards se reparten por turno
+    (la URL #i le toca al shard i % SHARD_COUNT) y conservan su número original.
+    """
+    return [(url_index, url) for url_index, url in enumerate(JOB_SEARCH_URLS) if url_index % SHARD_COUNT == SHARD_INDEX]
+
+def create_scheduler():
+    own_urls = shard_urls()
+    return SearchScheduler([url for _, url in own_urls], [url_index for url_index, _ in own_urls])
+
+def flush_outbox():
+    # Damos unos segundos para vaciar la bandeja de Telegram (lo que quede se envía al reiniciar)
+    if not outbox.flush(timeout=30):
+        print("📬 Quedaron mensajes de Telegram pendientes; se enviarán en el próximo inicio.")
+
+def main():
+    print("========================================")
+    print("🤖 LINKEDIN BOT - STARTING")
+    if SHARDED:
+        print(f"🧩 Shard {SHARD_INDEX + 1} de {SHARD_COUNT}: {len(shard_urls())} de {len(JOB_SEARCH_URLS)} búsquedas")
+    print("========================================")
+
+    # Notificación de inicio de servicio (en modo shards, solo la del shard 0)
+    if SHARD_INDEX == 0:
+        outbox.enqueue("🤖 <b>Buscando chamba por LinkedIn</b>")
+
+    # Escucha de Telegram en segundo plano (long polling)
+    start_telegram_listener()
+
+    runner = CycleRunner()
+
+    # Cada URL tiene su propio intervalo adaptativo (schedule.json); un ciclo solo recorre las pendientes
+    scheduler = create_scheduler()
+    print(scheduler.describe())
+
+    try:
+        while True:
+            due = scheduler.due_urls()
+            if due:
                 try:
-                    driver.quit()
-                except:
-                    pass
+                    status = runner.run(due)
+                except KeyboardInterrupt:
+                    print("\n👋 Bot detenido manualmente.")
+                    sys.exit(0)
 
-        # Espera para el siguiente ciclo con CHEQUEO DE TELEGRAM
-        next_run = datetime.now() + timedelta(minutes=SEARCH_INTERVAL)
-        print(f"💤 Durmiendo hasta: {next_run.strftime('%H:%M:%S')} ({SEARCH_INTERVAL} min)")
-        print(f"   (Revisaré Telegram cada 10 minutos durante la espera)")
+                if status == EXIT_BROWSER_ERROR:
+                    # Si falla el driver, esperamos un poco y reintentamos en vez de salir
+                    time.sleep(60)
+                    scheduler.requeue(due)
+                    continue
+
+                # Reprogramamos las URLs del ciclo según las ofertas nuevas que trajo cada una
+                scheduler.record_run(due, runner.url_reports)
+                print(scheduler.describe())
+
+            # Espera hasta la próxima URL pendiente ATENDIENDO TELEGRAM
+            wait_seconds = scheduler.seconds_until_next()
+            wait_minutes = round(wait_seconds / 60)
+            next_run = datetime.now() + timedelta(seconds=wait_seconds)
+            if due:
+                shard_label = f" (shard {SHARD_INDEX + 1}/{SHARD_COUNT})" if SHARDED else ""
+                outbox.enqueue(f"✅ <b>Ciclo finalizado{shard_label}.</b>\nPróxima búsqueda en {wait_minutes} minutos...")
+            else:
+                # Ej: tras un reinicio, schedule.json indica que todavía no toca ninguna búsqueda
+                print("💤 Ninguna búsqueda pendiente todavía (no se abre el navegador).")
+            print(f"💤 Durmiendo hasta: {next_run.strftime('%H:%M:%S')} ({wait_minutes} min)")
+            print(f"   (Los comandos de Telegram se atienden apenas llegan)")
+
+            deadline = time.monotonic() + wait_seconds
+
+            try:
+                while True:
+                    remaining_seconds = deadline - time.monotonic()
+                    if remaining_seconds <= 0:
+                        break
+
+                    # Dormimos esperando comandos: el hilo de escucha los encola y acá se ejecutan
+                    check_telegram_replies(timeout=remaining_seconds)
+            except KeyboardInterrupt:
+                print("\n👋 Bot detenido durante la espera.")
+                sys.exit(0)
+    finally:
+        # Al salir por cualquier motivo (Ctrl+C, /stop) cerramos los navegadores
+        runner.close()
+        flush_outbox()
+
+def run_once(all_urls=False):
+    """
+    Un solo ciclo para cron / timers de systemd: recorre las URLs pendientes según
+    schedule.json (o todas con --all), actualiza la planificación y retorna un código EXIT_*.
+    """
+    print(f"🤖 LINKEDIN BOT - CICLO ÚNICO (imports en {time.perf_counter() - PROCESS_STARTED_AT:.2f}s)")
+    scheduler = create_scheduler()
+    due = shard_urls() if all_urls else scheduler.due_urls()
+    if not due:
+        minutes = scheduler.seconds_until_next() / 60
+        print(f"💤 Ninguna búsqueda pendiente (la próxima en {minutes:.0f} min). Nada que hacer.")
+        return EXIT_OK
+
+    # Los comandos pendientes de Telegram se atienden entre páginas, como en el modo continuo
+    start_telegram_listener()
+    runner = CycleRunner()
+    try:
+        status = runner.run(due)
+        if status != EXIT_BROWSER_ERROR:
+            scheduler.record_run(due, runner.url_reports)
+        check_telegram_replies()
+        return status
+    except KeyboardInterrupt:
+        print("\n👋 Bot detenido manualmente.")
+        return EXIT_OK
+    finally:
+        runner.close()
+        flush_outbox()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Linkedini: búsqueda de empleo en LinkedIn con avisos por Telegram.")
+    parser.add_argument(
+        "--once", action="store_true",
+        help="Corre un solo ciclo (las búsquedas pendientes) y termina con un código de salida, para cron/systemd.",
+    )
+    parser.add_argument(
+        "--all", action="store_true",
+        help="Con --once: recorre todas las búsquedas aunque la planificación no las marque como pendientes.",
+    )
+    return parser.parse_args(argv)
 
-        remaining_seconds = SEARCH_INTERVAL * 60
-        check_interval = 600  # 10 minutos en segundos
 
-        try:
-            while remaining_seconds > 0:
-                # Determinar cuánto dormir en este bloque (el menor entre 10 min o lo que falte)
-                sleep_time = min(remaining_seconds, check_interval)
-                
-                # Dormir el bloque
-                time.sleep(sleep_time)
-                
-                # Descontar tiempo
-                remaining_seconds -= sleep_time
-                
-                # ¡DESPERTAR! Chequear mensajes
-                if remaining_seconds > 0:
-                    print(f"   👀 Despertando para chequear Telegram... (Faltan {int(remaining_seconds/60)} min)")
-                    check_telegram_replies()
-
-        except KeyboardInterrupt:
-            print("\n👋 Bot detenido durante la espera.")
-            sys.exit(0)
-
-            
 if __name__ == "__main__":
+    args = parse_args()
+    if args.once:
+        sys.exit(run_once(all_urls=args.all))
     main()
-
@@ -1,11 +1,22 @@
 from abc import ABC, abstractmethod
+import html
+from collections import defaultdict
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+import threading
 import time
 import random
-from src.notifications import send_telegram_message
-from src.history import history
+from urllib.parse import urlparse, parse_qs
+from src.config import EARLY_STOP, EARLY_STOP_SEEN_RUN, ENRICHMENT, TELEGRAM_DIGEST_MODE
+from src.notifications import outbox
+from src.enrichment import enricher, format_details
+from src.history import history, extract_job_id, STATE_NOTIFIED, STATE_SCANNED
+from src.keywords_manager import keyword_store
+from src.matcher import get_matcher
+from src.metrics import metrics
+from src.pipeline import JobPipeline
 
 class BaseBot(ABC):
     """
@@ -16,6 +27,20 @@ class BaseBot(ABC):
     def __init__(self, driver):
         self.driver = driver
         self.wait = WebDriverWait(driver, 10) # Espera máxima de 10 segundos para encontrar elementos
+        # Tiempo realmente esperado por paso (ej: 'navegacion', 'paginacion') -> lista de segundos
+        self.step_times = defaultdict(list)
+        # Matches acumulados para el próximo resumen (solo con TELEGRAM_DIGEST_MODE = page/url)
+        self.pending_matches = []
+        # Ofertas analizadas en la URL actual, se guardan en lote al terminarla (ver flush_history)
+        self.pending_history = []
+        # Búsqueda y página en curso (etiquetan las métricas de cada paso)
+        self.current_url_index = None
+        self.current_page = None
+        # Ofertas nunca vistas antes de este ciclo en la URL actual (alimenta src/scheduler.py)
+        self.url_new_jobs = 0
+        self._counter_lock = threading.Lock()
+        # Filtrado y notificación de cada página en hilos aparte (ver src/pipeline.py)
+        self.pipeline = JobPipeline(self.process_page)
 
     @abstractmethod
     def login(self):
@@ -29,6 +54,11 @@ class BaseBot(ABC):
 
     # --- Métodos de Ayuda (Utilidad general para bots) ---
     
+    def set_driver(self, driver):
+        """Cambia el navegador del bot (ej: tras un reinicio a mitad de la corrida)."""
+        self.driver = driver
+        self.wait = WebDriverWait(driver, 10)
+
     def random_sleep(self, min_seconds=2, max_seconds=5):
         """
         Espera un tiempo aleatorio.
@@ -36,6 +66,44 @@ class BaseBot(ABC):
         """
         time.sleep(random.uniform(min_seconds, max_seconds))
 
+    def record_step(self, step_name, seconds, url_index=None, page=None):
+        """
+        Registra la duración de un paso para el resumen de tiempos y las métricas del ciclo.
+        Sin 'url_index' se etiqueta con la búsqueda y la página en curso.
+        """
+        if url_index is None:
+            url_index, page = self.current_url_index, self.current_page
+        self.step_times[step_name].append(seconds)
+        metrics.observe(step_name, seconds, url_index=url_index, page=page)
+
+    def wait_for(self, condition, step_name, timeout=10, fallback_sleep=None):
+        """
+        Espera basada en condiciones (WebDriverWait) en lugar de time.sleep fijos.
+        Si la condición no se cumple a tiempo y hay 'fallback_sleep', se duerme ese tiempo
+        como último recurso. Registra el tiempo total esperado bajo 'step_name'.
+        Retorna True si la condición se cumplió.
+        """
+        start_time = time.perf_counter()
+        try:
+            WebDriverWait(self.driver, timeout, poll_frequency=0.25).until(condition)
+            satisfied = True
+        except TimeoutException:
+            print(f"      ⏳ Condición '{step_name}' no cumplida en {timeout}s.")
+            if fallback_sleep:
+                time.sleep(fallback_sleep)
+            satisfied = False
+        self.record_step(step_name, time.perf_counter() - start_time)
+        return satisfied
+
+    def print_step_summary(self):
+        """Imprime el tiempo esperado por paso (cantidad, promedio y total)."""
+        if not self.step_times:
+            return
+        print("   ⏱️ Tiempos por paso:")
+        for step_name, durations in self.step_times.items():
+            total = sum(durations)
+            print(f"      - {step_name}: {len(durations)}x, promedio {total / len(durations):.1f}s, total {total:.1f}s")
+
     def safe_click(self, by, value):
         """
         Intento de clic en elemento de forma segura, esperando su aparición.
@@ -62,49 +130,195 @@ class BaseBot(ABC):
     def validate_job_title(self, job_title, search_keywords, negative_keywords):
         """
         Analiza si un título de trabajo es relevante según las palabras clave configuradas.
+        Usa un matcher precompilado (src/matcher.py) que solo se reconstruye si cambian las listas.
         """
-        import re
-        
-        normalized_title = job_title.lower()
-        
-        def contains_exact_word(search_term, content):
-            escaped_term = re.escape(search_term)
-            if not search_term.isalnum(): 
-                pattern = r'(?<!\w)' + escaped_term + r'(?!\w)'
-                return re.search(pattern, content) is not None
-            try:
-                pattern = r'\b' + escaped_term + r'\b'
-                return re.search(pattern, content) is not None
-            except:
-                return search_term in content
-
-        for negative_word in negative_keywords:
-            if contains_exact_word(negative_word, normalized_title):
-                return None 
-
-        for meaningful_keyword in search_keywords:
-            if contains_exact_word(meaningful_keyword, normalized_title):
-                return meaningful_keyword
-                
-        return None
+        matcher = get_matcher(search_keywords, negative_keywords)
+        return matcher.match(job_title)
 
-    def notify(self, message):
+    def notify(self, message, url_index=None, page=None):
         """
         Envía una notificación al usuario (Telegram).
+        Solo encola el mensaje: el envío real lo hace la bandeja de salida en segundo plano.
+        """
+        print(f"   📢 Notificación: Mensaje encolado")
+        metrics.increment("notificaciones")
+        if url_index is None:
+            url_index, page = self.current_url_index, self.current_page
+        try:
+            with metrics.timer("telegram_encolado", url_index=url_index, page=page):
+                outbox.enqueue(message)
+        except Exception as e:
+            print(f"   ⚠️ Error enviando Telegram: {e}")
+
+    def flush_matches(self, header, matches=None):
         """
-        print(f"   📢 Notificación: Mensaje enviado")
+        Envía los matches acumulados como un resumen (uno o más mensajes de hasta 4096 caracteres).
+        'matches' permite enviar los de una sola página; por defecto, los pendientes de la URL.
+        No hace nada si no hay matches pendientes.
+        """
+        if matches is None:
+            matches, self.pending_matches = self.pending_matches, []
+        if not matches:
+            return
+        print(f"   📢 Notificación: Resumen de {len(matches)} ofertas encolado")
         try:
-            send_telegram_message(message)
+            outbox.enqueue_digest(header, matches)
         except Exception as e:
             print(f"   ⚠️ Error enviando Telegram: {e}")
 
+    def normalize_title(self, raw_title):
+        """Limpia el título de la tarjeta: minúsculas, espacios colapsados y sin 'solicitud sencilla'."""
+        title_text = " ".join((raw_title or "").split()).lower()
+        return title_text.replace("solicitud sencilla", "").strip()
+
+    def submit_page(self, job_records, page_num, produce_seconds=0.0, source_name="LinkedIn"):
+        """
+        Entrega los registros de una página al pipeline (ver src/pipeline.py) y vuelve enseguida:
+        el navegador puede pasar a la página siguiente mientras se filtra y notifica esta.
+        El corte temprano debe evaluarse ANTES, porque el procesamiento reserva las ofertas nuevas.
+        """
+        url_index = self.current_url_index
+        digest_header = None
+        if TELEGRAM_DIGEST_MODE == "page":
+            digest_header = f"✨ <b>MATCHES ({source_name} #{url_index + 1}, página {page_num})</b>"
+        self.pipeline.submit(
+            job_records, produce_seconds=produce_seconds, url_index=url_index, page=page_num,
+            digest_header=digest_header, source_name=source_name,
+        )
+
+    def process_page(self, job_records, url_index=None, page=None, digest_header=None, source_name="LinkedIn"):
+        """Etapa consumidora del pipeline: procesa una página y envía su resumen (TELEGRAM_DIGEST_MODE=page)."""
+        page_matches = [] if digest_header else None
+        found_on_page = self.process_job_records(job_records, source_name, url_index=url_index, page=page, matches=page_matches)
+        print(f"   ✅ [#{url_index + 1}] Página {page} terminada. Matches nuevos: {found_on_page}")
+        if digest_header:
+            self.flush_matches(digest_header, page_matches)
+        return found_on_page
+
+    def process_job_records(self, job_records, source_name="LinkedIn", url_index=None, page=None, matches=None):
+        """
+        Pipeline común para registros de ofertas ya extraídos (dicts planos, sin WebDriver):
+        historial + reserva del ciclo -> filtrado por keywords -> detalle (ENRICHMENT) -> notificación.
+        Cada registro trae: job_id, title, href, company, location.
+        Puede correr en un hilo del pipeline: 'url_index'/'page' etiquetan las métricas y 'matches'
+        recibe los matches para resumen (por defecto, los pendientes de la URL).
+        Retorna la cantidad de matches nuevos.
+        """
+        if url_index is None:
+            url_index, page = self.current_url_index, self.current_page
+        if matches is None:
+            matches = self.pending_matches
+        found_count = 0
+        start_time = time.perf_counter()
+
+        for job_record in job_records:
+            try:
+                title_text = self.normalize_title(job_record.get("title"))
+                link = job_record.get("href")
+
+                if len(title_text) < 3: continue
+
+                # --- CHECK HISTORIAL ---
+                # Preferimos el ID numérico: es la clave canónica del historial
+                job_key = job_record.get("job_id") or link
+                # Novedad para el planificador aunque otra URL ya la haya reservado en este ciclo
+                if job_key and not history.seen_before_cycle(job_key):
+                    with self._counter_lock:
+                        self.url_new_jobs += 1
+                if not self.check_and_track(job_key):
+                    continue
+
+                # --- FILTRADO ---
+                # Foto en memoria de las keywords: solo relee keywords.json si cambió
+                keywords = keyword_store.snapshot()
+                match_keyword = self.validate_job_title(title_text, keywords.search_keywords, keywords.negative_keywords)
+
+                # --- ENRIQUECIMIENTO (solo matches, con caché en disco) ---
+                details = None
+                if match_keyword and ENRICHMENT:
+                    details = enricher.enrich(job_record.get("job_id") or extract_job_id(link))
+                    if details and enricher.is_excluded(details):
+                        print(f"      🎓 Descartada por seniority ({details['seniority']}): {title_text}")
+                        match_keyword = False
+
+                if job_key:
+                    self.pending_history.append((job_key, STATE_NOTIFIED if match_keyword else STATE_SCANNED))
+
+                if match_keyword:
+                    found_count += 1
+                    print(f"      ✨ MATCH: {title_text}")
+
+                    # Escapados: un título como "R&D" o "C++ <Senior>" haría rechazar el mensaje (HTML inválido)
+                    job_text = (
+                        f"📌 <b>{html.escape(title_text.title())}</b>\n"
+                        f"🔗 <a href='{html.escape(link or '', quote=True)}'>Ver Oferta</a>"
+                    )
+                    if details:
+                        job_text += "\n" + format_details(details)
+                    if TELEGRAM_DIGEST_MODE in ("page", "url"):
+                        # Se envía agrupado al terminar la página o la URL (ver flush_matches)
+                        matches.append(job_text)
+                    else:
+                        self.notify(f"✨ <b>MATCH DETECTADO ({source_name})</b>\n" + job_text, url_index=url_index, page=page)
+
+            except Exception:
+                continue
+
+        self.record_step("filtrado", time.perf_counter() - start_time, url_index=url_index, page=page)
+        metrics.increment("tarjetas", len(job_records))
+        metrics.increment("matches", found_count)
+        return found_count
+
+    def is_date_sorted(self, url):
+        """True si la búsqueda está ordenada por fecha (sortBy=DD): lo más nuevo aparece primero."""
+        return parse_qs(urlparse(url).query).get("sortBy", [""])[0].upper() == "DD"
+
+    def early_stop_reason(self, base_url, job_records):
+        """
+        Política de corte temprano para búsquedas ordenadas por fecha.
+        Si la página entera (o una racha de EARLY_STOP_SEEN_RUN tarjetas seguidas) ya estaba
+        en el historial antes de este ciclo, lo que sigue es aún más viejo: no vale la pena seguir paginando.
+        Retorna el motivo del corte ('pagina_vista' / 'racha_vista') o None para seguir.
+        Debe llamarse ANTES de process_job_records (que reserva las ofertas nuevas).
+        """
+        if not EARLY_STOP or not job_records or not self.is_date_sorted(base_url):
+            return None
+
+        seen_count = 0
+        current_run = 0
+        longest_run = 0
+        for job_record in job_records:
+            key = job_record.get("job_id") or job_record.get("href")
+            if key and history.seen_before_cycle(key):
+                seen_count += 1
+                current_run += 1
+                longest_run = max(longest_run, current_run)
+            else:
+                current_run = 0
+
+        if seen_count == len(job_records):
+            return "pagina_vista"
+        if EARLY_STOP_SEEN_RUN and longest_run >= EARLY_STOP_SEEN_RUN:
+            return "racha_vista"
+        return None
+
+    def flush_history(self):
+        """
+        Guarda en el historial, en una sola escritura, las ofertas analizadas en la URL actual.
+        Llamar después de self.pipeline.drain(): las páginas encoladas también suman registros.
+        La escritura corre en un hilo del pipeline (el navegador sigue con la próxima URL);
+        pipeline.close() al terminar la corrida espera a que se complete.
+        """
+        if not self.pending_history:
+            return
+        entries, self.pending_history = self.pending_history, []
+        self.pipeline.defer(history.record_many, entries)
+
     def check_and_track(self, url):
         """
-        Verifica si la URL ya fue vista.
+        Verifica si la URL ya fue vista (en el historial o en otra URL de este ciclo).
+        Si es nueva, la reserva para que ninguna otra URL ni worker la procese en este ciclo.
         """
         if not url: return True
         
-        if history.is_seen(url):
-            return False 
-        else:
-            return True
+        return history.claim(url)
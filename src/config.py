@@ -9,15 +9,145 @@ load_dotenv()
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 
+# Envío de notificaciones (bandeja de salida en segundo plano)
+# TELEGRAM_MIN_INTERVAL: Segundos mínimos entre mensajes al chat (Telegram limita ~1 msg/s por chat).
+# TELEGRAM_DIGEST_MODE: "off" (un mensaje por oferta), "page" (un resumen por página de resultados)
+# o "url" (un resumen por URL de búsqueda). Cada resumen se parte si supera los 4096 caracteres.
+TELEGRAM_MIN_INTERVAL = float(os.getenv("TELEGRAM_MIN_INTERVAL", 1.1))
+TELEGRAM_DIGEST_MODE = os.getenv("TELEGRAM_DIGEST_MODE", "off").lower()
+
 # Configuración del Navegador
 # HEADLESS_MODE: Si es True, el navegador no muestra interfaz gráfica (útil para servidores).
 # Por defecto es False para facilitar la depuración y el inicio de sesión manual.
 HEADLESS_MODE = os.getenv("HEADLESS_MODE", "False").lower() == "true"
 
-# Intervalo entre rondas de búsqueda completa (en minutos)
+# LEAN_BROWSER: Si es True, Chrome arranca en "modo liviano": bloquea imágenes, video,
+# fuentes y trackers, desactiva servicios en segundo plano y usa una ventana fija de 1280x900.
+# PAGE_WEIGHT_STATS: Si es True, registra por página los bytes transferidos y la memoria del
+# navegador (útil para comparar el modo liviano contra el normal).
+LEAN_BROWSER = os.getenv("LEAN_BROWSER", "False").lower() == "true"
+PAGE_WEIGHT_STATS = os.getenv("PAGE_WEIGHT_STATS", "False").lower() == "true"
+
+# RECORD_DIR: Si se define, cada página de resultados (ya scrolleada y sanitizada) se graba en
+# esta carpeta para reproducirla offline con 'python -m src.replay' (benchmarks y pruebas).
+RECORD_DIR = os.getenv("RECORD_DIR", "")
+
+# Intervalo inicial entre revisiones de cada URL de búsqueda (en minutos)
 # Por defecto: 360 minutos (6 horas)
 SEARCH_INTERVAL = int(os.getenv("SEARCH_INTERVAL", 360))
 
+# Planificación adaptativa por URL (src/scheduler.py): cada búsqueda se revisa con su propio intervalo.
+# SEARCH_INTERVAL es el intervalo inicial; luego se ajusta entre SCHEDULE_MIN_INTERVAL y
+# SCHEDULE_MAX_INTERVAL (minutos) según cuántas ofertas nuevas trae cada URL.
+# SCHEDULE_TARGET_NEW: Ofertas nuevas que se busca encontrar en cada pasada de una URL.
+# SCHEDULE_BATCH_WINDOW: Minutos de tolerancia para sumar al ciclo las URLs que vencen poco después.
+# Con SCHEDULE_MIN_INTERVAL = SCHEDULE_MAX_INTERVAL = SEARCH_INTERVAL se vuelve al ciclo fijo.
+SCHEDULE_MIN_INTERVAL = float(os.getenv("SCHEDULE_MIN_INTERVAL", 60))
+SCHEDULE_MAX_INTERVAL = float(os.getenv("SCHEDULE_MAX_INTERVAL", 720))
+SCHEDULE_TARGET_NEW = float(os.getenv("SCHEDULE_TARGET_NEW", 5))
+SCHEDULE_BATCH_WINDOW = float(os.getenv("SCHEDULE_BATCH_WINDOW", 10))
+
+# Backend de persistencia del historial de ofertas vistas.
+# "sqlite" (por defecto, seen_jobs.db en modo WAL) o "journal" (diario append-only seen_jobs.journal).
+HISTORY_BACKEND = os.getenv("HISTORY_BACKEND", "sqlite").lower()
+
+# Reutilización del navegador entre ciclos (se mantiene abierto en lugar de reiniciarlo cada vez).
+# DRIVER_MAX_CYCLES: Ciclos que sirve un mismo Chrome antes de reciclarlo (0 = sin límite).
+# DRIVER_MAX_MEMORY_MB: Si la memoria de Chrome supera este valor, se recicla (0 = sin límite).
+DRIVER_MAX_CYCLES = int(os.getenv("DRIVER_MAX_CYCLES", 12))
+DRIVER_MAX_MEMORY_MB = int(os.getenv("DRIVER_MAX_MEMORY_MB", 1500))
+
+# Control de memoria DURANTE la corrida (entre páginas y entre URLs, ver src/governor.py).
+# BROWSER_MEMORY_SOFT_MB: Por encima de este valor se descarga la página (about:blank) y se fuerza
+# la recolección de basura; la búsqueda sigue en la misma página por URL.
+# BROWSER_MEMORY_HARD_MB: Si tras la limpieza sigue por encima, se reinicia Chrome y se retoma igual.
+# 0 desactiva cada límite. En equipos con poca RAM (o Android) conviene bajarlos.
+BROWSER_MEMORY_SOFT_MB = int(os.getenv("BROWSER_MEMORY_SOFT_MB", 1000))
+BROWSER_MEMORY_HARD_MB = int(os.getenv("BROWSER_MEMORY_HARD_MB", 1500))
+
+# Modo shards: varios procesos (cada uno con su propio perfil de Chrome / cuenta) se reparten JOB_SEARCH_URLS.
+# SHARD_COUNT: Cantidad total de procesos (1 = modo normal). SHARD_INDEX: Número de este proceso (0 .. SHARD_COUNT-1).
+# Todos corren desde la misma carpeta y se coordinan con seen_jobs.db (historial, keywords y offset de Telegram).
+# El shard 0 usa el perfil 'profile' y atiende Telegram; el resto usa 'profile_shard_<n>'.
+SHARD_COUNT = max(1, int(os.getenv("SHARD_COUNT", 1)))
+SHARD_INDEX = int(os.getenv("SHARD_INDEX", 0)) % SHARD_COUNT
+SHARDED = SHARD_COUNT > 1
+
+def shard_file_name(file_name):
+    """En modo shards, agrega el número de shard a un archivo propio del proceso (bandeja, planificación...)."""
+    if not SHARDED:
+        return file_name
+    base, extension = os.path.splitext(file_name)
+    return f"{base}_shard{SHARD_INDEX}{extension}"
+
+# SEARCH_WORKERS: Cantidad de navegadores trabajando en paralelo sobre JOB_SEARCH_URLS.
+# Con 1 (por defecto) se usa un único navegador como siempre. Cada worker extra usa un
+# clon del perfil (carpeta profile_clones/) y consume su propia memoria.
+SEARCH_WORKERS = max(1, int(os.getenv("SEARCH_WORKERS", 1)))
+
+# Pipeline por página: el navegador extrae las tarjetas y un pool de hilos hace historial, filtrado,
+# detalle y notificación mientras el bot ya avanza a la página siguiente.
+# PIPELINE_WORKERS: Hilos consumidores (0 = todo en el hilo del navegador, como antes).
+# PIPELINE_QUEUE_SIZE: Páginas que pueden esperar en la cola; si se llena, el navegador espera (contrapresión).
+PIPELINE_WORKERS = max(0, int(os.getenv("PIPELINE_WORKERS", 2)))
+PIPELINE_QUEUE_SIZE = max(1, int(os.getenv("PIPELINE_QUEUE_SIZE", 3)))
+
+# PAGE_LOAD_TIMEOUT: Segundos máximos esperando que cargue una página de resultados
+# (navegación o cambio de página). Se duplica en Android.
+PAGE_LOAD_TIMEOUT = float(os.getenv("PAGE_LOAD_TIMEOUT", 20))
+
+# PAGINATION_MODE: Cómo se pasa de página en el motor Selenium.
+# "click" (por defecto): maniobra de desbloqueo 1->2->1 y botón 'Siguiente'.
+# "offset": cada página se abre directo por URL (&start=N), sin maniobra ni clicks; la cantidad
+# de páginas se calcula de antemano con el total de resultados del encabezado.
+PAGINATION_MODE = os.getenv("PAGINATION_MODE", "click").lower()
+
+# Scroll adaptativo de la lista de resultados
+# SCROLL_MAX_SECONDS: Tope duro de segundos de scroll por página.
+# SCROLL_POLL_SECONDS: Pausa entre pasos de scroll (se duplica en Android).
+# SCROLL_STABLE_POLLS: Consultas seguidas sin tarjetas nuevas (estando al fondo) para dar la página por cargada.
+SCROLL_MAX_SECONDS = float(os.getenv("SCROLL_MAX_SECONDS", 30))
+SCROLL_POLL_SECONDS = float(os.getenv("SCROLL_POLL_SECONDS", 0.5))
+SCROLL_STABLE_POLLS = int(os.getenv("SCROLL_STABLE_POLLS", 3))
+
+# SEARCH_ENGINE: Motor de búsqueda.
+# "selenium" (por defecto): Chrome con el perfil persistente (admite SEARCH_WORKERS).
+# "http": sin navegador, pide los fragmentos HTML del listado público de empleos de LinkedIn.
+#         Solo abre Chrome si LinkedIn rechaza las consultas anónimas, para reutilizar sus cookies.
+# HTTP_PAGE_DELAY: Pausa en segundos entre pedidos de fragmentos (motor http).
+SEARCH_ENGINE = os.getenv("SEARCH_ENGINE", "selenium").lower()
+HTTP_PAGE_DELAY = float(os.getenv("HTTP_PAGE_DELAY", 1.0))
+
+# METRICS_DIR: Carpeta de métricas por ciclo (metrics.jsonl y linkedini.prom para Prometheus).
+# Vacío = sin archivos (el resumen de /status sigue disponible en memoria).
+METRICS_DIR = os.getenv("METRICS_DIR", "metrics")
+
+# Perfilado opcional de cada ciclo (para diagnosticar lentitud o consumo de memoria)
+# PROFILE_MODE: "off" (por defecto, sin costo), "cpu" (cProfile), "memory" (tracemalloc) o "both".
+# PROFILE_DIR: Carpeta de los reportes. PROFILE_KEEP: Ciclos que se conservan (rotación).
+# PROFILE_TOP_N: Cantidad de funciones/líneas en los resúmenes de texto.
+PROFILE_MODE = os.getenv("PROFILE_MODE", "off").lower()
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_KEEP = max(1, int(os.getenv("PROFILE_KEEP", 10)))
+PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", 30))
+
+# Corte temprano de paginación en búsquedas ordenadas por fecha (sortBy=DD, lo más nuevo primero)
+# EARLY_STOP: Si es True (por defecto), deja de paginar una URL apenas llega a ofertas ya vistas.
+# EARLY_STOP_SEEN_RUN: Tarjetas ya vistas SEGUIDAS que bastan para cortar (0 = solo si la página entera ya fue vista).
+EARLY_STOP = os.getenv("EARLY_STOP", "True").lower() == "true"
+EARLY_STOP_SEEN_RUN = int(os.getenv("EARLY_STOP_SEEN_RUN", 10))
+
+# Enriquecimiento de matches (src/enrichment.py): tras el filtro de título se descarga el detalle
+# público de la oferta (empresa, ubicación, seniority, descripción) y se agrega a la notificación.
+# ENRICHMENT: Si es True, activa la etapa (solo para ofertas que ya hicieron match).
+# ENRICHMENT_CACHE_DIR / _MAX_MB / _TTL_DAYS: Caché en disco de los detalles (LRU por tamaño + vencimiento).
+# ENRICHMENT_EXCLUDE_SENIORITY: Niveles a descartar, separados por coma (ej: "Mid-Senior level,Director").
+ENRICHMENT = os.getenv("ENRICHMENT", "False").lower() == "true"
+ENRICHMENT_CACHE_DIR = os.getenv("ENRICHMENT_CACHE_DIR", "enrichment_cache")
+ENRICHMENT_CACHE_MAX_MB = float(os.getenv("ENRICHMENT_CACHE_MAX_MB", 50))
+ENRICHMENT_CACHE_TTL_DAYS = float(os.getenv("ENRICHMENT_CACHE_TTL_DAYS", 30))
+ENRICHMENT_EXCLUDE_SENIORITY = [level for level in os.getenv("ENRICHMENT_EXCLUDE_SENIORITY", "").split(",") if level.strip()]
+
 # --- URLs DE BÚSQUEDA ---
 # El bot recorrerá cada una de estas URLs secuencialmente.
 # INSTRUCCIONES:
@@ -46,12 +176,15 @@ JOB_SEARCH_URLS = [
 ]
 
 # --- PALABRAS CLAVE DE BÚSQUEDA ---
-# --- PALABRAS CLAVE DE BÚSQUEDA ---
-from src.keywords_manager import get_positive_keywords, get_negative_keywords
-
-# Estas funciones cargan las keywords desde keywords.json (o defaults si no existe)
-# Nota: src/linkedin.py debe llamar a estas funciones dinámicamente o re-importarlas
-# para ver cambios en tiempo de ejecución sin reiniciar.
-SEARCH_KEYWORDS = get_positive_keywords()
-NEGATIVE_KEYWORDS = get_negative_keywords()
+# SEARCH_KEYWORDS / NEGATIVE_KEYWORDS se resuelven recién al usarlas (ver __getattr__):
+# importar la configuración no lee ni crea keywords.json, y cada acceso ve las listas vigentes.
+# El scraper no las usa: consulta keyword_store (src/keywords_manager.py) en cada página.
+def __getattr__(name):
+    if name == "SEARCH_KEYWORDS":
+        from src.keywords_manager import get_positive_keywords
+        return get_positive_keywords()
+    if name == "NEGATIVE_KEYWORDS":
+        from src.keywords_manager import get_negative_keywords
+        return get_negative_keywords()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
@@ -1,20 +1,136 @@
 import os
+import shutil
 import time
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
-from src.config import HEADLESS_MODE
+from src.config import HEADLESS_MODE, LEAN_BROWSER, DRIVER_MAX_CYCLES, DRIVER_MAX_MEMORY_MB, SHARD_INDEX, shard_file_name
+from src.metrics import metrics
 
-def get_driver():
+# Carpetas de caché que no hace falta copiar al clonar un perfil (solo pesan)
+PROFILE_CLONE_IGNORE = shutil.ignore_patterns(
+    "Singleton*", "lockfile", "Cache", "Code Cache", "GPUCache", "Service Worker", "ShaderCache", "GrShaderCache"
+)
+
+# --- MODO LIVIANO (LEAN_BROWSER) ---
+# Solo leemos títulos y links de las tarjetas: imágenes, video, fuentes y trackers sobran.
+LEAN_CONTENT_SETTINGS = {
+    "profile.managed_default_content_settings.images": 2,
+    "profile.managed_default_content_settings.media_stream": 2,
+    "profile.default_content_setting_values.notifications": 2,
+    "profile.default_content_setting_values.geolocation": 2,
+}
+
+LEAN_CHROME_FLAGS = [
+    "--window-size=1280,900",               # Ventana fija y modesta (en vez de --start-maximized)
+    "--blink-settings=imagesEnabled=false",
+    "--mute-audio",
+    "--disable-background-networking",
+    "--disable-background-timer-throttling",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-extensions",
+    "--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication",
+    "--no-first-run",
+]
+
+# Patrones bloqueados vía CDP (Network.setBlockedURLs): cubre lo que las preferencias no alcanzan
+LEAN_BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.ico",
+    "*.mp4", "*.webm", "*.m3u8", "*.mp3",
+    "*.woff", "*.woff2", "*.ttf", "*.otf",
+    "*media.licdn.com/dms/image*", "*dms.licdn.com/playlist*",
+    "*doubleclick.net*", "*google-analytics.com*", "*googletagmanager.com*",
+    "*px.ads.linkedin.com*", "*linkedin.com/li/track*", "*linkedin.com/collect*",
+]
+
+def apply_lean_network_rules(driver):
+    """Bloquea recursos pesados a nivel red con el protocolo DevTools (solo Chrome)."""
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": LEAN_BLOCKED_URLS})
+    except Exception as e:
+        print(f"   ⚠️ No se pudieron aplicar los bloqueos de red (modo liviano): {e}")
+
+def get_linkedin_cookies(driver):
+    """
+    Cookies de LinkedIn del perfil (sesión iniciada), sin importar qué página esté abierta.
+    Retorna una lista de dicts {name, value, domain, path}. Se usa para el motor HTTP.
+    """
+    try:
+        cookies = driver.execute_cdp_cmd("Network.getAllCookies", {}).get("cookies", [])
+    except Exception:
+        # Sin DevTools: solo vemos las cookies del dominio de la página actual
+        driver.get("https://www.linkedin.com/robots.txt")
+        cookies = driver.get_cookies()
+    return [cookie for cookie in cookies if "linkedin.com" in cookie.get("domain", "")]
+
+# Peso de la página actual según la Performance API del navegador
+PAGE_WEIGHT_SCRIPT = """
+if (!window.__linkedini_buffer_set) {
+    performance.setResourceTimingBufferSize(5000);
+    window.__linkedini_buffer_set = true;
+}
+let transferred = 0;
+const entries = performance.getEntriesByType("navigation").concat(performance.getEntriesByType("resource"));
+for (const entry of entries) transferred += entry.transferSize || 0;
+return {
+    time_origin: performance.timeOrigin,
+    bytes: transferred,
+    requests: entries.length,
+    js_heap: performance.memory ? performance.memory.usedJSHeapSize : null
+};
+"""
+
+def measure_page_weight(driver):
+    """
+    Bytes transferidos y requests del documento actual (acumulados desde que se cargó),
+    y heap de JavaScript usado. Retorna None si no se pudo medir.
+    """
+    try:
+        return driver.execute_script(PAGE_WEIGHT_SCRIPT)
+    except Exception:
+        return None
+
+def get_profile_dir():
+    """
+    Ruta del perfil principal: la carpeta 'profile' dentro del proyecto.
+    En modo shards cada proceso tiene su propio perfil (y su propia cuenta): el shard 0
+    conserva 'profile' y los demás usan 'profile_shard_<n>'.
+    """
+    if SHARD_INDEX:
+        return os.path.join(os.getcwd(), f"profile_shard_{SHARD_INDEX}")
+    return os.path.join(os.getcwd(), "profile")
+
+def clone_profile(clone_name):
+    """
+    Clona el perfil principal (cookies/sesión de LinkedIn) en 'profile_clones/<clone_name>'.
+    Chrome bloquea un perfil por proceso, así que cada worker adicional necesita su copia.
+    Se vuelve a sincronizar en cada llamada para arrastrar la sesión más reciente.
+    """
+    source_dir = get_profile_dir()
+    clone_dir = os.path.join(os.getcwd(), "profile_clones", shard_file_name(clone_name))
+    if os.path.exists(source_dir):
+        shutil.copytree(source_dir, clone_dir, ignore=PROFILE_CLONE_IGNORE, dirs_exist_ok=True)
+    else:
+        os.makedirs(clone_dir, exist_ok=True)
+    return clone_dir
+
+def get_driver(profile_dir=None, headless=None):
     """
     Inicializa el navegador Chrome con configuración de perfil persistente.
     Permite mantener la sesión iniciada entre ejecuciones.
+    'profile_dir' permite usar otro perfil (ej: un clon para un worker).
+    'headless' fuerza el modo sin ventana (None = usar HEADLESS_MODE del .env).
     """
+    if headless is None:
+        headless = HEADLESS_MODE
     print("🚗 Inicializando navegador con perfil persistente...")
     
     # Configuración de la ruta del perfil de usuario local.
-    # Siempre usa la carpeta 'profile' dentro del proyecto.
-    base_dir = os.getcwd()
-    profile_dir = os.path.join(base_dir, "profile")
+    # Por defecto usa la carpeta 'profile' dentro del proyecto.
+    if profile_dir is None:
+        profile_dir = get_profile_dir()
     if not os.path.exists(profile_dir):
         os.makedirs(profile_dir)
         print(f"   -> Creando perfil local (bot dedicado) en: {profile_dir}")
@@ -32,17 +148,181 @@ def get_driver():
     chrome_options.add_experimental_option("excludeSwitches", ["enable-automation", "enable-logging"])
     chrome_options.add_experimental_option('useAutomationExtension', False)
     
-    chrome_options.add_argument("--start-maximized")
+    if LEAN_BROWSER:
+        print("   -> Modo liviano: sin imágenes, video, fuentes ni trackers")
+        for flag in LEAN_CHROME_FLAGS:
+            chrome_options.add_argument(flag)
+        chrome_options.add_experimental_option("prefs", LEAN_CONTENT_SETTINGS)
+    else:
+        chrome_options.add_argument("--start-maximized")
     chrome_options.add_argument("--log-level=3")
 
-    if HEADLESS_MODE:
+    if headless:
          chrome_options.add_argument("--headless=new")
 
     try:
         driver = webdriver.Chrome(options=chrome_options)
+        if LEAN_BROWSER:
+            apply_lean_network_rules(driver)
         return driver
     except Exception as e:
         print(f"❌ Error al iniciar Chrome: {e}")
         print("💡 POSIBLE CAUSA: El directorio de perfil está en uso.")
         print("   SOLUCIÓN: Asegúrese de cerrar todas las instancias de Google Chrome que utilicen este perfil.")
         raise e
+
+def _process_tree_rss_linux(root_pid):
+    """RSS total (bytes) de un proceso y todos sus descendientes leyendo /proc (Linux/Android)."""
+    children = {}
+    rss_by_pid = {}
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as stat_file:
+                # El nombre del proceso va entre paréntesis y puede tener espacios
+                fields = stat_file.read().rsplit(")", 1)[1].split()
+            parent_pid = int(fields[1])
+            rss_by_pid[int(entry)] = int(fields[21]) * page_size
+            children.setdefault(parent_pid, []).append(int(entry))
+        except (OSError, IndexError, ValueError):
+            continue
+
+    total = 0
+    pending = [root_pid]
+    while pending:
+        pid = pending.pop()
+        total += rss_by_pid.get(pid, 0)
+        pending.extend(children.get(pid, []))
+    return total
+
+def get_browser_memory_mb(driver):
+    """
+    Memoria residente (MB) de chromedriver + Chrome + renderers.
+    Usa psutil si está instalado; si no, /proc en Linux. Retorna None si no se puede medir.
+    """
+    try:
+        root_pid = driver.service.process.pid
+    except Exception:
+        return None
+
+    try:
+        import psutil
+        root = psutil.Process(root_pid)
+        processes = [root] + root.children(recursive=True)
+        total = 0
+        for process in processes:
+            try:
+                total += process.memory_info().rss
+            except psutil.Error:
+                continue
+        return total / (1024 * 1024)
+    except ImportError:
+        pass
+    except Exception:
+        return None
+
+    if os.path.isdir("/proc"):
+        try:
+            return _process_tree_rss_linux(root_pid) / (1024 * 1024)
+        except Exception:
+            return None
+    return None
+
+class DriverManager:
+    """
+    Mantiene un único navegador vivo entre ciclos en lugar de abrir y cerrar Chrome cada vez.
+
+    - Antes de cada ciclo hace un chequeo barato de salud; solo reinicia si falla.
+    - Recicla el navegador de forma preventiva tras DRIVER_MAX_CYCLES ciclos o si
+      su memoria supera DRIVER_MAX_MEMORY_MB (0 desactiva cada límite).
+    """
+
+    def __init__(self, profile_dir=None, max_cycles=DRIVER_MAX_CYCLES, max_memory_mb=DRIVER_MAX_MEMORY_MB):
+        self.profile_dir = profile_dir
+        self.max_cycles = max_cycles
+        self.max_memory_mb = max_memory_mb
+        self.driver = None
+        self.cycles_served = 0
+        self.last_startup_seconds = None
+
+    def is_healthy(self):
+        """Chequeo de vida: una llamada mínima al navegador."""
+        if self.driver is None:
+            return False
+        try:
+            self.driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def start(self):
+        """Arranca un navegador nuevo y mide cuánto tardó."""
+        start_time = time.perf_counter()
+        self.driver = get_driver(profile_dir=self.profile_dir)
+        # ESTRATEGIA 'EAGER': Carga rápida, interactuamos antes de que carguen todos los assets
+        self.driver.page_load_strategy = 'eager'
+        self.last_startup_seconds = time.perf_counter() - start_time
+        self.cycles_served = 0
+        metrics.observe("arranque_navegador", self.last_startup_seconds)
+        metrics.increment("arranques_navegador")
+        print(f"   🚀 Navegador iniciado en {self.last_startup_seconds:.1f}s")
+        return self.driver
+
+    def quit(self):
+        """Cierra el navegador (si hay uno)."""
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+        self.driver = None
+
+    def restart(self, reason):
+        print(f"   ♻️ Reiniciando navegador: {reason}")
+        self.quit()
+        return self.start()
+
+    def _recycle_reason(self):
+        """Motivo para reciclar el navegador de forma preventiva, o None."""
+        if self.max_cycles and self.cycles_served >= self.max_cycles:
+            return f"{self.cycles_served} ciclos cumplidos"
+        if self.max_memory_mb:
+            memory_mb = get_browser_memory_mb(self.driver)
+            if memory_mb is not None and memory_mb > self.max_memory_mb:
+                return f"memoria {memory_mb:.0f} MB > {self.max_memory_mb} MB"
+        return None
+
+    def acquire(self):
+        """
+        Retorna un navegador listo para un ciclo: reutiliza el actual si está sano,
+        o arranca/recicla uno nuevo si hace falta.
+        """
+        if self.driver is None:
+            self.start()
+        elif not self.is_healthy():
+            self.restart("no respondió al chequeo de salud")
+        else:
+            reason = self._recycle_reason()
+            if reason:
+                self.restart(reason)
+            elif self.last_startup_seconds is not None:
+                print(f"   ♻️ Reutilizando navegador (ciclo {self.cycles_served + 1}). "
+                      f"Arranque evitado: ~{self.last_startup_seconds:.1f}s")
+
+        self.cycles_served += 1
+        return self.driver
+
+    def release(self):
+        """
+        Fin de ciclo: deja el navegador en una página vacía para liberar la memoria
+        de la página de LinkedIn mientras esperamos el próximo ciclo.
+        """
+        if self.driver is None:
+            return
+        try:
+            self.driver.get("about:blank")
+        except Exception:
+            # Si ni siquiera podemos navegar, el próximo chequeo de salud lo reiniciará
+            pass
@@ -0,0 +1,296 @@
+import hashlib
+import html
+import json
+import os
+import threading
+import time
+from html.parser import HTMLParser
+import requests
+from src.config import (
+    ENRICHMENT_CACHE_DIR, ENRICHMENT_CACHE_MAX_MB, ENRICHMENT_CACHE_TTL_DAYS, ENRICHMENT_EXCLUDE_SENIORITY,
+)
+from src.metrics import metrics
+
+# Detalle público de una oferta (HTML con empresa, ubicación, criterios y descripción)
+JOB_POSTING_URL = "https://www.linkedin.com/jobs-guest/jobs/api/jobPosting/{job_id}"
+
+HTTP_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml",
+    "Accept-Language": "es-ES,es;q=0.9,en;q=0.8",
+}
+
+# Caracteres de la descripción que se guardan en caché y que se muestran en la notificación
+DESCRIPTION_MAX_CHARS = 2000
+NOTIFICATION_SNIPPET_CHARS = 280
+
+# Encabezados del criterio de seniority según el idioma de la página
+SENIORITY_HEADERS = ("seniority", "antigüedad", "experiencia")
+
+class JobPostingParser(HTMLParser):
+    """
+    Parser del detalle público de una oferta, en una sola pasada (mismo enfoque que JobCardParser).
+    Extrae título, empresa, ubicación, descripción y la lista de criterios (seniority, tipo de empleo...).
+    """
+
+    FIELD_CLASSES = {
+        "top-card-layout__title": "title",
+        "topcard__org-name-link": "company",
+        "topcard__flavor--bullet": "location",
+        "show-more-less-html__markup": "description",
+        "description__job-criteria-subheader": "criteria_name",
+        "description__job-criteria-text": "criteria_value",
+    }
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.fields = {"title": "", "company": "", "location": "", "description": ""}
+        self.criteria = {}
+        self._criteria_name = ""
+        self._text = ""
+        self._field = None
+        self._field_tag = None
+        self._field_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if self._field is not None:
+            if tag == self._field_tag:
+                self._field_depth += 1
+            elif tag in ("br", "p", "li"):
+                self._text += " "
+            return
+        for css_class in (dict(attrs).get("class") or "").split():
+            field = self.FIELD_CLASSES.get(css_class)
+            # Cada campo se toma de su primera aparición (la página repite el título en otros bloques)
+            if field and not self.fields.get(field):
+                self._field, self._field_tag, self._field_depth, self._text = field, tag, 1, ""
+                break
+
+    def handle_endtag(self, tag):
+        if self._field is None or tag != self._field_tag:
+            return
+        self._field_depth -= 1
+        if self._field_depth > 0:
+            return
+
+        text = " ".join(self._text.split())
+        if self._field == "criteria_name":
+            self._criteria_name = text
+        elif self._field == "criteria_value":
+            if self._criteria_name:
+                self.criteria[self._criteria_name] = text
+            self._criteria_name = ""
+        else:
+            self.fields[self._field] = text
+        self._field = None
+
+    def handle_data(self, data):
+        if self._field is not None:
+            self._text += data
+
+def parse_job_posting(html_text, job_id):
+    """Convierte el HTML del detalle en un dict plano (el que se guarda en caché)."""
+    parser = JobPostingParser()
+    parser.feed(html_text)
+    parser.close()
+
+    seniority = ""
+    for name, value in parser.criteria.items():
+        if any(header in name.lower() for header in SENIORITY_HEADERS):
+            seniority = value
+            break
+    else:
+        # LinkedIn pone el seniority primero en la lista de criterios
+        seniority = next(iter(parser.criteria.values()), "")
+
+    return {
+        "job_id": job_id,
+        "title": parser.fields["title"],
+        "company": parser.fields["company"],
+        "location": parser.fields["location"],
+        "seniority": seniority,
+        "criteria": parser.criteria,
+        "description": parser.fields["description"][:DESCRIPTION_MAX_CHARS],
+        "fetched_at": time.time(),
+    }
+
+class JobDetailCache:
+    """
+    Caché en disco de detalles de ofertas, direccionada por contenido: cada oferta vive en
+    '<cache_dir>/<2 hex>/<sha1 del ID>.json', así una oferta re-matcheada o republicada con
+    el mismo ID nunca se vuelve a descargar.
+
+    - TTL: las entradas más viejas que ttl_seconds se descartan al leerlas.
+    - LRU por tamaño: la fecha de modificación del archivo es su último uso (se actualiza en
+      cada acierto). Si la carpeta supera max_bytes, se borran las menos usadas hasta bajar al 90%.
+    El índice (ruta -> último uso, tamaño) se arma recorriendo la carpeta en el primer uso.
+    """
+
+    def __init__(self, cache_dir=ENRICHMENT_CACHE_DIR, max_bytes=ENRICHMENT_CACHE_MAX_MB * 1024 * 1024,
+                 ttl_seconds=ENRICHMENT_CACHE_TTL_DAYS * 24 * 60 * 60):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._index = None
+
+    def _path(self, job_id):
+        digest = hashlib.sha1(str(job_id).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], digest + ".json")
+
+    def _ensure_index(self):
+        if self._index is not None:
+            return
+        self._index = {}
+        if not os.path.isdir(self.cache_dir):
+            return
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".json"):
+                    stat_result = entry.stat()
+                    self._index[entry.path] = [stat_result.st_mtime, stat_result.st_size]
+
+    def get(self, job_id):
+        """Detalle guardado (dict) o None si no está o venció."""
+        path = self._path(job_id)
+        with self._lock:
+            self._ensure_index()
+            if path not in self._index:
+                return None
+            try:
+                with open(path, "r", encoding="utf-8") as file_handler:
+                    details = json.load(file_handler)
+            except (OSError, ValueError):
+                self._remove(path)
+                return None
+
+            if time.time() - details.get("fetched_at", 0) > self.ttl_seconds:
+                self._remove(path)
+                return None
+
+            # Último uso = ahora (orden del LRU)
+            now = time.time()
+            try:
+                os.utime(path, (now, now))
+            except OSError:
+                pass
+            self._index[path][0] = now
+            return details
+
+    def put(self, job_id, details):
+        """Guarda un detalle (escritura atómica) y aplica el límite de tamaño."""
+        path = self._path(job_id)
+        payload = json.dumps(details, ensure_ascii=False)
+        with self._lock:
+            self._ensure_index()
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                temp_path = path + ".tmp"
+                with open(temp_path, "w", encoding="utf-8") as file_handler:
+                    file_handler.write(payload)
+                os.replace(temp_path, path)
+            except OSError as e:
+                print(f"   ⚠️ No se pudo guardar el detalle en caché: {e}")
+                return
+            self._index[path] = [time.time(), os.path.getsize(path)]
+            self._evict()
+
+    def _remove(self, path):
+        self._index.pop(path, None)
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _evict(self):
+        total = sum(size for _, size in self._index.values())
+        if not self.max_bytes or total <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9
+        evicted = 0
+        for path, (_, size) in sorted(self._index.items(), key=lambda item: item[1][0]):
+            if total <= target:
+                break
+            self._remove(path)
+            total -= size
+            evicted += 1
+        metrics.increment("detalles_cache_desalojados", evicted)
+
+class JobEnricher:
+    """
+    Etapa de enriquecimiento: trae empresa, ubicación, seniority y descripción de las ofertas
+    que ya pasaron el filtro de título (solo esas), pasando primero por JobDetailCache.
+    Registra en las métricas del ciclo aciertos/fallos de caché y la latencia de cada descarga.
+    """
+
+    def __init__(self, cache=None, exclude_seniority=ENRICHMENT_EXCLUDE_SENIORITY):
+        self.cache = cache or JobDetailCache()
+        self.exclude_seniority = {level.strip().lower() for level in exclude_seniority if level.strip()}
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    def _get_session(self):
+        if self._session is None:
+            self._session = requests.Session()
+            self._session.headers.update(HTTP_HEADERS)
+        return self._session
+
+    def enrich(self, job_id):
+        """Detalle de la oferta (desde la caché o descargado), o None si no se pudo obtener."""
+        if job_id is None:
+            return None
+
+        details = self.cache.get(job_id)
+        if details is not None:
+            metrics.increment("detalles_cache_hit")
+            return details
+
+        metrics.increment("detalles_cache_miss")
+        with metrics.timer("detalles_descarga"):
+            details = self.fetch(job_id)
+        if details is not None:
+            self.cache.put(job_id, details)
+        return details
+
+    def fetch(self, job_id):
+        try:
+            with self._session_lock:
+                response = self._get_session().get(JOB_POSTING_URL.format(job_id=job_id), timeout=15)
+        except requests.RequestException as e:
+            print(f"      ⚠️ No se pudo obtener el detalle de la oferta {job_id}: {e}")
+            metrics.increment("detalles_fallidos")
+            return None
+
+        if response.status_code != 200:
+            print(f"      ⚠️ Detalle de la oferta {job_id} no disponible (HTTP {response.status_code}).")
+            metrics.increment("detalles_fallidos")
+            return None
+        return parse_job_posting(response.text, job_id)
+
+    def is_excluded(self, details):
+        """True si el seniority de la oferta está en ENRICHMENT_EXCLUDE_SENIORITY."""
+        return bool(details.get("seniority")) and details["seniority"].lower() in self.exclude_seniority
+
+def format_details(details):
+    """Líneas extra de la notificación (HTML de Telegram) con los datos del detalle."""
+    facts = [
+        f"{icon} {html.escape(value)}"
+        for icon, value in (("🏢", details.get("company")), ("📍", details.get("location")), ("🎓", details.get("seniority")))
+        if value
+    ]
+    lines = [" · ".join(facts)] if facts else []
+    description = details.get("description") or ""
+    if description:
+        snippet = description[:NOTIFICATION_SNIPPET_CHARS]
+        if len(description) > NOTIFICATION_SNIPPET_CHARS:
+            snippet = snippet.rsplit(" ", 1)[0] + "…"
+        lines.append(f"<i>{html.escape(snippet)}</i>")
+    return "\n".join(lines)
+
+# Instancia global para usar en todo el proyecto
+enricher = JobEnricher()
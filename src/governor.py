@@ -0,0 +1,97 @@
+from src.config import BROWSER_MEMORY_SOFT_MB, BROWSER_MEMORY_HARD_MB
+from src.driver import get_browser_memory_mb
+from src.metrics import metrics
+
+# Comandos DevTools para que el renderer suelte memoria (se ignoran si el navegador no los soporta)
+CLEANUP_CDP_COMMANDS = [
+    ("HeapProfiler.collectGarbage", {}),
+    ("Memory.simulatePressureNotification", {"level": "critical"}),
+]
+
+class ResourceGovernor:
+    """
+    Controla la memoria de Chrome (chromedriver + navegador + renderers) DURANTE una corrida.
+
+    LinkedInBot lo consulta entre páginas y entre URLs:
+    - Cada consulta mide el RSS del árbol de procesos y lo registra en las métricas del ciclo
+      (pico y promedio en el resumen, /status y Prometheus).
+    - Por encima de BROWSER_MEMORY_SOFT_MB: limpieza (about:blank + recolección de basura vía DevTools).
+    - Si sigue por encima de BROWSER_MEMORY_HARD_MB: reinicia el navegador con el DriverManager.
+    En ambos casos la página de resultados se pierde y el bot retoma la búsqueda por URL (start=).
+    0 desactiva cada límite (la medición se hace igual).
+    """
+
+    def __init__(self, driver_manager=None, soft_limit_mb=BROWSER_MEMORY_SOFT_MB, hard_limit_mb=BROWSER_MEMORY_HARD_MB):
+        self.driver_manager = driver_manager
+        self.soft_limit_mb = soft_limit_mb
+        self.hard_limit_mb = hard_limit_mb
+        self.samples = []
+        self.cleanups = 0
+        self.restarts = 0
+
+    def measure(self, driver, url_index=None, page=None):
+        """Memoria actual del navegador en MB (None si no se puede medir en esta plataforma)."""
+        memory_mb = get_browser_memory_mb(driver)
+        if memory_mb is not None:
+            self.samples.append(memory_mb)
+            metrics.sample("memoria_navegador_mb", memory_mb, url_index=url_index, page=page)
+        return memory_mb
+
+    def enforce(self, driver, url_index=None, page=None):
+        """
+        Mide y, si hace falta, libera memoria.
+        Retorna (driver, accion): el driver a usar de ahora en más (puede ser uno nuevo)
+        y 'limpieza' / 'reinicio', o None si no se tocó nada.
+        """
+        memory_mb = self.measure(driver, url_index=url_index, page=page)
+        if memory_mb is None:
+            return driver, None
+
+        over_soft = self.soft_limit_mb and memory_mb > self.soft_limit_mb
+        over_hard = self.hard_limit_mb and memory_mb > self.hard_limit_mb
+        if not over_soft and not over_hard:
+            return driver, None
+
+        if over_soft:
+            print(f"      🧹 Navegador en {memory_mb:.0f} MB (límite {self.soft_limit_mb} MB). Liberando memoria...")
+            self.cleanup(driver)
+            memory_mb = self.measure(driver, url_index=url_index, page=page)
+            over_hard = self.hard_limit_mb and memory_mb is not None and memory_mb > self.hard_limit_mb
+            if memory_mb is not None:
+                print(f"      🧹 Tras la limpieza: {memory_mb:.0f} MB")
+
+        if over_hard and self.driver_manager is not None:
+            self.restarts += 1
+            metrics.increment("reinicios_por_memoria")
+            driver = self.driver_manager.restart(f"memoria {memory_mb:.0f} MB > {self.hard_limit_mb} MB a mitad de la corrida")
+            self.measure(driver, url_index=url_index, page=page)
+            return driver, "reinicio"
+
+        if not over_soft:
+            # Sobre el límite duro sin DriverManager (ej: benchmark de replay): al menos limpiamos
+            self.cleanup(driver)
+        return driver, "limpieza"
+
+    def cleanup(self, driver):
+        """Descarga la página de LinkedIn y pide al renderer que libere memoria."""
+        self.cleanups += 1
+        metrics.increment("limpiezas_de_memoria")
+        try:
+            driver.get("about:blank")
+        except Exception as e:
+            print(f"      ⚠️ No se pudo descargar la página: {e}")
+        for command, params in CLEANUP_CDP_COMMANDS:
+            try:
+                driver.execute_cdp_cmd(command, params)
+            except Exception:
+                continue
+
+    def print_summary(self):
+        """Pico y promedio de memoria de la corrida, y cuántas veces hubo que intervenir."""
+        if not self.samples:
+            return
+        print(
+            f"   🧠 Memoria del navegador: pico {max(self.samples):.0f} MB, "
+            f"promedio {sum(self.samples) / len(self.samples):.0f} MB ({len(self.samples)} muestras, "
+            f"{self.cleanups} limpiezas, {self.restarts} reinicios)"
+        )
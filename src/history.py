@@ -1,80 +1,625 @@
 import json
 import os
-from datetime import datetime, timedelta
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime
+from src.config import HISTORY_BACKEND, SHARDED, SHARD_INDEX
+from src.state_store import state_store
 
 # Definimos constantes para fácil configuración
-HISTORY_FILE = "seen_jobs.json" 
-DAYS_TO_REMEMBER = 30           
+HISTORY_FILE = "seen_jobs.json"             # Formato antiguo (solo se usa para migrar)
+HISTORY_DB_FILE = "seen_jobs.db"            # Backend SQLite (modo WAL)
+HISTORY_JOURNAL_FILE = "seen_jobs.journal"  # Backend diario append-only (JSON Lines)
+DAYS_TO_REMEMBER = 30
+PURGE_EVERY_SECONDS = 3600                  # Frecuencia máxima de purgas por TTL
+SECONDS_PER_DAY = 86400
+
+# Estado de cada oferta en el historial (de menor a mayor: un estado nunca se degrada)
+STATE_SCANNED = "scanned"     # Analizada por el bot sin match (solo sirve para el corte temprano)
+STATE_NOTIFIED = "notified"   # Enviada por Telegram
+STATE_ARCHIVED = "archived"   # Marcada como vista por el usuario ("ya lo vi")
+STATE_RANK = {STATE_SCANNED: 0, STATE_NOTIFIED: 1, STATE_ARCHIVED: 2}
+
+def merge_state(current_state, new_state):
+    """Retorna el estado más alto entre los dos (ej: 'archived' le gana a 'notified')."""
+    if current_state is None:
+        return new_state
+    return max(current_state, new_state, key=lambda state: STATE_RANK.get(state, 0))
+
+# Formas en que LinkedIn expone el ID numérico de una oferta:
+# /jobs/view/4353192033/, /jobs/view/frontend-dev-at-acme-4353192033,
+# ?currentJobId=4353192033, urn:li:jobPosting:4353192033, /jobPosting/4353192033
+JOB_ID_PATTERNS = [
+    re.compile(r"/jobs/view/(?:[^/?#]*?-)?(\d{6,})(?:[/?#]|$)"),
+    re.compile(r"[?&]currentJobId=(\d+)"),
+    re.compile(r"jobPosting[:/](\d+)"),
+]
+
+def extract_job_id(url):
+    """
+    Normalizador único de ofertas: extrae el ID numérico de LinkedIn de una URL
+    (o de un ID ya numérico). Retorna int, o None si no se reconoce ninguno.
+    """
+    if url is None:
+        return None
+    if isinstance(url, int):
+        return url
+
+    text = str(url).strip()
+    if text.isdigit():
+        return int(text)
+
+    for pattern in JOB_ID_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            return int(match.group(1))
+    return None
+
+def history_key(url):
+    """
+    Clave canónica con la que se guarda una oferta: el ID numérico si existe,
+    o la URL sin parámetros de rastreo para links que no son de LinkedIn.
+    """
+    job_id = extract_job_id(url)
+    if job_id is not None:
+        return str(job_id)
+    return str(url).split("?")[0]
+
+class SeenJobSet:
+    """
+    Conjunto compacto de IDs de ofertas, agrupado por día.
+
+    Cada día es un array('Q') ordenado (8 bytes por ID, sin objetos Python por entrada).
+    La búsqueda es una bisección por balde (como mucho DAYS_TO_REMEMBER + 1 baldes), y
+    la expiración descarta baldes completos sin recorrer fechas individuales.
+    """
+
+    def __init__(self):
+        self.buckets = {}  # día (epoch // 86400) -> array('Q') ordenado
+
+    @staticmethod
+    def _bucket_contains(bucket, job_id):
+        position = bisect_left(bucket, job_id)
+        return position < len(bucket) and bucket[position] == job_id
+
+    def _find_day(self, job_id):
+        for day, bucket in self.buckets.items():
+            if self._bucket_contains(bucket, job_id):
+                return day
+        return None
+
+    def __contains__(self, job_id):
+        return self._find_day(job_id) is not None
+
+    def __len__(self):
+        return sum(len(bucket) for bucket in self.buckets.values())
+
+    def add(self, job_id, seen_at):
+        """Agrega (o refresca) un ID en el balde del día de 'seen_at'."""
+        day = int(seen_at // SECONDS_PER_DAY)
+        previous_day = self._find_day(job_id)
+        if previous_day is not None:
+            if previous_day >= day:
+                return
+            # Visto de nuevo más tarde: lo movemos al balde más reciente
+            old_bucket = self.buckets[previous_day]
+            del old_bucket[bisect_left(old_bucket, job_id)]
+            if not old_bucket:
+                del self.buckets[previous_day]
+
+        bucket = self.buckets.setdefault(day, array("Q"))
+        bucket.insert(bisect_left(bucket, job_id), job_id)
+
+    def add_many(self, entries):
+        """
+        Carga masiva de (ID, timestamp): agrupa por día y arma cada balde con un solo sorted(),
+        en lugar de buscar e insertar ID por ID (así cargar cientos de miles de IDs es lineal).
+        Si un ID aparece varias veces, queda en el día más reciente.
+        """
+        latest_day = {}
+        for job_id, seen_at in entries:
+            day = int(seen_at // SECONDS_PER_DAY)
+            if latest_day.get(job_id, -1) < day:
+                latest_day[job_id] = day
+
+        if self.buckets:
+            # IDs que ya estaban: se ignoran si su día no es anterior, o se sacan del balde viejo
+            for job_id, day in list(latest_day.items()):
+                previous_day = self._find_day(job_id)
+                if previous_day is None:
+                    continue
+                if previous_day >= day:
+                    del latest_day[job_id]
+                    continue
+                old_bucket = self.buckets[previous_day]
+                del old_bucket[bisect_left(old_bucket, job_id)]
+                if not old_bucket:
+                    del self.buckets[previous_day]
+
+        ids_by_day = defaultdict(list)
+        for job_id, day in latest_day.items():
+            ids_by_day[day].append(job_id)
+        for day, job_ids in ids_by_day.items():
+            existing = self.buckets.get(day)
+            if existing is not None:
+                job_ids.extend(existing)
+            self.buckets[day] = array("Q", sorted(job_ids))
+
+    def expire(self, cutoff):
+        """Descarta los baldes de días completamente anteriores a 'cutoff' (epoch)."""
+        cutoff_day = int(cutoff // SECONDS_PER_DAY)
+        for day in [day for day in self.buckets if day < cutoff_day]:
+            del self.buckets[day]
+
+class SQLiteHistoryBackend:
+    """
+    Persistencia en SQLite (modo WAL).
+    Inserciones O(1) por clave primaria y purgas por TTL usando un índice sobre la fecha.
+    """
+
+    def __init__(self, path=HISTORY_DB_FILE):
+        self.path = path
+        # check_same_thread=False: el historial se comparte entre hilos (protegido por JobHistory)
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        # Los registros previos a la columna 'state' solo pudieron venir de un "ya lo vi": quedan como archivados
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS seen_jobs (job_key TEXT PRIMARY KEY, seen_at REAL NOT NULL, "
+            f"state TEXT NOT NULL DEFAULT '{STATE_ARCHIVED}')"
+        )
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(seen_jobs)")]
+        if "state" not in columns:
+            self.connection.execute(
+                f"ALTER TABLE seen_jobs ADD COLUMN state TEXT NOT NULL DEFAULT '{STATE_ARCHIVED}'"
+            )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS idx_seen_jobs_seen_at ON seen_jobs (seen_at)")
+        self.connection.commit()
+
+    def load(self, cutoff):
+        """Purga lo expirado y retorna un iterable de (clave, timestamp, estado) vigentes."""
+        self.purge(cutoff)
+        return self.connection.execute("SELECT job_key, seen_at, state FROM seen_jobs")
+
+    def load_since(self, since):
+        """Registros escritos (o actualizados) desde 'since' (epoch), incluso por otros procesos."""
+        return self.connection.execute("SELECT job_key, seen_at, state FROM seen_jobs WHERE seen_at >= ?", (since,))
+
+    def add_many(self, records):
+        """
+        Inserta (o actualiza) una lista de tuplas (clave, timestamp, estado) en una sola transacción.
+        El estado solo sube (scanned -> notified -> archived), nunca se degrada.
+        """
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO seen_jobs (job_key, seen_at, state) VALUES (?, ?, ?) "
+                "ON CONFLICT(job_key) DO UPDATE SET "
+                "seen_at = MAX(seen_at, excluded.seen_at), "
+                "state = CASE "
+                f"WHEN state = '{STATE_ARCHIVED}' OR excluded.state = '{STATE_ARCHIVED}' THEN '{STATE_ARCHIVED}' "
+                f"WHEN state = '{STATE_NOTIFIED}' OR excluded.state = '{STATE_NOTIFIED}' THEN '{STATE_NOTIFIED}' "
+                "ELSE excluded.state END",
+                records
+            )
+
+    def purge(self, cutoff):
+        """Elimina registros anteriores a 'cutoff' (epoch). Retorna cuántos borró."""
+        with self.connection:
+            cursor = self.connection.execute("DELETE FROM seen_jobs WHERE seen_at < ?", (cutoff,))
+        return cursor.rowcount
+
+    def close(self):
+        self.connection.close()
+
+
+class JournalHistoryBackend:
+    """
+    Persistencia en un diario append-only (una línea JSON por registro).
+
+    - Cada inserción agrega líneas al final del archivo (O(1), con fsync).
+    - Una línea incompleta al final (corte de luz a mitad de escritura) se ignora al cargar.
+    - La compactación reescribe solo los registros vigentes en un archivo temporal y lo
+      reemplaza de forma atómica (os.replace). Se hace cuando hay registros expirados
+      o cuando la basura acumulada supera a los registros vivos. Volver a agregar una clave
+      que ya estaba (ej: ofertas analizadas en cada ciclo) cuenta como basura.
+    """
+
+    def __init__(self, path=HISTORY_JOURNAL_FILE):
+        self.path = path
+        # Claves con al menos una línea vigente en el diario
+        self._live_keys = set()
+        self._live_count = 0
+        self._garbage_count = 0
+        self._oldest_seen_at = None
+        self._truncated_tail = False
+
+    def _read_entries(self):
+        """Lee el diario completo. Retorna ({clave: (timestamp, estado)}, cantidad de líneas)."""
+        entries = {}
+        line_count = 0
+        self._truncated_tail = False
+        if not os.path.exists(self.path):
+            return entries, line_count
+
+        with open(self.path, "r", encoding="utf-8") as file_handler:
+            for line in file_handler:
+                if not line.endswith("\n"):
+                    # Escritura interrumpida: hay que reescribir antes de volver a agregar líneas
+                    self._truncated_tail = True
+                try:
+                    record = json.loads(line)
+                    job_key = record["k"]
+                    # Líneas sin estado: formato anterior, solo venían de un "ya lo vi"
+                    state = record.get("s", STATE_ARCHIVED)
+                    previous = entries.get(job_key)
+                    if previous:
+                        entries[job_key] = (max(previous[0], record["t"]), merge_state(previous[1], state))
+                    else:
+                        entries[job_key] = (record["t"], state)
+                    line_count += 1
+                except (ValueError, KeyError, TypeError):
+                    continue  # Línea truncada o corrupta
+        return entries, line_count
+
+    def _write_lines(self, path, mode, records):
+        with open(path, mode, encoding="utf-8") as file_handler:
+            for job_key, seen_at, state in records:
+                file_handler.write(json.dumps({"k": job_key, "t": seen_at, "s": state}, ensure_ascii=False) + "\n")
+            file_handler.flush()
+            os.fsync(file_handler.fileno())
+
+    def _compact(self, entries):
+        # Escribimos en un temporal y lo reemplazamos: si se corta a mitad, el diario original sigue intacto
+        temp_path = self.path + ".tmp"
+        self._write_lines(temp_path, "w", self._as_records(entries))
+        os.replace(temp_path, self.path)
+        self._live_keys = set(entries)
+        self._live_count = len(entries)
+        self._garbage_count = 0
+        self._oldest_seen_at = min(seen_at for seen_at, _ in entries.values()) if entries else None
+
+    @staticmethod
+    def _as_records(entries):
+        return [(job_key, seen_at, state) for job_key, (seen_at, state) in entries.items()]
+
+    def load(self, cutoff):
+        entries, line_count = self._read_entries()
+        live_entries = {job_key: entry for job_key, entry in entries.items() if entry[0] >= cutoff}
+        self._live_keys = set(live_entries)
+        self._live_count = len(live_entries)
+        self._garbage_count = line_count - len(live_entries)
+        self._oldest_seen_at = min(seen_at for seen_at, _ in live_entries.values()) if live_entries else None
+        if self._truncated_tail or (self._garbage_count > 0 and self._garbage_count >= self._live_count):
+            self._compact(live_entries)
+        return self._as_records(live_entries)
+
+    def add_many(self, records):
+        if not records:
+            return
+        self._write_lines(self.path, "a", records)
+        for job_key, _, _ in records:
+            if job_key in self._live_keys:
+                # La línea anterior de esta clave queda obsoleta
+                self._garbage_count += 1
+            else:
+                self._live_keys.add(job_key)
+                self._live_count += 1
+        oldest_new = min(seen_at for _, seen_at, _ in records)
+        if self._oldest_seen_at is None or oldest_new < self._oldest_seen_at:
+            self._oldest_seen_at = oldest_new
+
+    def purge(self, cutoff):
+        """Compacta el diario si hay registros expirados o demasiada basura acumulada."""
+        has_expired = self._oldest_seen_at is not None and self._oldest_seen_at < cutoff
+        if not has_expired and self._garbage_count < max(self._live_count, 1000):
+            return 0
+        entries, line_count = self._read_entries()
+        live_entries = {job_key: entry for job_key, entry in entries.items() if entry[0] >= cutoff}
+        self._compact(live_entries)
+        return len(entries) - len(live_entries)
+
+    def close(self):
+        pass
+
+
+HISTORY_BACKENDS = {
+    "sqlite": SQLiteHistoryBackend,
+    "journal": JournalHistoryBackend,
+}
 
 class JobHistory:
     """
     Gestiona la persistencia de ofertas vistas para evitar duplicados.
+
+    Las ofertas se identifican por su ID numérico de LinkedIn (ver extract_job_id), así
+    la misma oferta alcanzada por distintas URLs cuenta una sola vez. Las consultas se
+    resuelven en memoria (SeenJobSet); la escritura se delega a un backend (SQLite o
+    diario append-only) que inserta en O(1) en lugar de reescribir todo.
+
+    Dentro de un ciclo, claim() reserva cada oferta para la primera URL que la encuentra
+    (las demás la saltean) y record_many() la persiste en lote al terminar cada URL.
+
+    En modo shards (SHARD_COUNT > 1) el backend es siempre SQLite, compartido por todos los
+    procesos: cada ciclo relee lo que escribieron los demás (refresh) y claim() reserva
+    además la oferta en el StateStore, para que dos shards no la notifiquen a la vez.
     """
-    
-    def __init__(self):
-        self.seen_jobs = {}
-        self.load()
+
+    def __init__(self, backend_name=HISTORY_BACKEND):
+        # Ofertas notificadas o archivadas (no se vuelven a enviar)
+        self.seen_ids = SeenJobSet()
+        # Ofertas analizadas sin match (solo para el corte temprano de paginación)
+        self.scanned_ids = SeenJobSet()
+        # Links sin ID de LinkedIn (raro, ej: ofertas externas archivadas a mano)
+        self.other_keys = {}
+        # Claves que el usuario archivó con "ya lo vi"
+        self.archived_keys = set()
+        # Ciclo actual: claves reservadas, y cuáles de ellas eran desconocidas al reservarlas
+        self.cycle_claimed = set()
+        self.cycle_new = set()
+        self.backend_name = backend_name
+        self.backend = None
+        self._lock = threading.RLock()
+        self._last_purge = 0
+        self._last_refresh = 0
+        # La base se abre recién en la primera consulta (importar el módulo no toca el disco)
+        self._loaded = False
+
+    def _create_backend(self):
+        if SHARDED and self.backend_name != "sqlite":
+            # El diario no admite escritores concurrentes: los shards comparten seen_jobs.db
+            print(f"⚠️ El backend '{self.backend_name}' no se puede compartir entre shards. Usando 'sqlite'.")
+            self.backend_name = "sqlite"
+        backend_class = HISTORY_BACKENDS.get(self.backend_name)
+        if backend_class is None:
+            print(f"⚠️ Backend de historial desconocido '{self.backend_name}'. Usando 'sqlite'.")
+            backend_class = SQLiteHistoryBackend
+        return backend_class()
+
+    def _cutoff(self):
+        return time.time() - DAYS_TO_REMEMBER * SECONDS_PER_DAY
+
+    def _remember(self, job_key, seen_at, state):
+        """Registra una clave en memoria (las claves antiguas por URL se normalizan al vuelo)."""
+        if state == STATE_ARCHIVED:
+            self.archived_keys.add(history_key(job_key))
+
+        job_id = extract_job_id(job_key)
+        if state == STATE_SCANNED:
+            if job_id is not None:
+                self.scanned_ids.add(job_id, seen_at)
+        elif job_id is not None:
+            self.seen_ids.add(job_id, seen_at)
+        else:
+            self.other_keys[job_key] = seen_at
+
+    def _remember_many(self, records):
+        """Como _remember, para muchos registros (carga inicial y relectura entre shards)."""
+        seen_entries = []
+        scanned_entries = []
+        for job_key, seen_at, state in records:
+            if state == STATE_ARCHIVED:
+                self.archived_keys.add(history_key(job_key))
+
+            job_id = extract_job_id(job_key)
+            if state == STATE_SCANNED:
+                if job_id is not None:
+                    scanned_entries.append((job_id, seen_at))
+            elif job_id is not None:
+                seen_entries.append((job_id, seen_at))
+            else:
+                self.other_keys[job_key] = seen_at
+        self.seen_ids.add_many(seen_entries)
+        self.scanned_ids.add_many(scanned_entries)
 
     def load(self):
         """
-        Carga el historial y purga registros más antiguos que DAYS_TO_REMEMBER.
+        Abre el backend, migra el JSON antiguo si existe, y carga los registros vigentes
+        (el backend purga lo más antiguo que DAYS_TO_REMEMBER).
+        """
+        with self._lock:
+            self._loaded = True
+            self._reset_memory()
+            try:
+                self.backend = self._create_backend()
+                self._migrate_legacy_json()
+                self._remember_many(self.backend.load(self._cutoff()))
+                self._last_purge = time.time()
+                self._last_refresh = self._last_purge
+            except Exception as e:
+                print(f"⚠️ Error cargando historial: {e}. Se iniciará uno nuevo.")
+                self._reset_memory()
+
+    def refresh(self):
+        """
+        Incorpora lo que otros shards escribieron desde la última lectura (solo backend SQLite).
+        Con un único proceso no hace falta: todo lo escribe esta misma instancia.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            if not hasattr(self.backend, "load_since"):
+                return
+            # Margen de unos segundos por escrituras que se cruzan con la lectura
+            since = self._last_refresh - 5
+            self._last_refresh = time.time()
+            try:
+                self._remember_many(self.backend.load_since(since))
+            except Exception as e:
+                print(f"⚠️ No se pudo releer el historial compartido: {e}")
+
+    def reopen(self):
+        """
+        Cierra el backend y olvida todo lo cargado: la próxima consulta abre el historial
+        del directorio actual desde cero (lo usa el benchmark, que corre cada motor en su carpeta).
+        """
+        with self._lock:
+            if self.backend is not None:
+                self.backend.close()
+            self.backend = None
+            self._loaded = False
+            self._reset_memory()
+            self.cycle_claimed = set()
+            self.cycle_new = set()
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.load()
+
+    def _reset_memory(self):
+        self.seen_ids = SeenJobSet()
+        self.scanned_ids = SeenJobSet()
+        self.other_keys = {}
+        self.archived_keys = set()
+
+    def _migrate_legacy_json(self):
+        """
+        Migración única desde seen_jobs.json (formato {url: fecha ISO}).
+        Tras importarlo se renombra a 'seen_jobs.json.migrated' para no repetir el proceso.
         """
         if not os.path.exists(HISTORY_FILE):
-            self.seen_jobs = {}
             return
 
         try:
             with open(HISTORY_FILE, "r", encoding="utf-8") as f:
                 data = json.load(f)
-                
-            # Limpieza de registros expirados
-            cleaned_data = {}
-            limit_date = datetime.now() - timedelta(days=DAYS_TO_REMEMBER)
-            
-            for url, date_str in data.items():
-                try:
-                    seen_date = datetime.fromisoformat(date_str)
-                    if seen_date > limit_date:
-                        cleaned_data[url] = date_str
-                except ValueError:
-                    continue 
-            
-            self.seen_jobs = cleaned_data
-            self.save() 
-
-        except (json.JSONDecodeError, Exception) as e:
-            print(f"⚠️ Error cargando historial: {e}. Se iniciará uno nuevo.")
-            self.seen_jobs = {}
-
-    def save(self):
-        """Persiste el historial en disco (JSON)."""
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"⚠️ No se pudo migrar {HISTORY_FILE}: {e}")
+            return
+
+        # El formato antiguo guardaba cada oferta hasta dos veces (URL completa y limpia)
+        records = {}
+        for url, date_str in data.items():
+            try:
+                seen_at = datetime.fromisoformat(date_str).timestamp()
+            except (ValueError, TypeError):
+                continue
+            job_key = history_key(url)
+            records[job_key] = max(seen_at, records.get(job_key, 0))
+
+        # Las ofertas del formato antiguo solo entraban con un "ya lo vi": quedan como archivadas
+        self.backend.add_many([(job_key, seen_at, STATE_ARCHIVED) for job_key, seen_at in records.items()])
+        os.replace(HISTORY_FILE, HISTORY_FILE + ".migrated")
+        print(f"   📦 Historial migrado a '{self.backend_name}': {len(records)} ofertas.")
+
+    def _maybe_purge(self):
+        """Purga por TTL como mucho una vez cada PURGE_EVERY_SECONDS."""
+        now = time.time()
+        if now - self._last_purge < PURGE_EVERY_SECONDS:
+            return
+        self._last_purge = now
+        cutoff = self._cutoff()
+        self.backend.purge(cutoff)
+        self.seen_ids.expire(cutoff)
+        self.scanned_ids.expire(cutoff)
+        self.other_keys = {job_key: seen_at for job_key, seen_at in self.other_keys.items() if seen_at >= cutoff}
+
+    def is_seen(self, url):
+        """Verifica si una oferta (URL o ID) ya fue notificada o archivada."""
+        job_id = extract_job_id(url)
+        self._ensure_loaded()
+        # Lock: varios workers consultan y agregan en paralelo
+        with self._lock:
+            if job_id is not None:
+                return job_id in self.seen_ids
+            return history_key(url) in self.other_keys
+
+    def is_known(self, url):
+        """Verifica si una oferta ya pasó por el bot en cualquier estado (incluso analizada sin match)."""
+        job_id = extract_job_id(url)
+        self._ensure_loaded()
+        with self._lock:
+            if job_id is not None and job_id in self.scanned_ids:
+                return True
+            return self.is_seen(url)
+
+    def is_archived(self, url):
+        """Verifica si el usuario ya archivó la oferta ("ya lo vi")."""
+        self._ensure_loaded()
+        with self._lock:
+            return history_key(url) in self.archived_keys and self.is_seen(url)
+
+    def seen_before_cycle(self, url):
+        """
+        Verifica si la oferta ya se conocía ANTES del ciclo actual.
+        Las que otra URL descubrió en este mismo ciclo no cuentan (siguen siendo novedades).
+        """
+        with self._lock:
+            return self.is_known(url) and history_key(url) not in self.cycle_new
+
+    def start_cycle(self):
+        """Olvida las reservas del ciclo anterior (llamar al empezar cada ciclo de búsqueda)."""
+        with self._lock:
+            self.cycle_claimed = set()
+            self.cycle_new = set()
+        if SHARDED:
+            self.refresh()
+            self._purge_shared_claims()
+
+    def claim(self, url):
+        """
+        Reserva una oferta para este ciclo de forma atómica.
+        Retorna False si ya fue notificada/archivada o si otra URL (u otro worker o shard) ya la reservó.
+        """
+        job_key = history_key(url)
+        with self._lock:
+            if job_key in self.cycle_claimed or self.is_seen(url):
+                return False
+            if SHARDED and not self._claim_shared(job_key):
+                return False
+            self.cycle_claimed.add(job_key)
+            if not self.is_known(url):
+                self.cycle_new.add(job_key)
+            return True
+
+    def _purge_shared_claims(self):
+        """
+        Borra las reservas vencidas entre shards (una vez por ciclo, también en corridas --once):
+        sin purga, job_claims crece con cada tarjeta de cada ciclo de cada shard.
+        """
         try:
-            with open(HISTORY_FILE, "w", encoding="utf-8") as f:
-                json.dump(self.seen_jobs, f, indent=4)
+            state_store.purge_claims()
         except Exception as e:
-            print(f"⚠️ No se pudo guardar el historial: {e}")
+            print(f"⚠️ No se pudieron purgar las reservas compartidas: {e}")
 
-    def is_seen(self, url):
-        """Verifica si una URL ya existe en el registro."""
-        # Limpiamos la URL de parámetros de rastreo (LinkedIn pone muchos ?refId=...)
-        # para que la comparación sea más efectiva.
-        clean_url = url.split("?")[0]
-        
-        # Chequeo flexible: si la URL limpia o la completa están en el historial.
-        return (url in self.seen_jobs) or (clean_url in self.seen_jobs)
-
-    def add_job(self, url):
-        """
-        Registra una URL con la fecha actual y guarda cambios.
-        """
-        # Guardamos la URL tal cual, y opcionalmente podríamos guardar la limpia también.
-        self.seen_jobs[url] = datetime.now().isoformat()
-        
-        clean_url = url.split("?")[0]
-        if clean_url != url:
-             self.seen_jobs[clean_url] = datetime.now().isoformat()
-             
-        self.save()
+    def _claim_shared(self, job_key):
+        try:
+            return state_store.try_claim(job_key, SHARD_INDEX, (STATE_NOTIFIED, STATE_ARCHIVED))
+        except Exception as e:
+            # Sin el almacén compartido seguimos solos (a lo sumo, un aviso duplicado)
+            print(f"⚠️ No se pudo reservar la oferta en el almacén compartido: {e}")
+            return True
+
+    def record_many(self, entries):
+        """
+        Registra varias ofertas [(URL o ID, estado)] en UNA sola escritura al backend.
+        """
+        if not entries:
+            return
+        now = time.time()
+        records = [(history_key(url), now, state) for url, state in entries]
+
+        self._ensure_loaded()
+        with self._lock:
+            for job_key, seen_at, state in records:
+                self._remember(job_key, seen_at, state)
+            try:
+                self.backend.add_many(records)
+                self._maybe_purge()
+            except Exception as e:
+                print(f"⚠️ No se pudo guardar el historial: {e}")
+
+    def add_job(self, url, state=STATE_ARCHIVED):
+        """
+        Registra una oferta (URL o ID) con la fecha actual (inserción incremental en el backend).
+        Por defecto como archivada: es lo que hace el "ya lo vi" de Telegram.
+        """
+        self.record_many([(url, state)])
 
 # Instancia global para usar en todo el proyecto
 history = JobHistory()
@@ -1,10 +1,23 @@
 
 import json
 import os
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from src.config import SHARDED
+from src.state_store import state_store
 
 # Nombre del archivo donde se guardarán las palabras clave de forma persistente
 KEYWORDS_FILE = "keywords.json"
 
+# Clave de las listas en el almacén compartido (modo shards: todos los procesos usan las mismas)
+KEYWORDS_STATE_KEY = "keywords"
+
+# Modo shards: segundos que se reutiliza la versión leída del almacén compartido antes de
+# volver a consultarla (un cambio hecho desde otro shard tarda como mucho esto en llegar)
+SHARED_VERSION_TTL_SECONDS = 5
+
 # Listas por defecto para cuando no existe el archivo (Primera ejecución)
 DEFAULT_SEARCH_KEYWORDS = [
     "desarrollo web", 
@@ -139,7 +152,11 @@ def load_keywords():
     Carga las palabras clave desde el archivo JSON.
     Si el archivo no existe, lo crea con los valores por defecto.
     Retorna un diccionario con las listas de positivas y negativas.
+    En modo shards se leen del almacén compartido (la primera vez se migran desde el archivo).
     """
+    if SHARDED:
+        return _load_shared_keywords()
+
     # Si el archivo no existe, lo creamos con los valores por defecto
     if not os.path.exists(KEYWORDS_FILE):
         default_data = {
@@ -161,6 +178,28 @@ def load_keywords():
             "negative_keywords": DEFAULT_NEGATIVE_KEYWORDS
         }
 
+def _load_shared_keywords():
+    keywords_data = state_store.get(KEYWORDS_STATE_KEY)
+    if keywords_data is not None:
+        return keywords_data
+
+    with state_store.transaction():
+        # Re-chequeo dentro de la transacción por si otro shard ya migró
+        keywords_data = state_store.get(KEYWORDS_STATE_KEY)
+        if keywords_data is None:
+            keywords_data = {
+                "search_keywords": DEFAULT_SEARCH_KEYWORDS,
+                "negative_keywords": DEFAULT_NEGATIVE_KEYWORDS
+            }
+            if os.path.exists(KEYWORDS_FILE):
+                try:
+                    with open(KEYWORDS_FILE, "r", encoding="utf-8") as file_handler:
+                        keywords_data = json.load(file_handler)
+                except Exception as error:
+                    print(f"Error cargando keywords: {error}")
+            state_store.set(KEYWORDS_STATE_KEY, keywords_data)
+    return keywords_data
+
 def save_keywords(keywords_data):
     """
     Guarda el diccionario de palabras clave en el archivo JSON.
@@ -168,79 +207,181 @@ def save_keywords(keywords_data):
     Args:
         keywords_data (dict): Diccionario con claves 'search_keywords' y 'negative_keywords'.
     """
+    if SHARDED:
+        state_store.set(KEYWORDS_STATE_KEY, keywords_data)
+        keyword_store.invalidate()
+        return
+
     with open(KEYWORDS_FILE, "w", encoding="utf-8") as file_handler:
         # ensure_ascii=False permite guardar tildes y caracteres especiales correctamente
         json.dump(keywords_data, file_handler, indent=4, ensure_ascii=False)
+    keyword_store.invalidate()
+
+# Foto inmutable de las listas vigentes. 'version' aumenta cada vez que el contenido cambia.
+KeywordSnapshot = namedtuple("KeywordSnapshot", ["version", "search_keywords", "negative_keywords"])
+
+class KeywordStore:
+    """
+    Almacén en memoria de las palabras clave (una instancia por proceso).
+
+    Evita abrir y parsear keywords.json en cada tarjeta: el archivo solo se vuelve a leer
+    si cambió su fecha de modificación o tamaño (edición externa), o si se invalidó
+    explícitamente desde add_*/remove_*_keyword (comandos de Telegram).
+    En modo shards la firma es la versión de las listas en el almacén compartido, así un
+    cambio hecho desde Telegram (shard 0) llega a todos los procesos; la versión se consulta
+    como mucho cada SHARED_VERSION_TTL_SECONDS, no en cada tarjeta.
+    """
+
+    def __init__(self, path=KEYWORDS_FILE):
+        self.path = path
+        self._lock = threading.RLock()
+        self._snapshot = None
+        self._file_signature = None
+        # (versión, instante de la consulta) del almacén compartido, en modo shards
+        self._shared_version = None
+
+    def _read_signature(self):
+        """Firma barata del archivo (mtime + tamaño) para detectar cambios sin leerlo."""
+        if SHARDED:
+            cached = self._shared_version
+            if cached is not None and time.monotonic() - cached[1] < SHARED_VERSION_TTL_SECONDS:
+                version = cached[0]
+            else:
+                version = state_store.version(KEYWORDS_STATE_KEY)
+                self._shared_version = (version, time.monotonic())
+            return ("shared", version) if version else None
+        try:
+            stat_result = os.stat(self.path)
+            return (stat_result.st_mtime_ns, stat_result.st_size)
+        except OSError:
+            return None
+
+    def snapshot(self):
+        """
+        Retorna la foto vigente (KeywordSnapshot), recargando desde disco solo si hace falta.
+        """
+        signature = self._read_signature()
+        current = self._snapshot
+        if current is not None and signature is not None and signature == self._file_signature:
+            return current
+
+        # La lectura se hace FUERA de self._lock: en modo shards toma el lock del StateStore, y
+        # keywords_transaction() los toma al revés (StateStore -> invalidate()), lo que podría trabarse.
+        # Si otro hilo recarga a la vez, ambos leen lo mismo y el primero en tomar el lock gana.
+        keywords_data = load_keywords()
+        if signature is None:
+            # load_keywords() pudo haber creado el archivo (o la clave compartida): firma recién ahora
+            signature = self._read_signature()
+        search_keywords = tuple(keywords_data.get("search_keywords", DEFAULT_SEARCH_KEYWORDS))
+        negative_keywords = tuple(keywords_data.get("negative_keywords", DEFAULT_NEGATIVE_KEYWORDS))
+
+        with self._lock:
+            previous = self._snapshot
+            if previous is not None and (search_keywords, negative_keywords) == (previous.search_keywords, previous.negative_keywords):
+                # El archivo se tocó pero el contenido es el mismo: conservamos la versión
+                new_snapshot = previous
+            else:
+                version = previous.version + 1 if previous is not None else 1
+                new_snapshot = KeywordSnapshot(version, search_keywords, negative_keywords)
+
+            self._snapshot = new_snapshot
+            # Firma tomada ANTES de leer: si algo cambió mientras tanto, la próxima llamada recarga
+            self._file_signature = signature
+            return new_snapshot
+
+    def invalidate(self):
+        """Fuerza una recarga en el próximo snapshot() (usado tras guardar cambios)."""
+        with self._lock:
+            self._file_signature = None
+            self._shared_version = None
+
+# Instancia global para usar en todo el proyecto
+keyword_store = KeywordStore()
+
+# Serializa las ediciones (leer, modificar y guardar) entre hilos de este proceso
+_edit_lock = threading.Lock()
+
+@contextmanager
+def keywords_transaction():
+    """Bloque atómico para editar las listas: entre hilos y, en modo shards, también entre procesos."""
+    with _edit_lock:
+        if SHARDED:
+            with state_store.transaction():
+                yield
+        else:
+            yield
 
 def get_positive_keywords():
     """Retorna la lista actual de palabras clave POSITIVAS."""
-    keywords_data = load_keywords()
-    return keywords_data.get("search_keywords", DEFAULT_SEARCH_KEYWORDS)
+    return list(keyword_store.snapshot().search_keywords)
 
 def get_negative_keywords():
     """Retorna la lista actual de palabras clave NEGATIVAS."""
-    keywords_data = load_keywords()
-    return keywords_data.get("negative_keywords", DEFAULT_NEGATIVE_KEYWORDS)
+    return list(keyword_store.snapshot().negative_keywords)
 
 def add_positive_keyword(new_word):
     """
     Agrega una nueva palabra clave positiva.
     Retorna True si se agregó, False si ya existía.
     """
-    keywords_data = load_keywords()
-    current_list = keywords_data.get("search_keywords", [])
+    with keywords_transaction():
+        keywords_data = load_keywords()
+        current_list = keywords_data.get("search_keywords", [])
     
-    # Normalizamos a minúsculas y quitamos espacios extra
-    normalized_word = new_word.lower().strip()
+        # Normalizamos a minúsculas y quitamos espacios extra
+        normalized_word = new_word.lower().strip()
     
-    if normalized_word not in current_list:
-        current_list.append(normalized_word)
-        keywords_data["search_keywords"] = current_list
-        save_keywords(keywords_data)
-        return True
-    return False
+        if normalized_word not in current_list:
+            current_list.append(normalized_word)
+            keywords_data["search_keywords"] = current_list
+            save_keywords(keywords_data)
+            return True
+        return False
 
 def add_negative_keyword(new_word):
     """
     Agrega una nueva palabra clave negativa.
     Retorna True si se agregó, False si ya existía.
     """
-    keywords_data = load_keywords()
-    current_list = keywords_data.get("negative_keywords", [])
+    with keywords_transaction():
+        keywords_data = load_keywords()
+        current_list = keywords_data.get("negative_keywords", [])
     
-    normalized_word = new_word.lower().strip()
+        normalized_word = new_word.lower().strip()
     
-    if normalized_word not in current_list:
-        current_list.append(normalized_word)
-        keywords_data["negative_keywords"] = current_list
-        save_keywords(keywords_data)
-        return True
-    return False
+        if normalized_word not in current_list:
+            current_list.append(normalized_word)
+            keywords_data["negative_keywords"] = current_list
+            save_keywords(keywords_data)
+            return True
+        return False
 
 def remove_positive_keyword(word_to_remove):
     """Elimina una palabra clave positiva."""
-    keywords_data = load_keywords()
-    current_list = keywords_data.get("search_keywords", [])
+    with keywords_transaction():
+        keywords_data = load_keywords()
+        current_list = keywords_data.get("search_keywords", [])
     
-    normalized_word = word_to_remove.lower().strip()
+        normalized_word = word_to_remove.lower().strip()
     
-    if normalized_word in current_list:
-        current_list.remove(normalized_word)
-        keywords_data["search_keywords"] = current_list
-        save_keywords(keywords_data)
-        return True
-    return False
+        if normalized_word in current_list:
+            current_list.remove(normalized_word)
+            keywords_data["search_keywords"] = current_list
+            save_keywords(keywords_data)
+            return True
+        return False
 
 def remove_negative_keyword(word_to_remove):
     """Elimina una palabra clave negativa."""
-    keywords_data = load_keywords()
-    current_list = keywords_data.get("negative_keywords", [])
+    with keywords_transaction():
+        keywords_data = load_keywords()
+        current_list = keywords_data.get("negative_keywords", [])
     
-    normalized_word = word_to_remove.lower().strip()
+        normalized_word = word_to_remove.lower().strip()
     
-    if normalized_word in current_list:
-        current_list.remove(normalized_word)
-        keywords_data["negative_keywords"] = current_list
-        save_keywords(keywords_data)
-        return True
-    return False
+        if normalized_word in current_list:
+            current_list.remove(normalized_word)
+            keywords_data["negative_keywords"] = current_list
+            save_keywords(keywords_data)
+            return True
+        return False
@@ -3,10 +3,118 @@ import os
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.action_chains import ActionChains
+from selenium.common.exceptions import StaleElementReferenceException
+from selenium.webdriver.support import expected_conditions as EC
+import math
 import time
-from src.config import JOB_SEARCH_URLS
-from src.keywords_manager import get_positive_keywords, get_negative_keywords
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from src.config import JOB_SEARCH_URLS, PAGE_LOAD_TIMEOUT, PAGE_WEIGHT_STATS, PAGINATION_MODE, RECORD_DIR, SCROLL_MAX_SECONDS, SCROLL_POLL_SECONDS, SCROLL_STABLE_POLLS
+from src.driver import measure_page_weight, get_browser_memory_mb
+from src.governor import ResourceGovernor
+from src.history import extract_job_id
 from src.listener import check_telegram_replies
+from src.metrics import metrics
+from src.replay import PageRecorder
+
+# Grabación de páginas para el replay offline (solo si RECORD_DIR está configurado)
+page_recorder = PageRecorder(RECORD_DIR) if RECORD_DIR else None
+
+# Extracción masiva de tarjetas: UN solo viaje al navegador por página.
+# Devuelve registros planos (strings) para que el resto del pipeline no toque WebDriver.
+# textContent no fuerza layout (a diferencia de .text / innerText).
+JOB_CARDS_SCRIPT = """
+const pickText = (root, selectors) => {
+    for (const selector of selectors) {
+        const node = root.querySelector(selector);
+        if (node && node.textContent.trim()) return node.textContent;
+    }
+    return "";
+};
+const records = [];
+for (const card of document.querySelectorAll("div.job-card-container")) {
+    const link = card.querySelector("a.job-card-container__link, a.job-card-list__title--link");
+    if (!link) continue;
+    // El link trae el título visible (aria-hidden) y una copia para lectores de pantalla: usamos el visible
+    const visibleTitle = link.querySelector("[aria-hidden='true']");
+    const holder = card.closest("[data-occludable-job-id]");
+    records.push({
+        job_id: card.getAttribute("data-job-id") || (holder ? holder.getAttribute("data-occludable-job-id") : null),
+        title: (visibleTitle || link).textContent,
+        href: link.href,
+        company: pickText(card, [".artdeco-entity-lockup__subtitle", ".job-card-container__primary-description", ".job-card-container__company-name"]),
+        location: pickText(card, [".job-card-container__metadata-wrapper li", ".job-card-container__metadata-item", ".artdeco-entity-lockup__caption"])
+    });
+}
+return records;
+"""
+
+# Un paso de scroll sobre la lista de resultados + estado de carga.
+# LinkedIn renderiza un <li data-occludable-job-id> por oferta desde el inicio, pero el contenido
+# (div.job-card-container) solo aparece al acercarse al viewport: comparamos ambas cantidades.
+SCROLL_STEP_SCRIPT = """
+const firstCard = document.querySelector("div.job-card-container, li[data-occludable-job-id]");
+let container = document.querySelector(".jobs-search-results-list");
+if (!container && firstCard) {
+    container = firstCard.parentElement;
+    while (container && container.scrollHeight <= container.clientHeight + 1) {
+        container = container.parentElement;
+    }
+}
+if (!container) container = document.scrollingElement || document.documentElement;
+container.scrollTop = container.scrollTop + Math.max(container.clientHeight * 0.8, 300);
+return {
+    loaded: document.querySelectorAll("div.job-card-container").length,
+    expected: document.querySelectorAll("li[data-occludable-job-id]").length,
+    at_bottom: container.scrollTop + container.clientHeight >= container.scrollHeight - 2
+};
+"""
+
+# Cantidad de ofertas por página en los resultados de LinkedIn
+JOB_PAGE_SIZE = 25
+
+# Límite de seguridad de páginas por búsqueda
+MAX_PAGES = 30
+
+# Selectores usados por las esperas de navegación y paginación
+RESULTS_SELECTOR = "div.job-card-container, li[data-occludable-job-id]"
+NEXT_BUTTON_SELECTOR = "button.jobs-search-pagination__button--next"
+PREVIOUS_BUTTON_SELECTOR = "button.jobs-search-pagination__button--previous"
+
+# Identificador de la página actual: URL (LinkedIn agrega &start=N) + indicador de página activo
+PAGE_LABEL_SCRIPT = """
+const active = document.querySelector(".jobs-search-pagination__indicator-button--active, .artdeco-pagination__indicator--number.active, button[aria-current='true']");
+return location.href + "|" + (active ? active.textContent.trim() : "");
+"""
+
+# Total de páginas de la búsqueda según el paginador ("Página 1 de 40" o el último indicador numérico)
+PAGE_COUNT_SCRIPT = """
+const state = document.querySelector(".jobs-search-pagination__page-state");
+const numbers = state ? state.textContent.match(/\\d+/g) : null;
+if (numbers) return parseInt(numbers[numbers.length - 1], 10);
+const indicators = document.querySelectorAll(".jobs-search-pagination__indicator-button, .artdeco-pagination__indicator--number");
+for (let i = indicators.length - 1; i >= 0; i--) {
+    const value = parseInt(indicators[i].textContent.trim(), 10);
+    if (!isNaN(value)) return value;
+}
+return null;
+"""
+
+# Total de resultados que informa el encabezado de la lista ("1.234 resultados" / "1,234 results")
+RESULT_COUNT_SCRIPT = """
+const header = document.querySelector(".jobs-search-results-list__subtitle, .jobs-search-results-list__text, .jobs-search-results-list__title-heading small");
+const match = header ? header.textContent.match(/\\d[\\d.,\\s]*/) : null;
+if (!match) return null;
+const value = parseInt(match[0].replace(/\\D/g, ""), 10);
+return isNaN(value) ? null : value;
+"""
+
+def results_page_url(base_url, page_num):
+    """URL directa a una página de resultados (LinkedIn pagina con &start=N, de a JOB_PAGE_SIZE)."""
+    parts = urlsplit(base_url)
+    query = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True) if key != "start"]
+    if page_num > 1:
+        query.append(("start", str((page_num - 1) * JOB_PAGE_SIZE)))
+    return urlunsplit(parts._replace(query=urlencode(query)))
 
 class LinkedInBot(BaseBot):
     """
@@ -25,238 +133,504 @@ class LinkedInBot(BaseBot):
     2. Las cookies quedan guardadas en la carpeta 'profile'.
     3. En futuras ejecuciones, el bot ya entra 'logueado'.
     """
-    
+
+    def __init__(self, driver, driver_manager=None):
+        super().__init__(driver)
+        # Memoria del navegador entre páginas/URLs; con DriverManager puede reiniciar Chrome a mitad de la corrida
+        self.governor = ResourceGovernor(driver_manager)
+
     def login(self):
         # Al usar perfil persistente, asumimos que ya está logueado o que 
         # el usuario lo hará manualmente si es necesario la primera vez.
         print("   ℹ️  Usando sesión de LinkedIn del perfil persistente.")
         pass
 
-    def search(self):
+    def page_timeout(self):
+        """Tiempo máximo de espera de carga (el doble en Android, que es más lento)."""
+        return PAGE_LOAD_TIMEOUT * (2 if "ANDROID_ROOT" in os.environ else 1)
+
+    def pagination_state(self):
         """
-        Itera sobre las URLs configuradas y extrae ofertas.
+        Foto del estado actual de la paginación: (primer resultado, etiqueta de página).
+        Se toma ANTES de hacer clic para luego detectar el cambio de página.
         """
-        # Notificación al iniciar el módulo LinkedIn
+        results = self.driver.find_elements(By.CSS_SELECTOR, RESULTS_SELECTOR)
+        try:
+            page_label = self.driver.execute_script(PAGE_LABEL_SCRIPT)
+        except Exception:
+            page_label = None
+        return (results[0] if results else None, page_label)
 
+    def wait_for_results(self, step_name, fallback_sleep=None):
+        """Espera a que haya al menos un resultado en la lista."""
+        condition = EC.presence_of_element_located((By.CSS_SELECTOR, RESULTS_SELECTOR))
+        return self.wait_for(condition, step_name, timeout=self.page_timeout(), fallback_sleep=fallback_sleep)
 
-        total_cards_seen = 0
-        consecutive_low_yield_pages = 0
+    def wait_for_page_change(self, previous_state, step_name, fallback_sleep=None):
+        """
+        Espera a que la página de resultados cambie tras un clic de paginación:
+        la lista anterior quedó obsoleta (stale) o cambió la página activa,
+        y el primer resultado de la nueva página ya está presente.
+        """
+        old_first_result, old_page_label = previous_state
 
-        for url_index, base_url in enumerate(JOB_SEARCH_URLS):
-            print(f"\n   🌍 [LinkedIn] Iniciando Búsqueda #{url_index + 1}")
-            print(f"   🔗 URL: {base_url}")
-            
+        def page_changed(driver):
+            changed = False
+            if old_first_result is not None:
+                try:
+                    old_first_result.is_enabled()
+                except StaleElementReferenceException:
+                    changed = True
+            if not changed and old_page_label is not None:
+                changed = driver.execute_script(PAGE_LABEL_SCRIPT) != old_page_label
+            return changed and len(driver.find_elements(By.CSS_SELECTOR, RESULTS_SELECTOR)) > 0
+
+        return self.wait_for(page_changed, step_name, timeout=self.page_timeout(), fallback_sleep=fallback_sleep)
+
+    def load_results_page(self):
+        """
+        Scroll adaptativo: avanza sobre el contenedor de resultados y consulta cuántas
+        tarjetas ya se cargaron. Termina cuando se cargaron todas las esperadas (o JOB_PAGE_SIZE),
+        o cuando la cantidad se mantiene estable al llegar al fondo. SCROLL_MAX_SECONDS es el tope duro.
+        Retorna los segundos que tardó la carga.
+        """
+        is_android = "ANDROID_ROOT" in os.environ
+        poll_interval = SCROLL_POLL_SECONDS * (2 if is_android else 1)
+
+        start_time = time.perf_counter()
+        deadline = start_time + SCROLL_MAX_SECONDS
+        last_loaded = -1
+        stable_polls = 0
+        status = {"loaded": 0, "expected": 0, "at_bottom": False}
+        stop_reason = "tope de tiempo"
+
+        print("      ⬇️ Scroll adaptativo sobre la lista de resultados...")
+        while time.perf_counter() < deadline:
             try:
-                # Chequeo de comandos ANTES de empezar nueva ronda
-                check_telegram_replies()
-                
-                print("   🌐 Navegando...")
-                self.driver.get(base_url)
-                time.sleep(5) # Espera inicial
+                status = self.driver.execute_script(SCROLL_STEP_SCRIPT) or status
+            except Exception as e:
+                # Si el script falla, volvemos al método clásico de teclado
+                print(f"   ⚠️ Error en scroll adaptativo: {e}. Usando teclado.")
+                try:
+                    self.driver.find_element(By.TAG_NAME, 'body').send_keys(Keys.PAGE_DOWN)
+                except Exception:
+                    pass
 
-                page_num = 1
-                max_pages = 30 # Límite de seguridad
-                
-                fix_applied = False
-                
-                while page_num <= max_pages:
-                    # =========================================================================
-                    # TÉCNICA: DESBLOQUEO DE SCROLL (Ida y Vuelta)
-                    # =========================================================================
-                    # Problema: En la primera página, a veces LinkedIn detiene la carga dinámica.
-                    # Solución: Ir a Pág 2 -> Volver a Pág 1 -> Resetear posición.
-                    # =========================================================================
-                    if page_num == 1 and not fix_applied:
-                        try:
-                            # Detectar entorno
-                            is_android = "ANDROID_ROOT" in os.environ
-                            maniobra_msg = "🔄 Aplicando Técnica de Desbloqueo..."
-                            print(f"      {maniobra_msg}")
-                            
-                            # 1. Bajar al fondo
-                            self.driver.find_element(By.TAG_NAME, 'body').send_keys(Keys.END)
-                            time.sleep(2)
-                            
-                            # 2. Click 'Siguiente'
-                            next_btn = self.driver.find_element(By.CSS_SELECTOR, "button.jobs-search-pagination__button--next")
-                            
-                            if is_android:
-                                # Force Click (JS)
-                                self.driver.execute_script("arguments[0].click();", next_btn)
-                            else:
-                                # Normal Click
-                                next_btn.click()
-                                
-                            wait_time = 8 if is_android else 4
-                            time.sleep(wait_time)
-                            
-                            # 3. Scrollear un poco en Pág 2
-                            body = self.driver.find_element(By.TAG_NAME, 'body')
-                            for _ in range(5):
-                                body.send_keys(Keys.PAGE_DOWN)
-                                time.sleep(0.5)
-                            time.sleep(1)
-                            
-                            # 4. Click 'Anterior' para volver a Pág 1
-                            prev_btn = self.driver.find_element(By.CSS_SELECTOR, "button.jobs-search-pagination__button--previous")
-                            
-                            if is_android:
-                                # Force Click (JS)
-                                self.driver.execute_script("arguments[0].click();", prev_btn)
-                            else:
-                                # Normal Click
-                                prev_btn.click()
-                                
-                            print("      🔙 Volviendo a Pág 1...")
-                            wait_time = 8 if is_android else 4
-                            time.sleep(wait_time)
-                            
-                            # Asegurar que estamos arriba del todo al volver
-                            body = self.driver.find_element(By.TAG_NAME, 'body')
-                            for _ in range(3):
-                                body.send_keys(Keys.PAGE_UP)
-                                time.sleep(0.5)
+            loaded = status.get("loaded", 0)
+            expected = status.get("expected", 0) or JOB_PAGE_SIZE
 
-                            fix_applied = True
-                        except Exception as e:
-                            print(f"      ⚠️ No se pudo realizar la maniobra 1->2->1: {e}")
+            if loaded >= expected:
+                stop_reason = "lista completa"
+                break
 
-                            # Si falla, marcamos como hecho para no quedarnos en un bucle infinito
-                            fix_applied = True
+            if loaded == last_loaded:
+                stable_polls += 1
+            else:
+                stable_polls = 0
+                last_loaded = loaded
 
-                    # Chequeo de comandos EN CADA PÁGINA
-                    check_telegram_replies()
-                    
-                    print(f"\n   📄 [LinkedIn #{url_index + 1}] Procesando PÁGINA {page_num}...")
-                    
-                    # --- SCROLL GLOBAL CON TECLADO (El ganador 🏆) ---
-                    # Probado que funciona mejor: enviar PAGE_DOWN al body directamente.
+            if status.get("at_bottom") and stable_polls >= SCROLL_STABLE_POLLS:
+                stop_reason = "sin cambios al fondo"
+                break
+
+            time.sleep(poll_interval)
+
+        elapsed = time.perf_counter() - start_time
+        self.record_step("scroll", elapsed)
+        print(f"      ⏱️ Página cargada en {elapsed:.1f}s ({status.get('loaded', 0)} tarjetas, {stop_reason})")
+        return elapsed
+
+    def report_page_weight(self):
+        """
+        (PAGE_WEIGHT_STATS) Muestra cuántos bytes transfirió la página actual y cuánta
+        memoria usa el navegador. Como LinkedIn pagina sin recargar el documento, los
+        contadores de la Performance API se acumulan: informamos la diferencia con la página anterior.
+        """
+        weight = measure_page_weight(self.driver)
+        if not weight:
+            return
+
+        previous = getattr(self, "_last_page_weight", None)
+        page_bytes = weight["bytes"]
+        page_requests = weight["requests"]
+        if previous and previous["time_origin"] == weight["time_origin"]:
+            page_bytes -= previous["bytes"]
+            page_requests -= previous["requests"]
+        self._last_page_weight = weight
+
+        browser_mb = get_browser_memory_mb(self.driver)
+        heap_mb = weight["js_heap"] / (1024 * 1024) if weight.get("js_heap") else None
+        print(
+            f"      📦 Página: {page_bytes / 1024:.0f} KB en {page_requests} requests"
+            + (f" | heap JS {heap_mb:.0f} MB" if heap_mb is not None else "")
+            + (f" | navegador {browser_mb:.0f} MB" if browser_mb is not None else "")
+        )
+
+    def govern_memory(self):
+        """
+        Consulta al ResourceGovernor (entre páginas y entre URLs).
+        Retorna True si la página actual se descartó (limpieza o reinicio de Chrome):
+        en ese caso hay que volver a navegar a la página de resultados que sigue.
+        """
+        driver, action = self.governor.enforce(self.driver, url_index=self.current_url_index, page=self.current_page)
+        if driver is not self.driver:
+            self.set_driver(driver)
+        return action is not None
+
+    def extract_job_cards(self):
+        """
+        Extrae todas las tarjetas de la página actual con un único execute_script.
+        Retorna una lista de dicts: job_id (int o None), title, href, company, location.
+        """
+        start_time = time.perf_counter()
+        try:
+            raw_records = self.driver.execute_script(JOB_CARDS_SCRIPT) or []
+        except Exception as e:
+            print(f"   ⚠️ Error extrayendo tarjetas: {e}")
+            return []
+
+        job_records = []
+        for raw_record in raw_records:
+            href = raw_record.get("href")
+            job_records.append({
+                "job_id": extract_job_id(raw_record.get("job_id")) or extract_job_id(href),
+                "title": raw_record.get("title") or "",
+                "href": href,
+                "company": " ".join((raw_record.get("company") or "").split()),
+                "location": " ".join((raw_record.get("location") or "").split()),
+            })
+
+        self.record_step("extraccion", time.perf_counter() - start_time)
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        print(f"      ⚡ {len(job_records)} tarjetas extraídas en {elapsed_ms:.0f} ms (1 llamada a WebDriver)")
+        return job_records
+
+    def search(self, urls=None, url_indexes=None):
+        """
+        Itera sobre las URLs configuradas (o las indicadas) y extrae ofertas.
+        'url_indexes' conserva la numeración de JOB_SEARCH_URLS cuando solo se recorren
+        algunas URLs (las que el planificador marcó como pendientes).
+        """
+        search_urls = JOB_SEARCH_URLS if urls is None else urls
+        if url_indexes is None:
+            url_indexes = range(len(search_urls))
+        self.start_run()
+
+        for url_index, base_url in zip(url_indexes, search_urls):
+            if not self.search_url(url_index, base_url):
+                # Salimos de search() completamente (posible sesión caída)
+                self.aborted = True
+                break
+
+        self.finish_run()
+
+    def start_run(self):
+        """Reinicia los contadores de una corrida (una o varias URLs con el mismo navegador)."""
+        self.total_cards_seen = 0
+        self.consecutive_low_yield_pages = 0
+        self.aborted = False
+        # Una entrada por URL: páginas recorridas, motivo de corte y páginas ahorradas
+        self.url_reports = []
+        self.pipeline.reset_stats()
+
+    def finish_run(self):
+        """Resumen de tiempos y diagnóstico de sesión al terminar la corrida."""
+        self.print_run_summary()
+        if self.aborted:
+            return
+
+        # --- DIAGNÓSTICO DE SESIÓN ---
+        print(f"\n📊 Total de ofertas analizadas en esta corrida: {self.total_cards_seen}")
+        if self.total_cards_seen < 10:
+            msg = (
+                f"⚠️ <b>POSIBLE SESIÓN CERRADA</b>\n"
+                f"Solo encontré <b>{self.total_cards_seen} ofertas</b> en total.\n"
+                f"Por favor entra al servidor y verifica si LinkedIn pide login o captcha."
+            )
+            self.notify(msg)
+
+    def print_run_summary(self):
+        """Cierra el pipeline (vacía la cola y detiene sus hilos) e imprime los resúmenes de la corrida."""
+        self.pipeline.close()
+        self.print_step_summary()
+        self.pipeline.print_summary()
+        self.print_url_reports()
+        self.governor.print_summary()
+
+    def total_pages(self):
+        """Total de páginas que informa el paginador, o None si no se puede leer."""
+        try:
+            return self.driver.execute_script(PAGE_COUNT_SCRIPT)
+        except Exception:
+            return None
+
+    def result_count(self):
+        """Total de resultados que informa el encabezado de la búsqueda, o None si no se puede leer."""
+        try:
+            return self.driver.execute_script(RESULT_COUNT_SCRIPT)
+        except Exception:
+            return None
+
+    def plan_pages(self):
+        """
+        Páginas a recorrer en modo offset, calculadas en la primera página con el total de resultados
+        (o, si el encabezado no está, con el paginador). None si no hay forma de saberlo.
+        """
+        total_results = self.result_count()
+        if total_results is not None:
+            planned_pages = min(max(1, math.ceil(total_results / JOB_PAGE_SIZE)), MAX_PAGES)
+            print(f"   📐 {total_results} resultados -> {planned_pages} página(s)")
+            return planned_pages
+        total_pages = self.total_pages()
+        if total_pages:
+            print(f"   📐 Sin total de resultados; el paginador indica {total_pages} página(s)")
+            return min(total_pages, MAX_PAGES)
+        print("   📐 No se pudo calcular la cantidad de páginas; se avanza hasta una página vacía.")
+        return None
+
+    def print_url_reports(self):
+        """Imprime por URL las páginas recorridas y por qué se dejó de paginar."""
+        if not getattr(self, "url_reports", None):
+            return
+        print("   🧭 Paginación por búsqueda:")
+        for report in self.url_reports:
+            saved = f", ahorradas: {report['pages_saved']}" if report["pages_saved"] else ""
+            planned = f" de {report['planned_pages']}" if report.get("planned_pages") else ""
+            print(f"      - #{report['url_index'] + 1}: {report['pages']}{planned} página(s), corte: {report['stop_reason']}{saved}, nuevas: {report['new_jobs']}")
+
+    def search_url(self, url_index, base_url):
+        """
+        Recorre todas las páginas de UNA búsqueda.
+        Retorna False si se detectó un posible bloqueo (hay que detener la corrida), True en otro caso.
+        """
+        print(f"\n   🌍 [LinkedIn] Iniciando Búsqueda #{url_index + 1}")
+        url_started_at = time.perf_counter()
+        self.current_url_index = url_index
+        self.current_page = None
+        self.url_new_jobs = 0
+        page_num = 0
+        max_pages = MAX_PAGES
+        planned_pages = None
+        pages_saved = 0
+        stop_reason = "error"
+        print(f"   🔗 URL: {base_url}")
+        
+        try:
+            # Comandos de Telegram ya recibidos ANTES de empezar nueva ronda (no espera a la red)
+            check_telegram_replies()
+            
+            # Memoria del navegador antes de empezar (la página anterior se descarta de todos modos)
+            self.govern_memory()
+
+            print("   🌐 Navegando...")
+            metrics.mark_navigation()
+            self.driver.get(base_url)
+            # Espera inicial: hasta que aparezca el primer resultado (sleep fijo solo como respaldo)
+            self.wait_for_results("navegacion", fallback_sleep=5)
+
+            page_num = 1
+            
+            # En modo offset no hay maniobra: la página 1 ya cargada alcanza para planificar el resto
+            fix_applied = PAGINATION_MODE == "offset"
+            if PAGINATION_MODE == "offset":
+                planned_pages = self.plan_pages()
+            
+            while page_num <= max_pages:
+                # =========================================================================
+                # TÉCNICA: DESBLOQUEO DE SCROLL (Ida y Vuelta)
+                # =========================================================================
+                # Problema: En la primera página, a veces LinkedIn detiene la carga dinámica.
+                # Solución: Ir a Pág 2 -> Volver a Pág 1 -> Resetear posición.
+                # =========================================================================
+                if page_num == 1 and not fix_applied:
                     try:
-                        print("      ⬇️ Scrolleando con teclado (Global)...")
+                        # Detectar entorno
+                        is_android = "ANDROID_ROOT" in os.environ
+                        maniobra_msg = "🔄 Aplicando Técnica de Desbloqueo..."
+                        print(f"      {maniobra_msg}")
                         
-                        # Intento de foco: click en el contenedor de resultados (ayuda en página 1)
-                        try:
-                            self.driver.find_element(By.CSS_SELECTOR, ".jobs-search-results-list").click()
-                        except:
-                            pass
-
-                        body = self.driver.find_element(By.TAG_NAME, 'body')
+                        # 1. Bajar al fondo (hasta que el botón 'Siguiente' sea clickeable)
+                        self.driver.find_element(By.TAG_NAME, 'body').send_keys(Keys.END)
+                        self.wait_for(
+                            EC.element_to_be_clickable((By.CSS_SELECTOR, NEXT_BUTTON_SELECTOR)),
+                            "desbloqueo_fondo", timeout=self.page_timeout(), fallback_sleep=2
+                        )
                         
-                        # 20 pulsaciones de PAGE_DOWN para asegurar carga profunda (Fuerza bruta)
-                        # Ajustamos velocidad para Android
-                        is_android = "ANDROID_ROOT" in os.environ
-                        scroll_wait = 2.0 if is_android else 1.5
-                        final_wait = 5 if is_android else 3
+                        # 2. Click 'Siguiente'
+                        next_btn = self.driver.find_element(By.CSS_SELECTOR, NEXT_BUTTON_SELECTOR)
+                        previous_state = self.pagination_state()
                         
-                        for k in range(20): 
-                            body.send_keys(Keys.PAGE_DOWN)
-                            time.sleep(scroll_wait) # Espera para carga de contenido (lazy loading)
+                        if is_android:
+                            # Force Click (JS)
+                            self.driver.execute_script("arguments[0].click();", next_btn)
+                        else:
+                            # Normal Click
+                            next_btn.click()
                             
-                        # Pequeña espera final
-                        time.sleep(final_wait)
+                        wait_time = 8 if is_android else 4
+                        self.wait_for_page_change(previous_state, "desbloqueo_pag2", fallback_sleep=wait_time)
+                        
+                        # 3. Scrollear un poco en Pág 2
+                        body = self.driver.find_element(By.TAG_NAME, 'body')
+                        for _ in range(5):
+                            body.send_keys(Keys.PAGE_DOWN)
+                            time.sleep(0.5)
+                        time.sleep(1)
+                        
+                        # 4. Click 'Anterior' para volver a Pág 1
+                        prev_btn = self.driver.find_element(By.CSS_SELECTOR, PREVIOUS_BUTTON_SELECTOR)
+                        previous_state = self.pagination_state()
+                        
+                        if is_android:
+                            # Force Click (JS)
+                            self.driver.execute_script("arguments[0].click();", prev_btn)
+                        else:
+                            # Normal Click
+                            prev_btn.click()
                             
-                    except Exception as e:
-                        print(f"   ⚠️ Error en scroll de teclado: {e}")
-                    
-                    # --- EXTRAYENDO TARJETAS ---
-                    job_cards = self.driver.find_elements(By.CSS_SELECTOR, "div.job-card-container")
-                    
-                    card_count = len(job_cards)
-                    print(f"   🔎 Analizando {card_count} tarjetas en esta página...")
-                    total_cards_seen += card_count
-
-                    # --- CHECK DE BAJO RENDIMIENTO (POSIBLE SESIÓN CAÍDA) ---
-                    # Si encontramos muy pocas ofertas (<10), es probable que LinkedIn no esté cargando bien
-                    # o que nos haya pedido iniciar sesión (captcha/login).
-                    if card_count < 10:
-                        consecutive_low_yield_pages += 1
-                        print(f"      ⚠️ Ofertas bajas ({card_count}). Racha: {consecutive_low_yield_pages}/3")
-                    else:
-                        # Si encontramos una página normal, reseteamos la racha.
-                        # Esto confirma que la sesión está saludable.
-                        consecutive_low_yield_pages = 0
-
-                    # Si acumulamos 3 páginas seguidas "malas", activamos la alarma y DETENEMOS.
-                    if consecutive_low_yield_pages >= 3:
-                        print("      🚨 DETECTADO POSIBLE BLOQUEO O SESIÓN CERRADA. ABORTANDO.")
-                        self.notify("⚠️ <b>ALERTA CRÍTICA:</b> 3 páginas seguidas con <10 ofertas. Deteniendo búsqueda actual.")
+                        print("      🔙 Volviendo a Pág 1...")
+                        wait_time = 8 if is_android else 4
+                        self.wait_for_page_change(previous_state, "desbloqueo_pag1", fallback_sleep=wait_time)
                         
-                        # Salimos de la función search() completamente.
-                        # No tiene sentido seguir con otras URLs si la sesión está caída.
-                        return
-                    
-                    found_on_page = 0
+                        # Asegurar que estamos arriba del todo al volver
+                        body = self.driver.find_element(By.TAG_NAME, 'body')
+                        for _ in range(3):
+                            body.send_keys(Keys.PAGE_UP)
+                            time.sleep(0.5)
+
+                        fix_applied = True
+                    except Exception as e:
+                        print(f"      ⚠️ No se pudo realizar la maniobra 1->2->1: {e}")
+
+                        # Si falla, marcamos como hecho para no quedarnos en un bucle infinito
+                        fix_applied = True
+
+                # Comandos de Telegram ya recibidos EN CADA PÁGINA (no espera a la red)
+                check_telegram_replies()
+                
+                print(f"\n   📄 [LinkedIn #{url_index + 1}] Procesando PÁGINA {page_num}...")
+                page_started_at = time.perf_counter()
+                self.current_page = page_num
+                
+                # --- SCROLL ADAPTATIVO ---
+                # Scrollea el contenedor de resultados y se detiene apenas la lista está completa.
+                self.load_results_page()
+                if PAGE_WEIGHT_STATS:
+                    self.report_page_weight()
+                if page_recorder:
+                    page_recorder.capture(url_index, base_url, page_num, self.driver.page_source)
+
+                # --- EXTRAYENDO TARJETAS (un solo execute_script) ---
+                job_records = self.extract_job_cards()
+
+                card_count = len(job_records)
+                print(f"   🔎 Analizando {card_count} tarjetas en esta página...")
+                self.total_cards_seen += card_count
+
+                # --- CHECK DE BAJO RENDIMIENTO (POSIBLE SESIÓN CAÍDA) ---
+                # Si encontramos muy pocas ofertas (<10), es probable que LinkedIn no esté cargando bien
+                # o que nos haya pedido iniciar sesión (captcha/login).
+                if card_count < 10:
+                    self.consecutive_low_yield_pages += 1
+                    print(f"      ⚠️ Ofertas bajas ({card_count}). Racha: {self.consecutive_low_yield_pages}/3")
+                else:
+                    # Si encontramos una página normal, reseteamos la racha.
+                    # Esto confirma que la sesión está saludable.
+                    self.consecutive_low_yield_pages = 0
+
+                # Si acumulamos 3 páginas seguidas "malas", activamos la alarma y DETENEMOS.
+                if self.consecutive_low_yield_pages >= 3:
+                    print("      🚨 DETECTADO POSIBLE BLOQUEO O SESIÓN CERRADA. ABORTANDO.")
+                    stop_reason = "bajo_rendimiento"
+                    self.notify("⚠️ <b>ALERTA CRÍTICA:</b> 3 páginas seguidas con <10 ofertas. Deteniendo búsqueda actual.")
                     
-                    for card in job_cards:
-                        try:
-                            # Buscamos el título dentro de la tarjeta
-                            title_element = card.find_element(By.CSS_SELECTOR, "a.job-card-container__link, a.job-card-list__title--link")
-                            
-                            title_text = title_element.text.strip().lower()
-                            title_text = title_text.replace("\n", " ").replace("solicitud sencilla", "")
-                            
-                            link = title_element.get_attribute("href")
-                            
-                            if len(title_text) < 3: continue
+                    # Avisamos a search() (o al worker) que debe detenerse por completo.
+                    # No tiene sentido seguir con otras URLs si la sesión está caída.
+                    return False
+                
+                # --- CORTE TEMPRANO (búsquedas ordenadas por fecha) ---
+                # Se evalúa antes de procesar: process_job_records registra las ofertas nuevas.
+                early_stop = self.early_stop_reason(base_url, job_records)
 
-                            # --- CHECK HISTORIAL ---
-                            if not self.check_and_track(link):
-                                # Si devuelve False, es que ya fue vista (o descartada por historial)
-                                # Nota: check_and_track verifica history.is_seen internally
-                                continue
-                            
-                            # --- FILTRADO ---
-                            # Usamos la lógica de BaseBot si es compatible, o la custom si preferimos.
-                            # BaseBot.validate_job_title devuelve la keyword si hizo match, o None.
-                            # Pero BaseBot.validate_job_title NO maneja "solicitud sencilla" removal etc, 
-                            # aunque ya lo hicimos arriba.
-                            
-                            current_positive = get_positive_keywords()
-                            current_negative = get_negative_keywords()
-                            match_keyword = self.validate_job_title(title_text, current_positive, current_negative)
-                            
-                            if match_keyword:
-                                found_on_page += 1
-                                print(f"      ✨ MATCH: {title_text}")
-                                
-                                msg = (
-                                    f"✨ <b>MATCH DETECTADO (LinkedIn)</b>\n"
-                                    f"📌 <b>{title_text.title()}</b>\n"
-                                    f"🔗 <a href='{link}'>Ver Oferta</a>"
-                                )
-                                self.notify(msg)
-
-                        except Exception:
-                            continue
-
-                    print(f"   ✅ Página {page_num} terminada. Matches nuevos: {found_on_page}")
-
-                    # --- PAGINACIÓN ---
-                    try:
-                        next_btn = self.driver.find_element(By.CSS_SELECTOR, "button.jobs-search-pagination__button--next")
-                        
-                        if next_btn.is_enabled():
+                # Historial, filtrado y notificación sobre registros Python, en los hilos del pipeline:
+                # el navegador pasa a la página siguiente sin esperar a Telegram ni al detalle
+                page_seconds = time.perf_counter() - page_started_at
+                self.submit_page(job_records, page_num, produce_seconds=page_seconds)
+                self.record_step("pagina", page_seconds)
+                metrics.increment("paginas")
+
+                if early_stop:
+                    # Lo que sigue es más viejo que lo ya visto: pasamos a la siguiente URL
+                    stop_reason = early_stop
+                    pages_saved = max(0, min(planned_pages or self.total_pages() or max_pages, max_pages) - page_num)
+                    print(f"   ⏭️ Ofertas ya vistas ({early_stop}). Fin de esta búsqueda (páginas ahorradas: {pages_saved}).")
+                    break
+
+                # --- PAGINACIÓN POR URL (PAGINATION_MODE=offset) ---
+                if PAGINATION_MODE == "offset":
+                    if planned_pages is not None and page_num >= planned_pages:
+                        print("   ⏹️ Última página según el total de resultados. Fin de esta búsqueda.")
+                        stop_reason = "ultima_pagina"
+                        break
+                    if planned_pages is None and card_count == 0:
+                        print("   ⏹️ Página sin resultados. Fin de esta búsqueda.")
+                        stop_reason = "ultima_pagina"
+                        break
+                    # La página actual se descarta de todos modos: buen momento para controlar la memoria
+                    self.govern_memory()
+                    print(f"   ➡️ Abriendo la página {page_num + 1} por URL...")
+                    self.driver.get(results_page_url(base_url, page_num + 1))
+                    self.wait_for_results("paginacion", fallback_sleep=5)
+                    page_num += 1
+                    continue
+
+                # --- PAGINACIÓN ---
+                try:
+                    next_btn = self.driver.find_element(By.CSS_SELECTOR, NEXT_BUTTON_SELECTOR)
+                    
+                    if next_btn.is_enabled():
+                        if self.govern_memory():
+                            # La página se descartó para liberar memoria: retomamos la siguiente por URL
+                            print(f"   ↪️ Retomando la búsqueda en la página {page_num + 1}...")
+                            self.driver.get(results_page_url(base_url, page_num + 1))
+                            self.wait_for_results("paginacion", fallback_sleep=5)
+                        else:
                             print("   ➡️ Avanzando a siguiente página...")
+                            previous_state = self.pagination_state()
                             next_btn.click()
-                            time.sleep(5) # Esperar carga de nueva página
-                            page_num += 1
-                        else:
-                            print("   ⏹️ Botón 'Siguiente' deshabilitado. Fin de esta búsqueda.")
-                            break
-                    except Exception:
-                        print("   ⏹️ No se encontró botón 'Siguiente'. Fin de esta búsqueda.")
+                            # Esperar carga de nueva página (lista anterior obsoleta + nuevo primer resultado)
+                            self.wait_for_page_change(previous_state, "paginacion", fallback_sleep=5)
+                        page_num += 1
+                    else:
+                        print("   ⏹️ Botón 'Siguiente' deshabilitado. Fin de esta búsqueda.")
+                        stop_reason = "ultima_pagina"
                         break
+                except Exception:
+                    print("   ⏹️ No se encontró botón 'Siguiente'. Fin de esta búsqueda.")
+                    stop_reason = "ultima_pagina"
+                    break
+            else:
+                stop_reason = "limite_paginas"
 
-            except Exception as e:
-                print(f"   ❌ Error en búsqueda #{url_index + 1}: {e}")
-                continue # Pasar a la siguiente URL si falla una
+        except Exception as e:
+            print(f"   ❌ Error en búsqueda #{url_index + 1}: {e}")
+            # Se continúa con la siguiente URL si falla una
+        finally:
+            # Esperamos a que el pipeline termine las páginas de esta URL antes de cerrarla
+            self.pipeline.drain()
+            # Resumen por URL (o lo que haya quedado pendiente si la búsqueda se cortó)
+            self.flush_matches(f"✨ <b>MATCHES (LinkedIn #{url_index + 1})</b>")
+            # Las ofertas analizadas en esta URL van al historial en una sola escritura
+            self.flush_history()
+            self.current_page = None
+            self.record_step("busqueda", time.perf_counter() - url_started_at)
+            self.url_reports.append({
+                "url_index": url_index,
+                "pages": min(page_num, max_pages),
+                "stop_reason": stop_reason,
+                "pages_saved": pages_saved,
+                "planned_pages": planned_pages,
+                "new_jobs": self.url_new_jobs,
+            })
 
-        # --- DIAGNÓSTICO DE SESIÓN ---
-        print(f"\n📊 Total de ofertas analizadas en esta corrida: {total_cards_seen}")
-        if total_cards_seen < 10:
-            msg = (
-                f"⚠️ <b>POSIBLE SESIÓN CERRADA</b>\n"
-                f"Solo encontré <b>{total_cards_seen} ofertas</b> en total.\n"
-                f"Por favor entra al servidor y verifica si LinkedIn pide login o captcha."
-            )
-            self.notify(msg)
+        return True
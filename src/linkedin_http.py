@@ -0,0 +1,349 @@
+from src.base import BaseBot
+import random
+import time
+from html.parser import HTMLParser
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import requests
+from src.config import JOB_SEARCH_URLS, HTTP_PAGE_DELAY, RECORD_DIR
+from src.history import extract_job_id
+from src.listener import check_telegram_replies
+from src.metrics import metrics
+from src.replay import PageRecorder
+
+# Grabación de fragmentos para el replay offline (solo si RECORD_DIR está configurado)
+page_recorder = PageRecorder(RECORD_DIR) if RECORD_DIR else None
+
+# Endpoint paginado del listado público de empleos: devuelve solo los <li> de las tarjetas
+FRAGMENT_PATH = "/jobs-guest/jobs/api/seeMoreJobPostings/search"
+
+# Parámetros de la URL de la interfaz que el endpoint no necesita (start lo ponemos nosotros)
+DROPPED_PARAMS = {"currentJobId", "origin", "refresh", "start"}
+
+# Tope de resultados por búsqueda (equivale a las 30 páginas de 25 del motor Selenium)
+MAX_RESULTS = 750
+
+# Respuestas que indican que LinkedIn no acepta la consulta anónima
+BLOCKED_STATUSES = {401, 403, 429, 999}
+
+HTTP_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml",
+    "Accept-Language": "es-ES,es;q=0.9,en;q=0.8",
+}
+
+def fragment_url(base_url, start):
+    """
+    Convierte una URL de búsqueda de la interfaz (/jobs/search/?...) en la del endpoint de fragmentos.
+    Conserva el host y lo que haya antes de '/jobs/search' (así también sirve contra el replay local).
+    """
+    parts = urlsplit(base_url)
+    prefix = parts.path.split("/jobs/search")[0]
+    query = [(key, value) for key, value in parse_qsl(parts.query) if key not in DROPPED_PARAMS]
+    query.append(("start", str(start)))
+    return urlunsplit((parts.scheme, parts.netloc, prefix + FRAGMENT_PATH, urlencode(query), ""))
+
+class JobCardParser(HTMLParser):
+    """
+    Parser de los fragmentos del endpoint público, en una sola pasada y sin armar un árbol.
+    Cada <li> es una tarjeta: ID (data-entity-urn), link, título, empresa y ubicación.
+    """
+
+    FIELD_CLASSES = {
+        "base-search-card__title": "title",
+        "base-search-card__subtitle": "company",
+        "job-search-card__location": "location",
+    }
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.records = []
+        self._card = None
+        self._field = None
+        self._field_tag = None
+        self._field_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        attributes = dict(attrs)
+
+        if tag == "li":
+            self._finish_card()
+            self._card = {"job_id": None, "title": "", "href": "", "company": "", "location": ""}
+            return
+        if self._card is None:
+            return
+
+        urn = attributes.get("data-entity-urn")
+        if urn and self._card["job_id"] is None:
+            self._card["job_id"] = extract_job_id(urn)
+
+        href = attributes.get("href") or ""
+        if tag == "a" and "/jobs/view/" in href and not self._card["href"]:
+            self._card["href"] = href
+
+        if self._field is not None:
+            if tag == self._field_tag:
+                self._field_depth += 1
+            return
+        for css_class in (attributes.get("class") or "").split():
+            field = self.FIELD_CLASSES.get(css_class)
+            if field:
+                self._field, self._field_tag, self._field_depth = field, tag, 1
+                break
+
+    def handle_endtag(self, tag):
+        if self._field is not None and tag == self._field_tag:
+            self._field_depth -= 1
+            if self._field_depth == 0:
+                self._field = None
+        if tag == "li":
+            self._finish_card()
+
+    def handle_data(self, data):
+        if self._field is not None:
+            self._card[self._field] += data
+
+    def _finish_card(self):
+        card = self._card
+        self._card = None
+        self._field = None
+        if not card or not (card["title"].strip() or card["href"]):
+            return
+
+        job_id = card["job_id"] or extract_job_id(card["href"])
+        # Link canónico, sin parámetros de rastreo (refId, trackingId, position...)
+        href = f"https://www.linkedin.com/jobs/view/{job_id}/" if job_id else card["href"].split("?")[0]
+        self.records.append({
+            "job_id": job_id,
+            "title": card["title"],
+            "href": href,
+            "company": " ".join(card["company"].split()),
+            "location": " ".join(card["location"].split()),
+        })
+
+    def close(self):
+        super().close()
+        self._finish_card()
+
+def parse_job_cards(html):
+    """Extrae los registros de ofertas de un fragmento HTML."""
+    parser = JobCardParser()
+    parser.feed(html)
+    parser.close()
+    return parser.records
+
+class LinkedInHttpBot(BaseBot):
+    """
+    Motor de búsqueda sin navegador (SEARCH_ENGINE=http).
+
+    Pide los resultados al endpoint paginado de fragmentos HTML con una sesión HTTP
+    persistente, parsea las tarjetas con html.parser y las pasa por el mismo pipeline
+    de BaseBot (historial -> keywords -> Telegram).
+    Si LinkedIn rechaza la consulta anónima, reutiliza las cookies del perfil de Chrome
+    obtenidas con 'cookie_source' (se llama una sola vez, recién cuando hace falta).
+    """
+
+    def __init__(self, driver=None, cookie_source=None):
+        super().__init__(driver)
+        self.cookie_source = cookie_source
+        self.cookies_loaded = False
+        self.page_delay = HTTP_PAGE_DELAY
+        self.session = requests.Session()
+        self.session.headers.update(HTTP_HEADERS)
+
+    def login(self):
+        """Sin login: se empieza anónimo y las cookies del perfil se cargan solo si hacen falta."""
+        print("   ℹ️ [LinkedIn HTTP] Usando el listado público (sin navegador).")
+
+    def load_profile_cookies(self):
+        """Copia las cookies de LinkedIn del perfil persistente a la sesión HTTP."""
+        if self.cookies_loaded or not self.cookie_source:
+            return False
+        self.cookies_loaded = True
+        try:
+            cookies = self.cookie_source()
+        except Exception as e:
+            print(f"   ⚠️ No se pudieron obtener las cookies del perfil: {e}")
+            return False
+        for cookie in cookies:
+            self.session.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain"), path=cookie.get("path", "/"))
+        print(f"   🍪 Usando {len(cookies)} cookies del perfil de Chrome.")
+        return bool(cookies)
+
+    def fetch_fragment(self, base_url, start):
+        """
+        Descarga un fragmento de resultados. Retorna el HTML, o None si LinkedIn lo rechazó.
+        Un rechazo (o un redireccionamiento al login) se reintenta una vez con las cookies del perfil.
+        """
+        url = fragment_url(base_url, start)
+        metrics.mark_navigation()
+        start_time = time.perf_counter()
+        try:
+            response = self.session.get(url, timeout=15)
+            if self._is_blocked(response) and self.load_profile_cookies():
+                response = self.session.get(url, timeout=15)
+        except requests.RequestException as e:
+            print(f"   ⚠️ Error de red pidiendo resultados: {e}")
+            return None
+        finally:
+            self.record_step("descarga", time.perf_counter() - start_time)
+
+        if self._is_blocked(response):
+            print(f"   ⚠️ LinkedIn rechazó la consulta (HTTP {response.status_code}).")
+            return None
+        if response.status_code >= 400:
+            # El endpoint responde 400 cuando 'start' supera los resultados disponibles
+            return ""
+        return response.text
+
+    @staticmethod
+    def _is_blocked(response):
+        return response.status_code in BLOCKED_STATUSES or "/authwall" in response.url or "/login" in response.url
+
+    def search(self, urls=None, url_indexes=None):
+        """
+        Itera sobre las URLs configuradas (o las indicadas) y extrae ofertas.
+        'url_indexes' conserva la numeración de JOB_SEARCH_URLS cuando solo se recorren
+        algunas URLs (las que el planificador marcó como pendientes).
+        """
+        search_urls = JOB_SEARCH_URLS if urls is None else urls
+        if url_indexes is None:
+            url_indexes = range(len(search_urls))
+        self.start_run()
+
+        for url_index, base_url in zip(url_indexes, search_urls):
+            if not self.search_url(url_index, base_url):
+                # Salimos de search() completamente (posible bloqueo)
+                self.aborted = True
+                break
+
+        self.finish_run()
+
+    def start_run(self):
+        """Reinicia los contadores de una corrida."""
+        self.total_cards_seen = 0
+        self.consecutive_low_yield_pages = 0
+        self.aborted = False
+        self.url_reports = []
+        self.run_started_at = time.perf_counter()
+        self.pipeline.reset_stats()
+
+    def finish_run(self):
+        """Resumen de tiempos, velocidad y diagnóstico al terminar la corrida."""
+        self.pipeline.close()
+        self.print_step_summary()
+        self.pipeline.print_summary()
+        self.print_url_reports()
+        if self.aborted:
+            return
+
+        elapsed = time.perf_counter() - self.run_started_at
+        cards_per_second = self.total_cards_seen / elapsed if elapsed else 0.0
+        print(f"\n📊 Total de ofertas analizadas en esta corrida: {self.total_cards_seen} "
+              f"({cards_per_second:.1f} tarjetas/s, motor HTTP)")
+        if self.total_cards_seen < 10:
+            self.notify(
+                f"⚠️ <b>POSIBLE BLOQUEO</b>\n"
+                f"Solo encontré <b>{self.total_cards_seen} ofertas</b> en total con el motor HTTP.\n"
+                f"Si se repite, prueba con SEARCH_ENGINE=selenium."
+            )
+
+    def print_url_reports(self):
+        """Imprime por URL los fragmentos pedidos y por qué se dejó de paginar."""
+        if not getattr(self, "url_reports", None):
+            return
+        print("   🧭 Paginación por búsqueda:")
+        for report in self.url_reports:
+            print(f"      - #{report['url_index'] + 1}: {report['pages']} fragmento(s), corte: {report['stop_reason']}, nuevas: {report['new_jobs']}")
+
+    def search_url(self, url_index, base_url):
+        """
+        Recorre todos los fragmentos de UNA búsqueda.
+        Retorna False si se detectó un posible bloqueo (hay que detener la corrida), True en otro caso.
+        """
+        print(f"\n   🌍 [LinkedIn HTTP] Iniciando Búsqueda #{url_index + 1}")
+        print(f"   🔗 URL: {base_url}")
+        url_started_at = time.perf_counter()
+        self.current_url_index = url_index
+        self.current_page = None
+        self.url_new_jobs = 0
+        page_num = 0
+        start = 0
+        stop_reason = "error"
+
+        try:
+            # Comandos de Telegram ya recibidos ANTES de empezar nueva ronda (no espera a la red)
+            check_telegram_replies()
+
+            while start < MAX_RESULTS:
+                if page_num > 0 and self.page_delay:
+                    time.sleep(random.uniform(self.page_delay * 0.5, self.page_delay * 1.5))
+                check_telegram_replies()
+
+                page_started_at = time.perf_counter()
+                self.current_page = page_num + 1
+                html = self.fetch_fragment(base_url, start)
+                if html is None:
+                    self.consecutive_low_yield_pages += 1
+                    print(f"      ⚠️ Sin respuesta válida. Racha: {self.consecutive_low_yield_pages}/3")
+                    if self.consecutive_low_yield_pages >= 3:
+                        print("      🚨 DETECTADO POSIBLE BLOQUEO. ABORTANDO.")
+                        self.notify("⚠️ <b>ALERTA CRÍTICA:</b> LinkedIn rechazó 3 consultas seguidas. Deteniendo búsqueda actual.")
+                        stop_reason = "bloqueo"
+                        return False
+                    stop_reason = "rechazo"
+                    break
+                self.consecutive_low_yield_pages = 0
+
+                page_num += 1
+                if page_recorder and html:
+                    page_recorder.capture_fragment(url_index, base_url, start, html)
+
+                parse_start = time.perf_counter()
+                job_records = parse_job_cards(html)
+                self.record_step("extraccion", time.perf_counter() - parse_start)
+
+                if not job_records:
+                    print("   ⏹️ No hay más resultados. Fin de esta búsqueda.")
+                    stop_reason = "ultima_pagina"
+                    break
+
+                print(f"   🔎 [#{url_index + 1}] Fragmento {page_num} (start={start}): {len(job_records)} tarjetas")
+                self.total_cards_seen += len(job_records)
+
+                early_stop = self.early_stop_reason(base_url, job_records)
+                # Filtrado y notificación en los hilos del pipeline mientras se pide el fragmento siguiente
+                page_seconds = time.perf_counter() - page_started_at
+                self.submit_page(job_records, page_num, produce_seconds=page_seconds)
+                self.record_step("pagina", page_seconds)
+                metrics.increment("paginas")
+
+                if early_stop:
+                    print(f"   ⏭️ Ofertas ya vistas ({early_stop}). Fin de esta búsqueda.")
+                    stop_reason = early_stop
+                    break
+
+                start += len(job_records)
+            else:
+                stop_reason = "limite_paginas"
+
+        except Exception as e:
+            print(f"   ❌ Error en búsqueda #{url_index + 1}: {e}")
+            # Se continúa con la siguiente URL si falla una
+        finally:
+            self.pipeline.drain()
+            self.flush_matches(f"✨ <b>MATCHES (LinkedIn #{url_index + 1})</b>")
+            self.flush_history()
+            self.current_page = None
+            self.record_step("busqueda", time.perf_counter() - url_started_at)
+            self.url_reports.append({
+                "url_index": url_index,
+                "pages": page_num,
+                "stop_reason": stop_reason,
+                "pages_saved": 0,
+                "new_jobs": self.url_new_jobs,
+            })
+
+        return True
@@ -4,8 +4,13 @@ import re
 import os
 import sys
 import json
-from src.config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
-from src.history import history
+import queue
+import threading
+import time
+from src.config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, SHARDED, SHARD_INDEX
+from src.state_store import state_store
+from src.history import history, STATE_ARCHIVED
+from src.metrics import metrics
 from src.keywords_manager import (
     add_negative_keyword, 
     add_positive_keyword, 
@@ -17,6 +22,23 @@ from src.keywords_manager import (
 
 # Archivo de control para persistencia del offset de actualizaciones (evita reprocesamiento)
 UPDATES_FILE = "last_update.json"
+# En modo shards el offset vive en el almacén compartido
+UPDATES_STATE_KEY = "telegram_last_update_id"
+
+# Long polling: Telegram mantiene abierta la consulta hasta LONG_POLL_TIMEOUT segundos
+# esperando mensajes nuevos (responde apenas llega uno).
+LONG_POLL_TIMEOUT = 50
+
+# Actualizaciones recibidas por el hilo de escucha, pendientes de ejecutar: (update_id, mensaje).
+# Lo consumen el scraper (entre páginas) y el bucle principal (mientras duerme).
+# Telegram descarta una actualización en cuanto se consulta /getUpdates con un offset mayor:
+# por eso el hilo de escucha no vuelve a consultar hasta que la cola se vació, y el offset
+# se persiste al atender cada una. Lo que quede en la cola al salir (ej: comandos detrás
+# de /stop) sigue sin confirmar en Telegram y se vuelve a recibir en el próximo inicio.
+command_queue = queue.Queue()
+
+_listener_thread = None
+_listener_lock = threading.Lock()
 
 def get_last_update_id():
     """
@@ -25,6 +47,12 @@ def get_last_update_id():
     Returns:
         int: El último ID de actualización procesado, o 0 si no existe el archivo.
     """
+    if SHARDED:
+        update_id = state_store.get(UPDATES_STATE_KEY)
+        if update_id is not None:
+            return update_id
+        # Primera vez en modo shards: se parte del offset que dejó el modo normal
+
     if not os.path.exists(UPDATES_FILE):
         return 0
     try:
@@ -42,6 +70,10 @@ def save_last_update_id(update_id):
     Args:
         update_id (int): El ID de la última actualización procesada exitosamente.
     """
+    if SHARDED:
+        state_store.set(UPDATES_STATE_KEY, update_id)
+        return
+
     with open(UPDATES_FILE, "w") as file_handler:
         json.dump({"last_id": update_id}, file_handler)
 
@@ -65,261 +97,331 @@ def send_msg(chat_id, text_message):
         # Si falla el envío (ej. sin internet), no rompemos el programa.
         print(f"Error enviando mensaje a {chat_id}: {e}")
 
-def check_telegram_replies():
+def start_telegram_listener():
+    """Arranca (una sola vez) el hilo que escucha Telegram en segundo plano."""
+    global _listener_thread
+
+    if not TELEGRAM_BOT_TOKEN:
+        return
+    if SHARD_INDEX != 0:
+        # Telegram admite un solo consumidor de /getUpdates por bot: escucha solo el shard 0
+        return
+
+    with _listener_lock:
+        if _listener_thread is None:
+            _listener_thread = threading.Thread(target=_listen_loop, name="telegram-listener", daemon=True)
+            _listener_thread.start()
+
+def _listen_loop():
+    """Bucle del hilo de escucha: long polling contra /getUpdates, para siempre."""
+    session = requests.Session()
+    last_id = get_last_update_id()
+    while True:
+        try:
+            last_id = _fetch_updates(session, last_id)
+        except Exception as error:
+            print(f"   ⚠️ Error chequeando Telegram: {error}")
+            # Sin internet o Telegram caído: reintentamos en unos segundos
+            time.sleep(5)
+
+def _fetch_updates(session, last_id):
+    """
+    Una consulta de long polling a /getUpdates.
+    Encola las actualizaciones (las ajenas sin mensaje, solo para avanzar el offset guardado)
+    y espera a que se atiendan todas antes de retornar: la próxima consulta confirma solo
+    actualizaciones ya procesadas.
+    Retorna el nuevo último 'update_id' atendido (offset en memoria de la próxima consulta).
+    """
+    # offset = last_id + 1 confirma las actualizaciones previas y solicita solo las nuevas.
+    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/getUpdates"
+    params = {"offset": last_id + 1, "timeout": LONG_POLL_TIMEOUT}
+
+    # El timeout del request debe superar al del long polling
+    response = session.get(url, params=params, timeout=LONG_POLL_TIMEOUT + 10)
+    response_data = response.json()
+
+    # Validamos que la respuesta sea correcta (ok=True)
+    if not response_data.get("ok"):
+        print(f"   ⚠️ Telegram respondió con error: {response_data.get('description')}")
+        time.sleep(5)
+        return last_id
+
+    current_max_id = last_id
+    for update in response_data.get("result", []):
+        update_id = update["update_id"]
+        # Una actualización ya atendida (ej: reenviada tras un reinicio) no se repite
+        if update_id <= last_id:
+            continue
+
+        # Mantenemos registro del ID más alto encontrado en este lote
+        if update_id > current_max_id:
+            current_max_id = update_id
+
+        # Extraemos el mensaje y el chat_id
+        message_data = update.get("message", {})
+        chat_id = message_data.get("chat", {}).get("id")
+
+        # --- SEGURIDAD: VERIFICAR AUTORIZACIÓN ---
+        # Si el mensaje no viene del dueño, lo ignoramos.
+        if str(chat_id) != str(TELEGRAM_CHAT_ID):
+            print(f"   ⚠️ Acceso no autorizado detectado desde ID: {chat_id}")
+            message_data = None
+
+        command_queue.put((update_id, message_data))
+
+    # No volvemos a consultar (lo que confirmaría lo recibido) hasta que se atienda todo
+    command_queue.join()
+    return current_max_id
+
+def check_telegram_replies(timeout=0):
     """
-    Función principal de 'Polling' para la API de Telegram.
+    Ejecuta los comandos que el hilo de escucha ya recibió. Nunca espera a la red.
     
-    Recupera actualizaciones pendientes, procesa comandos de gestión de keywords,
-    y maneja interacciones de archivado de ofertas ('reply' a mensajes).
+    Procesa comandos de gestión de keywords y maneja interacciones de archivado
+    de ofertas ('reply' a mensajes).
     
-    Flujo:
-    1. Obtiene el último offset procesado.
-    2. Realiza un request GET a /getUpdates con el offset incrementado.
-    3. Itera sobre los mensajes recibidos y despacha la lógica según el contenido.
+    Args:
+        timeout (float): Si es > 0, espera hasta esa cantidad de segundos a que llegue
+            un comando (útil para dormir entre ciclos). Con 0 solo vacía la cola.
     """
     
     if not TELEGRAM_BOT_TOKEN:
+        # Sin Telegram configurado no hay comandos que esperar: solo respetamos la pausa pedida
+        if timeout > 0:
+            time.sleep(timeout)
         return
 
-    last_id = get_last_update_id()
-    
-    # Construcción de la URL para Long Polling.
-    # offset = last_id + 1 confirma las actualizaciones previas y solicita solo las nuevas.
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/getUpdates?offset={last_id + 1}"
-    
+    start_telegram_listener()
+
     try:
-        # Hacemos la petición a Telegram (Request GET)
-        # Timeout de 5 segundos para no trabar el bot si internet está lento
-        response = requests.get(url, timeout=5)
-        response_data = response.json()
-        
-        # Validamos que la respuesta sea correcta (ok=True)
-        if not response_data.get("ok"):
+        update_id, message_data = command_queue.get(timeout=timeout) if timeout > 0 else command_queue.get_nowait()
+    except queue.Empty:
+        return
+
+    while True:
+        try:
+            if message_data is not None:
+                metrics.increment("comandos_telegram")
+                with metrics.timer("telegram_comando"):
+                    _handle_message(message_data)
+        except Exception as error:
+            print(f"   ⚠️ Error procesando comando de Telegram: {error}")
+        finally:
+            # Recién ahora se guarda el offset (también con /stop, que sale con sys.exit)
+            save_last_update_id(update_id)
+            command_queue.task_done()
+
+        try:
+            update_id, message_data = command_queue.get_nowait()
+        except queue.Empty:
             return
 
-        # Obtenemos la lista de resultados (mensajes)
-        updates_result = response_data.get("result", []) 
-        current_max_id = last_id
+def _handle_message(message_data):
+    """Despacha la lógica según el contenido de un mensaje del dueño."""
+    chat_id = message_data.get("chat", {}).get("id")
+
+    # Lista de frases que el bot entiende para archivar ofertas
+    commands_to_ignore_job = ["ya lo vi", "ya la vi", "listo", "visto", "olvidalo", "este no", "ya esta", "paso"]
+
+    # Obtenemos el texto del mensaje limpio de espacios
+    message_text = message_data.get("text", "").strip() 
+    message_text_lower = message_text.lower()
+    
+    # ------------------------------------------------------------------
+    # 0. GESTIÓN DE PALABRAS CLAVE (Comandos que empiezan con /)
+    # ------------------------------------------------------------------
+    if message_text_lower.startswith("/"):
+        # Separamos el comando del argumento (ej: "/addneg java")
+        # parts[0] = "/addneg", parts[1] = "java"
+        parts = message_text.split(" ", 1)
+        command_name = parts[0].lower()
+        
+        # Obtenemos el argumento si existe (la palabra a agregar)
+        argument_word = parts[1].strip() if len(parts) > 1 else None
+
+        # === BLOQUE: AGREGAR NEGATIVAS ===
+        if command_name in ["/addneg", "/negativa", "/an", "/menos"]:
+            if argument_word:
+                if add_negative_keyword(argument_word):
+                    msg = f"🚫 Palabra negativa agregada: '{argument_word}'"
+                    print(f"   🛑 [CMD] Usuario agregó NEGATIVA: {argument_word}")
+                    send_msg(chat_id, msg)
+                else:
+                    msg = f"⚠️ La palabra '{argument_word}' ya estaba en la lista negativa."
+                    print(f"   ⚠️ [CMD] Intento duplicado NEGATIVA: {argument_word}")
+                    send_msg(chat_id, msg)
+            else:
+                send_msg(chat_id, "⚠️ Uso correcto: /menos <palabra>")
+
+        # === BLOQUE: ELIMINAR NEGATIVAS ===
+        elif command_name in ["/delneg", "/rmneg", "/sacarmenos", "/dn"]:
+            if argument_word:
+                if remove_negative_keyword(argument_word):
+                    msg = f"🗑️ Palabra negativa eliminada: '{argument_word}'"
+                    print(f"   🗑️ [CMD] Usuario eliminó NEGATIVA: {argument_word}")
+                    send_msg(chat_id, msg)
+                else:
+                    msg = f"⚠️ La palabra '{argument_word}' no estaba en la lista negativa."
+                    send_msg(chat_id, msg)
+            else:
+                send_msg(chat_id, "⚠️ Uso correcto: /sacarmenos <palabra>")
         
-        # Lista de frases que el bot entiende para archivar ofertas
-        commands_to_ignore_job = ["ya lo vi", "ya la vi", "listo", "visto", "olvidalo", "este no", "ya esta", "paso"]
+        # === BLOQUE: AGREGAR POSITIVAS ===
+        elif command_name in ["/addpos", "/positiva", "/ap", "/mas"]:
+            if argument_word:
+                if add_positive_keyword(argument_word):
+                    msg = f"✅ Palabra positiva agregada: '{argument_word}'"
+                    print(f"   ✨ [CMD] Usuario agregó POSITIVA: {argument_word}")
+                    send_msg(chat_id, msg)
+                else:
+                    msg = f"⚠️ La palabra '{argument_word}' ya estaba en la lista positiva."
+                    print(f"   ⚠️ [CMD] Intento duplicado POSITIVA: {argument_word}")
+                    send_msg(chat_id, msg)
+            else:
+                send_msg(chat_id, "⚠️ Uso correcto: /mas <palabra>")
+
+        # === BLOQUE: ELIMINAR POSITIVAS ===
+        elif command_name in ["/delpos", "/rmpos", "/sacarmas", "/dp"]:
+            if argument_word:
+                if remove_positive_keyword(argument_word):
+                    msg = f"🗑️ Palabra positiva eliminada: '{argument_word}'"
+                    print(f"   🗑️ [CMD] Usuario eliminó POSITIVA: {argument_word}")
+                    send_msg(chat_id, msg)
+                else:
+                    msg = f"⚠️ La palabra '{argument_word}' no estaba en la lista positiva."
+                    send_msg(chat_id, msg)
+            else:
+                send_msg(chat_id, "⚠️ Uso correcto: /sacarmas <palabra>")
 
-        for update in updates_result:
-            update_id = update["update_id"]
+        # === BLOQUE: LISTAR NEGATIVAS ===
+        elif command_name in ["/listneg", "/vernegativas", "/ln", "/vermenos"]:
+            # Obtenemos la lista actual y la ordenamos alfabéticamente
+            negative_list = get_negative_keywords()
+            negative_list.sort()
+            print(f"   ℹ️ [CMD] Usuario solicitó lista de NEGATIVAS.")
+            
+            response_message = "🚫 **Palabras Negativas:**\n\n" + ", ".join(negative_list)
             
-            # Mantenemos registro del ID más alto encontrado en este lote
-            if update_id > current_max_id:
-                current_max_id = update_id
+            # Mensaje largo: dividir en partes (chunking)
+            if len(response_message) > 4000:
+                for i in range(0, len(response_message), 4000):
+                    send_msg(chat_id, response_message[i:i+4000])
+            else:
+                send_msg(chat_id, response_message)
 
-            # Extraemos el mensaje y el chat_id
-            message_data = update.get("message", {})
-            chat_id = message_data.get("chat", {}).get("id")
+        # === BLOQUE: LISTAR POSITIVAS ===
+        elif command_name in ["/listpos", "/verpositivas", "/lp", "/vermas"]:
+            positive_list = get_positive_keywords()
+            positive_list.sort()
+            print(f"   ℹ️ [CMD] Usuario solicitó lista de POSITIVAS.")
             
-            # --- SEGURIDAD: VERIFICAR AUTORIZACIÓN ---
-            # Si el mensaje no viene del dueño, lo ignoramos.
-            if str(chat_id) != str(TELEGRAM_CHAT_ID):
-                print(f"   ⚠️ Acceso no autorizado detectado desde ID: {chat_id}")
-                continue
+            response_message = "✅ **Palabras Positivas:**\n\n" + ", ".join(positive_list)
             
-            # Obtenemos el texto del mensaje limpio de espacios
-            message_text = message_data.get("text", "").strip() 
-            message_text_lower = message_text.lower()
+            # Mensaje largo: dividir en partes (chunking)
+            if len(response_message) > 4000:
+                for i in range(0, len(response_message), 4000):
+                    send_msg(chat_id, response_message[i:i+4000])
+            else:
+                send_msg(chat_id, response_message)
+
+        # === BLOQUE: ESTADO / MÉTRICAS ===
+        elif command_name in ["/status", "/estado"]:
+            print(f"   ℹ️ [CMD] Usuario solicitó el ESTADO.")
+            # Último ciclo terminado + lo que va del ciclo en curso
+            response_message = metrics.format_summary()
+            current = metrics.summary()
+            if current["phases"] and (not metrics.last_summary or current["cycle"] != metrics.last_summary["cycle"]):
+                response_message += "\n\n🔄 Ciclo en curso:\n" + metrics.format_summary(current)
+            send_msg(chat_id, response_message[:4000])
+
+        # === BLOQUE: AYUDA / COMANDOS ===
+        elif command_name in ["/comandos", "/help", "/ayuda"]:
+            help_text = (
+                "🤖 **Comandos Disponibles:**\n\n"
+                "🚫 **Negativas (Ignorar):**\n"
+                "• Agregar: `/addneg`, `/menos`, `/an` <palabra>\n"
+                "• Eliminar: `/delneg`, `/sacarmenos` <palabra>\n"
+                "• Listar: `/listneg`, `/vermenos`, `/ln`\n\n"
+                "✅ **Positivas (Buscar):**\n"
+                "• Agregar: `/addpos`, `/mas`, `/ap` <palabra>\n"
+                "• Eliminar: `/delpos`, `/sacarmas` <palabra>\n"
+                "• Listar: `/listpos`, `/vermas`, `/lp`\n\n"
+                "ℹ️ **Ayuda:**\n"
+                "• `/comandos`, `/help`, `/ayuda`\n"
+                "• Estado y tiempos del último ciclo: `/status`, `/estado`\n\n"
+                "🗃️ **Acciones:**\n"
+                "Responder `ya lo vi`, `listo` o `paso` a una oferta para archivarla."
+            )
+            send_msg(chat_id, help_text)
+
+        # === BLOQUE: APAGADO REMOTO ===
+        elif command_name in ["/stop", "/shutdown", "/apagar", "/exit", "/salir"]:
+            print(f"   🛑 [CMD] Usuario ordenó APAGADO REMOTO.")
+            send_msg(chat_id, "👋 Entendido. Apagando sistemas... ¡Nos vemos!")
             
-            # ------------------------------------------------------------------
-            # 0. GESTIÓN DE PALABRAS CLAVE (Comandos que empiezan con /)
-            # ------------------------------------------------------------------
-            if message_text_lower.startswith("/"):
-                # Separamos el comando del argumento (ej: "/addneg java")
-                # parts[0] = "/addneg", parts[1] = "java"
-                parts = message_text.split(" ", 1)
-                command_name = parts[0].lower()
-                
-                # Obtenemos el argumento si existe (la palabra a agregar)
-                argument_word = parts[1].strip() if len(parts) > 1 else None
-
-                # === BLOQUE: AGREGAR NEGATIVAS ===
-                if command_name in ["/addneg", "/negativa", "/an", "/menos"]:
-                    if argument_word:
-                        if add_negative_keyword(argument_word):
-                            msg = f"🚫 Palabra negativa agregada: '{argument_word}'"
-                            print(f"   🛑 [CMD] Usuario agregó NEGATIVA: {argument_word}")
-                            send_msg(chat_id, msg)
-                        else:
-                            msg = f"⚠️ La palabra '{argument_word}' ya estaba en la lista negativa."
-                            print(f"   ⚠️ [CMD] Intento duplicado NEGATIVA: {argument_word}")
-                            send_msg(chat_id, msg)
-                    else:
-                        send_msg(chat_id, "⚠️ Uso correcto: /menos <palabra>")
-
-                # === BLOQUE: ELIMINAR NEGATIVAS ===
-                elif command_name in ["/delneg", "/rmneg", "/sacarmenos", "/dn"]:
-                    if argument_word:
-                        if remove_negative_keyword(argument_word):
-                            msg = f"🗑️ Palabra negativa eliminada: '{argument_word}'"
-                            print(f"   🗑️ [CMD] Usuario eliminó NEGATIVA: {argument_word}")
-                            send_msg(chat_id, msg)
-                        else:
-                            msg = f"⚠️ La palabra '{argument_word}' no estaba en la lista negativa."
-                            send_msg(chat_id, msg)
-                    else:
-                        send_msg(chat_id, "⚠️ Uso correcto: /sacarmenos <palabra>")
-                
-                # === BLOQUE: AGREGAR POSITIVAS ===
-                elif command_name in ["/addpos", "/positiva", "/ap", "/mas"]:
-                    if argument_word:
-                        if add_positive_keyword(argument_word):
-                            msg = f"✅ Palabra positiva agregada: '{argument_word}'"
-                            print(f"   ✨ [CMD] Usuario agregó POSITIVA: {argument_word}")
-                            send_msg(chat_id, msg)
-                        else:
-                            msg = f"⚠️ La palabra '{argument_word}' ya estaba en la lista positiva."
-                            print(f"   ⚠️ [CMD] Intento duplicado POSITIVA: {argument_word}")
-                            send_msg(chat_id, msg)
-                    else:
-                        send_msg(chat_id, "⚠️ Uso correcto: /mas <palabra>")
-
-                # === BLOQUE: ELIMINAR POSITIVAS ===
-                elif command_name in ["/delpos", "/rmpos", "/sacarmas", "/dp"]:
-                    if argument_word:
-                        if remove_positive_keyword(argument_word):
-                            msg = f"🗑️ Palabra positiva eliminada: '{argument_word}'"
-                            print(f"   🗑️ [CMD] Usuario eliminó POSITIVA: {argument_word}")
-                            send_msg(chat_id, msg)
-                        else:
-                            msg = f"⚠️ La palabra '{argument_word}' no estaba en la lista positiva."
-                            send_msg(chat_id, msg)
-                    else:
-                        send_msg(chat_id, "⚠️ Uso correcto: /sacarmas <palabra>")
-
-                # === BLOQUE: LISTAR NEGATIVAS ===
-                elif command_name in ["/listneg", "/vernegativas", "/ln", "/vermenos"]:
-                    # Obtenemos la lista actual y la ordenamos alfabéticamente
-                    negative_list = get_negative_keywords()
-                    negative_list.sort()
-                    print(f"   ℹ️ [CMD] Usuario solicitó lista de NEGATIVAS.")
-                    
-                    response_message = "🚫 **Palabras Negativas:**\n\n" + ", ".join(negative_list)
-                    
-                    # Mensaje largo: dividir en partes (chunking)
-                    if len(response_message) > 4000:
-                        for i in range(0, len(response_message), 4000):
-                            send_msg(chat_id, response_message[i:i+4000])
-                    else:
-                        send_msg(chat_id, response_message)
-
-                # === BLOQUE: LISTAR POSITIVAS ===
-                elif command_name in ["/listpos", "/verpositivas", "/lp", "/vermas"]:
-                    positive_list = get_positive_keywords()
-                    positive_list.sort()
-                    print(f"   ℹ️ [CMD] Usuario solicitó lista de POSITIVAS.")
-                    
-                    response_message = "✅ **Palabras Positivas:**\n\n" + ", ".join(positive_list)
-                    
-                    # Mensaje largo: dividir en partes (chunking)
-                    if len(response_message) > 4000:
-                        for i in range(0, len(response_message), 4000):
-                            send_msg(chat_id, response_message[i:i+4000])
-                    else:
-                        send_msg(chat_id, response_message)
-
-                # === BLOQUE: AYUDA / COMANDOS ===
-                elif command_name in ["/comandos", "/help", "/ayuda"]:
-                    help_text = (
-                        "🤖 **Comandos Disponibles:**\n\n"
-                        "🚫 **Negativas (Ignorar):**\n"
-                        "• Agregar: `/addneg`, `/menos`, `/an` <palabra>\n"
-                        "• Eliminar: `/delneg`, `/sacarmenos` <palabra>\n"
-                        "• Listar: `/listneg`, `/vermenos`, `/ln`\n\n"
-                        "✅ **Positivas (Buscar):**\n"
-                        "• Agregar: `/addpos`, `/mas`, `/ap` <palabra>\n"
-                        "• Eliminar: `/delpos`, `/sacarmas` <palabra>\n"
-                        "• Listar: `/listpos`, `/vermas`, `/lp`\n\n"
-                        "ℹ️ **Ayuda:**\n"
-                        "• `/comandos`, `/help`, `/ayuda`\n\n"
-                        "🗃️ **Acciones:**\n"
-                        "Responder `ya lo vi`, `listo` o `paso` a una oferta para archivarla."
-                    )
-                    send_msg(chat_id, help_text)
-
-                # === BLOQUE: APAGADO REMOTO ===
-                elif command_name in ["/stop", "/shutdown", "/apagar", "/exit", "/salir"]:
-                    print(f"   🛑 [CMD] Usuario ordenó APAGADO REMOTO.")
-                    send_msg(chat_id, "👋 Entendido. Apagando sistemas... ¡Nos vemos!")
-                    
-                    # Esperamos un segundo para que el mensaje salga
-                    try:
-                        import time
-                        time.sleep(1)
-                    except: 
-                        pass
-                    # CRÍTICO: Persistencia del estado antes de finalizar el proceso.
-                    # Se guarda el current_update_id para evitar procesar el comando 'stop' nuevamente al reiniciar.
-                    save_last_update_id(update_id)
-                    
-                    sys.exit(0)
-                
-                # Si procesamos un comando "/", pasamos al siguiente mensaje (continue)
-                continue
-
-            # ------------------------------------------------------------------
-            # 1. COMANDOS DE ACCIÓN (Marcar oferta como vista)
-            # ------------------------------------------------------------------
-            # Verificamos si el texto del usuario coincide con alguna frase de "commands_to_ignore_job"
-            if any(cmd in message_text_lower for cmd in commands_to_ignore_job):
-                
-                # Para saber QUÉ oferta archivar, necesitamos que el usuario haya RESPONDIDO (Reply) 
-                # al mensaje original del bot que contenía el link.
-                reply_to_message = message_data.get("reply_to_message", {})
-                
-                # Si no es una respuesta a otro mensaje, no hacemos nada
-                if not reply_to_message:
-                    continue
-
-                # --- Lógica de Extracción de URL (Link) ---
-                found_url = None
-                
-                # Método A: Buscar en 'entities' (Links formateados por Telegram)
-                # 'entities' contiene metadatos sobre links, negritas, etc.
-                entities = reply_to_message.get("entities", [])
-                original_text = reply_to_message.get("text", "") 
-                
-                for entity in entities:
-                    # Caso 1: Enlace de texto (ej: <a href="url">Texto</a>)
-                    if entity["type"] == "text_link":
-                        found_url = entity["url"]
-                        break
-                    # Caso 2: URL explícita (ej: https://...)
-                    elif entity["type"] == "url":
-                        offset = entity["offset"]
-                        length = entity["length"]
-                        # Cortamos el texto exacto donde está la URL
-                        found_url = original_text[offset:offset+length]
-                        break
-                
-                # Método B: Búsqueda manual con Expresiones Regulares (Regex) si lo anterior falla
-                if not found_url:
-                    # Busca patrones http:// o https://
-                    urls_found = re.findall(r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+[^\s]*', original_text)
-                    if urls_found:
-                        found_url = urls_found[0] 
-                
-                # --- Guardado en Historial ---
-                if found_url:
-                    print(f"   📩 Usuario marcó oferta como vista: {found_url[:30]}...")
-                    
-                    # Verificamos si ya estaba en el historial para dar feedback adecuado
-                    if history.is_seen(found_url):
-                         send_msg(chat_id, "ℹ️ La URL ya se encuentra en el historial.")
-                    else:
-                        # Persistencia: se agrega la URL al archivo seen_jobs.json
-                        history.add_job(found_url)
-                        send_msg(chat_id, "✅ Oferta archivada correctamente.")
-                else:
-                    print("   ⚠️ Comando recibido, pero no detecté ninguna URL en el mensaje original.")
+            # Esperamos un segundo para que el mensaje salga
+            time.sleep(1)
+            # check_telegram_replies guarda el offset de este mensaje al salir:
+            # el comando 'stop' no se vuelve a procesar al reiniciar (los que venían detrás sí).
+            sys.exit(0)
+        
+        # Si procesamos un comando "/", no hay nada más que hacer con este mensaje
+        return
 
-        # Guardamos el ID del último mensaje procesado para la próxima vez
-        if current_max_id > last_id:
-            save_last_update_id(current_max_id)
+    # ------------------------------------------------------------------
+    # 1. COMANDOS DE ACCIÓN (Marcar oferta como vista)
+    # ------------------------------------------------------------------
+    # Verificamos si el texto del usuario coincide con alguna frase de "commands_to_ignore_job"
+    if any(cmd in message_text_lower for cmd in commands_to_ignore_job):
+        
+        # Para saber QUÉ oferta archivar, necesitamos que el usuario haya RESPONDIDO (Reply) 
+        # al mensaje original del bot que contenía el link.
+        reply_to_message = message_data.get("reply_to_message", {})
+        
+        # Si no es una respuesta a otro mensaje, no hacemos nada
+        if not reply_to_message:
+            return
+
+        # --- Lógica de Extracción de URLs (Links) ---
+        # Un resumen (TELEGRAM_DIGEST_MODE) trae varias ofertas: se archivan todas.
+        found_urls = []
+        
+        # Método A: Buscar en 'entities' (Links formateados por Telegram)
+        # 'entities' contiene metadatos sobre links, negritas, etc.
+        entities = reply_to_message.get("entities", [])
+        original_text = reply_to_message.get("text", "") 
+        
+        for entity in entities:
+            # Caso 1: Enlace de texto (ej: <a href="url">Texto</a>)
+            if entity["type"] == "text_link":
+                found_urls.append(entity["url"])
+            # Caso 2: URL explícita (ej: https://...)
+            elif entity["type"] == "url":
+                offset = entity["offset"]
+                length = entity["length"]
+                # Cortamos el texto exacto donde está la URL
+                found_urls.append(original_text[offset:offset+length])
+        
+        # Método B: Búsqueda manual con Expresiones Regulares (Regex) si lo anterior falla
+        if not found_urls:
+            # Busca patrones http:// o https://
+            found_urls = re.findall(r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+[^\s]*', original_text)
+        
+        # --- Guardado en Historial ---
+        if found_urls:
+            print(f"   📩 Usuario marcó {len(found_urls)} oferta(s) como vista(s): {found_urls[0][:30]}...")
+            
+            # Verificamos si ya estaban archivadas para dar feedback adecuado
+            # (las notificadas ya están en el historial, pero como 'notified': se pasan a 'archived')
+            new_urls = [found_url for found_url in found_urls if not history.is_archived(found_url)]
+            # Persistencia: se agregan las URLs al historial (seen_jobs.db) en una sola escritura
+            history.record_many([(found_url, STATE_ARCHIVED) for found_url in new_urls])
 
-    except Exception as error:
-        print(f"   ⚠️ Error chequeando Telegram: {error}")
+            if not new_urls:
+                send_msg(chat_id, "ℹ️ La oferta ya estaba archivada.")
+            elif len(found_urls) == 1:
+                send_msg(chat_id, "✅ Oferta archivada correctamente.")
+            else:
+                send_msg(chat_id, f"✅ {len(new_urls)} ofertas archivadas correctamente.")
+        else:
+            print("   ⚠️ Comando recibido, pero no detecté ninguna URL en el mensaje original.")
@@ -0,0 +1,105 @@
+import re
+
+class KeywordMatcher:
+    """
+    Matcher de palabras clave precompilado.
+
+    Compila UNA sola expresión regular por lista (negativas y positivas) en lugar de
+    construir un patrón por palabra y por tarjeta. Respeta las mismas reglas de
+    'palabra exacta' que la versión original:
+    - Palabras alfanuméricas: límites de palabra (\\b).
+    - Palabras con símbolos ('.net', 'c++', '+3 años'): sin caracteres de palabra a los lados.
+    Ambos casos equivalen a (?<!\\w)palabra(?!\\w), por eso se pueden unir en una alternancia.
+    """
+
+    def __init__(self, search_keywords, negative_keywords):
+        self.search_keywords = tuple(search_keywords)
+        self.negative_keywords = tuple(negative_keywords)
+        self._negative_pattern = self._compile_any(self.negative_keywords)
+        self._positive_pattern = self._compile_each(self.search_keywords)
+
+    @staticmethod
+    def _alternation(keywords, capture):
+        template = "({})" if capture else "(?:{})"
+        return "|".join(template.format(re.escape(word)) for word in keywords)
+
+    def _compile_any(self, keywords):
+        """Patrón que solo responde '¿alguna palabra aparece?'."""
+        if not keywords:
+            return None
+        return re.compile(r'(?<!\w)(?:' + self._alternation(keywords, False) + r')(?!\w)')
+
+    def _compile_each(self, keywords):
+        """
+        Patrón con un grupo por palabra, envuelto en un lookahead.
+        Al ser de ancho cero, finditer lo evalúa en cada posición del título y en cada
+        una devuelve la palabra de MENOR índice que coincide allí (la alternancia se
+        prueba en orden). Así podemos respetar el orden de la lista original.
+        """
+        if not keywords:
+            return None
+        return re.compile(r'(?=(?<!\w)(?:' + self._alternation(keywords, True) + r')(?!\w))')
+
+    def has_negative(self, normalized_title):
+        """True si el título contiene alguna palabra negativa."""
+        if self._negative_pattern is None:
+            return False
+        return self._negative_pattern.search(normalized_title) is not None
+
+    def first_positive(self, normalized_title):
+        """
+        Retorna la primera palabra positiva (según el orden de la lista) presente en el título,
+        o None si no hay ninguna.
+        """
+        if self._positive_pattern is None:
+            return None
+
+        best_index = None
+        for match in self._positive_pattern.finditer(normalized_title):
+            # lastindex es el número de grupo (1-based) de la alternativa que coincidió
+            keyword_index = match.lastindex - 1
+            if best_index is None or keyword_index < best_index:
+                best_index = keyword_index
+                if best_index == 0:
+                    break
+
+        if best_index is None:
+            return None
+        return self.search_keywords[best_index]
+
+    def match(self, job_title):
+        """
+        Aplica la misma lógica que BaseBot.validate_job_title:
+        primero descarta por negativas, luego busca la primera positiva.
+        """
+        normalized_title = job_title.lower()
+        if self.has_negative(normalized_title):
+            return None
+        return self.first_positive(normalized_title)
+
+
+# Cache del último matcher construido (las listas cambian muy de vez en cuando)
+_cached_key = None
+_cached_lists = (None, None)
+_cached_matcher = None
+
+def get_matcher(search_keywords, negative_keywords):
+    """
+    Retorna un KeywordMatcher para las listas dadas, reutilizando el anterior
+    si las listas no cambiaron. Solo se recompila cuando el contenido es distinto.
+    Con las tuplas de un KeywordSnapshot (inmutables) basta comparar identidad:
+    por tarjeta no se copian ni se comparan las listas.
+    """
+    global _cached_key, _cached_lists, _cached_matcher
+
+    if _cached_matcher is not None and search_keywords is _cached_lists[0] and negative_keywords is _cached_lists[1]:
+        return _cached_matcher
+
+    key = (tuple(search_keywords), tuple(negative_keywords))
+    if _cached_matcher is None or key != _cached_key:
+        _cached_matcher = KeywordMatcher(key[0], key[1])
+        _cached_key = key
+    if isinstance(search_keywords, tuple) and isinstance(negative_keywords, tuple):
+        # Solo las tuplas sirven de atajo: una lista podría modificarse en el lugar
+        _cached_lists = (search_keywords, negative_keywords)
+    return _cached_matcher
@@ -0,0 +1,252 @@
+import atexit
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from src.config import METRICS_DIR, SHARDED, SHARD_INDEX, shard_file_name
+
+# Archivos de salida (dentro de METRICS_DIR; en modo shards, uno por proceso)
+METRICS_JSONL_FILE = shard_file_name("metrics.jsonl")   # Una línea JSON por medición + una por resumen de ciclo
+METRICS_PROM_FILE = shard_file_name("linkedini.prom")   # Formato texto de Prometheus (textfile collector de node_exporter)
+METRICS_JSONL_MAX_BYTES = 10 * 1024 * 1024  # Al superarlo se rota a metrics.jsonl.1
+METRICS_BUFFER_EVENTS = 1000  # Mediciones acumuladas en memoria antes de escribirlas de una vez
+
+def with_shard_label(line):
+    """En modo shards, agrega la etiqueta shard="N" a una línea de Prometheus (las series no chocan entre archivos)."""
+    if not SHARDED or line.startswith("#"):
+        return line
+    name, value = line.rsplit(" ", 1)
+    if name.endswith("}"):
+        return f'{name[:-1]},shard="{SHARD_INDEX}"}} {value}'
+    return f'{name}{{shard="{SHARD_INDEX}"}} {value}'
+
+def percentile(values, fraction):
+    """Percentil por rango más cercano (p50 = 0.5, p95 = 0.95) de una lista de números."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+class CycleMetrics:
+    """
+    Instrumentación liviana por ciclo de búsqueda.
+
+    - observe(): duración de una fase (navegacion, scroll, extraccion, filtrado, telegram...),
+      con la URL y la página donde ocurrió.
+    - increment(): contadores (tarjetas, matches, mensajes enviados...).
+    - sample(): valores medidos cada tanto (memoria del navegador), resumidos como pico y promedio.
+    - end_cycle(): resumen con totales y p50/p95 por fase. Se escribe como línea JSON y como
+      archivo de Prometheus, y queda disponible para el comando /status de Telegram.
+    Las líneas de metrics.jsonl se acumulan en memoria y se escriben juntas al cerrar el ciclo
+    (o cada METRICS_BUFFER_EVENTS), sin abrir el archivo por cada medición.
+    Es seguro entre hilos (workers, bandeja de Telegram, escucha de comandos).
+    """
+
+    def __init__(self, metrics_dir=METRICS_DIR):
+        self.metrics_dir = metrics_dir
+        self._lock = threading.Lock()
+        self.cycle_number = 0
+        self.cycle_started_at = None
+        self.phases = {}
+        self.counters = {}
+        self.samples = {}
+        self.last_summary = None
+        self._pending_events = []
+        # Instante (perf_counter) de la primera navegación del proceso, para medir el arranque en frío
+        self.first_navigation_at = None
+
+    def start_cycle(self):
+        """Reinicia las mediciones (llamar al comenzar cada ciclo)."""
+        with self._lock:
+            self.cycle_number += 1
+            self.cycle_started_at = time.time()
+            self.phases = {}
+            self.counters = {}
+            self.samples = {}
+
+    def observe(self, phase, seconds, url_index=None, page=None):
+        """Registra la duración de una fase."""
+        with self._lock:
+            self.phases.setdefault(phase, []).append(seconds)
+            event = {"ts": round(time.time(), 3), "cycle": self.cycle_number, "phase": phase, "seconds": round(seconds, 4)}
+            if url_index is not None:
+                event["url"] = url_index
+            if page is not None:
+                event["page"] = page
+            self._write_event(event)
+
+    def increment(self, counter, amount=1):
+        """Suma 'amount' a un contador del ciclo."""
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def mark_navigation(self):
+        """Marca la primera navegación a LinkedIn del proceso (las siguientes se ignoran)."""
+        if self.first_navigation_at is None:
+            self.first_navigation_at = time.perf_counter()
+
+    def sample(self, gauge, value, url_index=None, page=None):
+        """Registra una medición puntual (ej: MB de memoria del navegador entre páginas)."""
+        with self._lock:
+            self.samples.setdefault(gauge, []).append(value)
+            event = {"ts": round(time.time(), 3), "cycle": self.cycle_number, "sample": gauge, "value": round(value, 2)}
+            if url_index is not None:
+                event["url"] = url_index
+            if page is not None:
+                event["page"] = page
+            self._write_event(event)
+
+    @contextmanager
+    def timer(self, phase, url_index=None, page=None):
+        """Mide la duración del bloque: with metrics.timer("filtrado"): ..."""
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(phase, time.perf_counter() - start_time, url_index=url_index, page=page)
+
+    def summary(self):
+        """Resumen del ciclo en curso: duración, contadores y count/total/p50/p95 por fase."""
+        with self._lock:
+            return self._build_summary()
+
+    def _build_summary(self):
+        started_at = self.cycle_started_at or time.time()
+        return {
+            "cycle": self.cycle_number,
+            "started_at": datetime.fromtimestamp(started_at).isoformat(timespec="seconds"),
+            "duration_seconds": round(time.time() - started_at, 2),
+            "counters": dict(self.counters),
+            "phases": {
+                phase: {
+                    "count": len(values),
+                    "total": round(sum(values), 3),
+                    "p50": round(percentile(values, 0.5), 3),
+                    "p95": round(percentile(values, 0.95), 3),
+                }
+                for phase, values in self.phases.items()
+            },
+            "samples": {
+                gauge: {
+                    "count": len(values),
+                    "peak": round(max(values), 2),
+                    "avg": round(sum(values) / len(values), 2),
+                }
+                for gauge, values in self.samples.items()
+            },
+        }
+
+    def end_cycle(self):
+        """Cierra el ciclo: guarda el resumen (JSON + Prometheus) y lo retorna."""
+        with self._lock:
+            summary = self._build_summary()
+            self.last_summary = summary
+            self._write_event(dict(summary, type="cycle_summary"))
+            self._flush_events()
+            self._write_prometheus(summary)
+        return summary
+
+    def flush(self):
+        """Escribe las mediciones pendientes (ej: comandos atendidos entre ciclos, al salir)."""
+        with self._lock:
+            self._flush_events()
+
+    def format_summary(self, summary=None):
+        """Texto del resumen (para la consola y para /status en Telegram)."""
+        summary = summary or self.last_summary
+        if not summary:
+            return "📊 Todavía no terminó ningún ciclo."
+        lines = [f"📊 Ciclo #{summary['cycle']} ({summary['started_at']}): {summary['duration_seconds']:.0f}s"]
+        for counter, value in sorted(summary["counters"].items()):
+            lines.append(f"• {counter}: {value}")
+        phases = sorted(summary["phases"].items(), key=lambda item: item[1]["total"], reverse=True)
+        for phase, stats in phases:
+            lines.append(
+                f"⏱️ {phase}: {stats['count']}x, total {stats['total']:.1f}s, "
+                f"p50 {stats['p50']:.2f}s, p95 {stats['p95']:.2f}s"
+            )
+        counters = summary["counters"]
+        lookups = counters.get("detalles_cache_hit", 0) + counters.get("detalles_cache_miss", 0)
+        if lookups:
+            lines.append(f"📇 Caché de detalles: {counters.get('detalles_cache_hit', 0) / lookups:.0%} de aciertos ({lookups} consultas)")
+        for gauge, stats in sorted(summary.get("samples", {}).items()):
+            lines.append(f"🧠 {gauge}: pico {stats['peak']:.0f}, promedio {stats['avg']:.0f} ({stats['count']} muestras)")
+        return "\n".join(lines)
+
+    def _write_event(self, event):
+        if not self.metrics_dir:
+            return
+        self._pending_events.append(json.dumps(event, ensure_ascii=False) + "\n")
+        if len(self._pending_events) >= METRICS_BUFFER_EVENTS:
+            self._flush_events()
+
+    def _flush_events(self):
+        if not self._pending_events:
+            return
+        lines, self._pending_events = self._pending_events, []
+        try:
+            os.makedirs(self.metrics_dir, exist_ok=True)
+            path = os.path.join(self.metrics_dir, METRICS_JSONL_FILE)
+            if os.path.exists(path) and os.path.getsize(path) > METRICS_JSONL_MAX_BYTES:
+                os.replace(path, path + ".1")
+            with open(path, "a", encoding="utf-8") as file_handler:
+                file_handler.writelines(lines)
+        except OSError as e:
+            print(f"   ⚠️ No se pudieron guardar las métricas: {e}")
+
+    def _write_prometheus(self, summary):
+        if not self.metrics_dir:
+            return
+        lines = [
+            "# HELP linkedini_cycle_duration_seconds Duración del último ciclo de búsqueda.",
+            "# TYPE linkedini_cycle_duration_seconds gauge",
+            f"linkedini_cycle_duration_seconds {summary['duration_seconds']}",
+            "# HELP linkedini_cycle_number Número del último ciclo terminado.",
+            "# TYPE linkedini_cycle_number gauge",
+            f"linkedini_cycle_number {summary['cycle']}",
+            "# HELP linkedini_cycle_count Contadores del último ciclo (tarjetas, matches, mensajes...).",
+            "# TYPE linkedini_cycle_count gauge",
+        ]
+        for counter, value in sorted(summary["counters"].items()):
+            lines.append(f'linkedini_cycle_count{{name="{counter}"}} {value}')
+        lines += [
+            "# HELP linkedini_phase_seconds Duración de cada fase en el último ciclo.",
+            "# TYPE linkedini_phase_seconds summary",
+        ]
+        for phase, stats in sorted(summary["phases"].items()):
+            lines.append(f'linkedini_phase_seconds{{phase="{phase}",quantile="0.5"}} {stats["p50"]}')
+            lines.append(f'linkedini_phase_seconds{{phase="{phase}",quantile="0.95"}} {stats["p95"]}')
+            lines.append(f'linkedini_phase_seconds_sum{{phase="{phase}"}} {stats["total"]}')
+            lines.append(f'linkedini_phase_seconds_count{{phase="{phase}"}} {stats["count"]}')
+        if summary["samples"]:
+            lines += [
+                "# HELP linkedini_sample_peak Valor máximo medido en el último ciclo (ej: memoria del navegador en MB).",
+                "# TYPE linkedini_sample_peak gauge",
+            ]
+            for gauge, stats in sorted(summary["samples"].items()):
+                lines.append(f'linkedini_sample_peak{{name="{gauge}"}} {stats["peak"]}')
+            lines += [
+                "# HELP linkedini_sample_avg Promedio de las mediciones del último ciclo.",
+                "# TYPE linkedini_sample_avg gauge",
+            ]
+            for gauge, stats in sorted(summary["samples"].items()):
+                lines.append(f'linkedini_sample_avg{{name="{gauge}"}} {stats["avg"]}')
+
+        try:
+            os.makedirs(self.metrics_dir, exist_ok=True)
+            path = os.path.join(self.metrics_dir, METRICS_PROM_FILE)
+            # Escritura atómica: el collector nunca lee un archivo a medio escribir
+            temp_path = path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as file_handler:
+                file_handler.write("\n".join(with_shard_label(line) for line in lines) + "\n")
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"   ⚠️ No se pudieron guardar las métricas: {e}")
+
+# Instancia global para usar en todo el proyecto
+metrics = CycleMetrics()
+atexit.register(metrics.flush)
@@ -1,33 +1,230 @@
+import json
+import os
+import re
+import threading
+import time
 import requests
-from src.config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
+from src.config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, TELEGRAM_MIN_INTERVAL, shard_file_name
+from src.metrics import metrics
 
-def send_telegram_message(message):
+# Archivo donde se guardan los mensajes pendientes (sobreviven a un corte del proceso; uno por shard)
+OUTBOX_FILE = shard_file_name("telegram_outbox.json")
+
+# Límite de caracteres de un mensaje de Telegram
+TELEGRAM_MAX_MESSAGE_LENGTH = 4096
+
+# Intentos para errores que no son de red ni 429 (ej: HTML inválido). Luego se descarta.
+MAX_SEND_ATTEMPTS = 5
+
+# Sesión HTTP persistente: reutiliza la conexión TLS con api.telegram.org
+_session = None
+_session_lock = threading.Lock()
+
+def _get_session():
+    global _session
+    if _session is None:
+        _session = requests.Session()
+    return _session
+
+def _post_message(message):
     """
-    Envía un mensaje a Telegram mediante solicitud HTTP POST.
-    Retorna True si el envío fue exitoso (Status 200).
+    Envía un mensaje y retorna (enviado, reintentar_en_segundos).
+    reintentar_en_segundos es None si no tiene sentido reintentar.
     """
-    
-    if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
-        print("   ⚠️ Configuración de Telegram incompleta (Falta TOKEN o CHAT_ID). Mensaje omitido.")
-        return False
-
     url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    
+
     payload = {
         "chat_id": TELEGRAM_CHAT_ID,
-        "text": message,             
+        "text": message,
         "parse_mode": "HTML"
     }
 
     try:
-        response = requests.post(url, json=payload, timeout=10)
-        
-        if response.status_code == 200:
-            return True
-        else:
-            print(f"   ❌ Error en la API de Telegram: {response.text}")
-            return False
-            
+        with _session_lock:
+            response = _get_session().post(url, json=payload, timeout=10)
     except Exception as e:
         print(f"   ❌ Excepción al enviar a Telegram: {e}")
+        return False, 5
+
+    if response.status_code == 200:
+        return True, None
+
+    if response.status_code == 429:
+        # Límite de Telegram: nos indica cuántos segundos esperar
+        try:
+            retry_after = response.json().get("parameters", {}).get("retry_after", 5)
+        except ValueError:
+            retry_after = 5
+        print(f"   ⏳ Telegram pidió esperar {retry_after}s (límite de mensajes).")
+        return False, retry_after
+
+    print(f"   ❌ Error en la API de Telegram: {response.text}")
+    # 5xx: problema temporal de Telegram. 4xx: el mensaje en sí es inválido.
+    return False, (5 if response.status_code >= 500 else None)
+
+def send_telegram_message(message):
+    """
+    Envía un mensaje a Telegram mediante solicitud HTTP POST (de forma sincrónica).
+    Retorna True si el envío fue exitoso (Status 200).
+    """
+
+    if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
+        print("   ⚠️ Configuración de Telegram incompleta (Falta TOKEN o CHAT_ID). Mensaje omitido.")
         return False
+
+    sent, _ = _post_message(message)
+    return sent
+
+def _split_item(item, limit):
+    """
+    Parte un aviso que no entra en un mensaje por líneas completas (las etiquetas
+    <b>/<a> de un aviso abren y cierran en la misma línea, así que nunca quedan cortadas).
+    Una línea que sola supera el límite pierde sus etiquetas y se recorta como texto plano.
+    """
+    parts = []
+    current = ""
+    for line in item.split("\n"):
+        if len(line) > limit:
+            line = re.sub(r"<[^>]*>", "", line)[:limit]
+        candidate = current + "\n" + line if current else line
+        if len(candidate) > limit and current:
+            parts.append(current)
+            candidate = line
+        current = candidate
+    if current:
+        parts.append(current)
+    return parts
+
+def build_digest_messages(header, items):
+    """
+    Une varios avisos en la menor cantidad de mensajes posible,
+    sin pasar el límite de TELEGRAM_MAX_MESSAGE_LENGTH caracteres por mensaje.
+    Los mensajes se cortan entre avisos, nunca en medio del HTML de uno.
+    """
+    limit = TELEGRAM_MAX_MESSAGE_LENGTH - len(header) - 2
+    pieces = []
+    for item in items:
+        # Un aviso individual nunca debería pasar el límite, pero por las dudas se parte por líneas
+        pieces.extend(_split_item(item, limit) if len(item) > limit else [item])
+
+    messages = []
+    current = header
+    for item in pieces:
+        candidate = current + "\n\n" + item
+        if len(candidate) > TELEGRAM_MAX_MESSAGE_LENGTH and current != header:
+            messages.append(current)
+            candidate = header + "\n\n" + item
+        current = candidate
+    if current != header:
+        messages.append(current)
+    return messages
+
+class TelegramOutbox:
+    """
+    Bandeja de salida de Telegram con envío en segundo plano.
+
+    - El scraping solo encola (no espera la respuesta HTTP).
+    - Un hilo envía respetando un intervalo mínimo entre mensajes (TELEGRAM_MIN_INTERVAL)
+      y el 'retry_after' que Telegram devuelve con un 429.
+    - Los pendientes se guardan en OUTBOX_FILE: si el proceso se corta, se envían al volver.
+    """
+
+    def __init__(self, path=OUTBOX_FILE, min_interval=TELEGRAM_MIN_INTERVAL):
+        self.path = path
+        self.min_interval = min_interval
+        self.pending = []
+        self._condition = threading.Condition()
+        self._thread = None
+        self._sending = False
+        self._last_sent_at = 0
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as file_handler:
+                return json.load(file_handler)
+        except (OSError, ValueError):
+            return []
+
+    def _persist(self):
+        """Guarda los pendientes de forma atómica (temporal + os.replace)."""
+        try:
+            temp_path = self.path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as file_handler:
+                json.dump(self.pending, file_handler, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"   ⚠️ No se pudo guardar la bandeja de Telegram: {e}")
+
+    def start(self):
+        """Carga los pendientes de la corrida anterior y arranca el hilo de envío (una sola vez)."""
+        with self._condition:
+            if self._thread is not None:
+                return
+            recovered = self._load()
+            if recovered:
+                print(f"   📬 Recuperados {len(recovered)} mensajes de Telegram pendientes.")
+            self.pending = recovered + self.pending
+            self._thread = threading.Thread(target=self._run, name="telegram-outbox", daemon=True)
+            self._thread.start()
+
+    def enqueue(self, message):
+        """Agrega un mensaje a la cola de envío."""
+        if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
+            print("   ⚠️ Configuración de Telegram incompleta (Falta TOKEN o CHAT_ID). Mensaje omitido.")
+            return
+        self.start()
+        with self._condition:
+            self.pending.append({"text": message, "attempts": 0})
+            self._persist()
+            self._condition.notify_all()
+
+    def enqueue_digest(self, header, items):
+        """Encola varios avisos agrupados en uno o más mensajes de resumen."""
+        for message in build_digest_messages(header, items):
+            self.enqueue(message)
+
+    def flush(self, timeout=30):
+        """Espera (hasta 'timeout' segundos) a que se envíe todo lo pendiente."""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self.pending or self._sending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._thread is None:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self.pending:
+                    self._condition.wait()
+                entry = self.pending[0]
+                self._sending = True
+
+            # Respetamos el intervalo mínimo entre mensajes al mismo chat
+            wait_seconds = self._last_sent_at + self.min_interval - time.monotonic()
+            if wait_seconds > 0:
+                time.sleep(wait_seconds)
+
+            send_started_at = time.monotonic()
+            sent, retry_after = _post_message(entry["text"])
+            self._last_sent_at = time.monotonic()
+            metrics.observe("telegram_envio", self._last_sent_at - send_started_at)
+            metrics.increment("telegram_enviados" if sent else "telegram_fallidos")
+
+            with self._condition:
+                entry["attempts"] += 1
+                if sent or (retry_after is None and entry["attempts"] >= MAX_SEND_ATTEMPTS):
+                    if not sent:
+                        print("   🗑️ Mensaje de Telegram descartado tras varios intentos fallidos.")
+                    self.pending.pop(0)
+                    self._persist()
+                self._sending = False
+                self._condition.notify_all()
+
+            if not sent:
+                time.sleep(retry_after if retry_after is not None else 2)
+
+# Instancia global para usar en todo el proyecto
+outbox = TelegramOutbox()
@@ -0,0 +1,160 @@
+import queue
+import threading
+import time
+from src.config import PIPELINE_WORKERS, PIPELINE_QUEUE_SIZE
+from src.metrics import metrics
+
+class JobPipeline:
+    """
+    Etapas desacopladas extracción -> filtrado -> notificación para cada página de resultados.
+
+    El bot (productor) extrae las tarjetas de una página como registros planos y los deja en
+    una cola acotada; un pool de hilos consumidores ejecuta 'handler' (historial, keywords,
+    detalle y Telegram) mientras el navegador ya avanza a la página siguiente.
+
+    - La cola admite hasta PIPELINE_QUEUE_SIZE páginas: si los consumidores van atrasados,
+      el productor espera (contrapresión) en lugar de acumular páginas en memoria.
+    - Profundidad de la cola, esperas por contrapresión y registros por segundo de cada etapa
+      quedan en las métricas del ciclo.
+    - drain() espera a que se procese todo lo encolado (antes de guardar el historial de una URL).
+    - defer() encola otra tarea detrás de las páginas (ej: la escritura en lote del historial).
+    Con PIPELINE_WORKERS=0 no hay hilos: submit() procesa la página en el acto.
+    """
+
+    def __init__(self, handler, workers=PIPELINE_WORKERS, queue_size=PIPELINE_QUEUE_SIZE):
+        self.handler = handler
+        self.workers = workers
+        self.queue_size = max(1, queue_size)
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._threads = []
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Reinicia los contadores de una corrida."""
+        with self._stats_lock:
+            self.produced_records = 0
+            self.produce_seconds = 0.0
+            self.consumed_records = 0
+            self.consume_seconds = 0.0
+            self.backpressure_waits = 0
+            self.backpressure_seconds = 0.0
+            self.peak_depth = 0
+
+    def _start(self):
+        # Los hilos se crean recién con la primera página (y de nuevo tras un close())
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._consume_loop, name=f"pipeline-{len(self._threads) + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, job_records, produce_seconds=0.0, url_index=None, page=None, **context):
+        """
+        Encola los registros de una página. 'produce_seconds' es lo que tardó el navegador en
+        obtenerlos (para el ritmo de la etapa de extracción); el resto se pasa a 'handler'.
+        """
+        with self._stats_lock:
+            self.produced_records += len(job_records)
+            self.produce_seconds += produce_seconds
+
+        context.update(url_index=url_index, page=page)
+        if not self.workers:
+            self._run(job_records, context)
+            return
+
+        self._start()
+        try:
+            self._queue.put_nowait((self._run, (job_records, context)))
+        except queue.Full:
+            # Contrapresión: los consumidores no dan abasto y el navegador espera un lugar en la cola
+            wait_started = time.perf_counter()
+            self._queue.put((self._run, (job_records, context)))
+            waited = time.perf_counter() - wait_started
+            with self._stats_lock:
+                self.backpressure_waits += 1
+                self.backpressure_seconds += waited
+            metrics.increment("pipeline_contrapresion")
+            metrics.observe("pipeline_espera_productor", waited, url_index=url_index, page=page)
+
+        depth = self._queue.qsize()
+        with self._stats_lock:
+            self.peak_depth = max(self.peak_depth, depth)
+        metrics.sample("pipeline_cola", depth, url_index=url_index, page=page)
+
+    def defer(self, task, *args):
+        """
+        Ejecuta 'task(*args)' en un hilo del pipeline, después de lo ya encolado.
+        Sin hilos (PIPELINE_WORKERS=0) se ejecuta en el acto.
+        """
+        if not self.workers:
+            self._run_task(task, args)
+            return
+        self._start()
+        self._queue.put((self._run_task, (task, args)))
+
+    def _run_task(self, task, args):
+        try:
+            task(*args)
+        except Exception as e:
+            print(f"      ⚠️ Error en una tarea del pipeline: {e}")
+
+    def _run(self, job_records, context):
+        started_at = time.perf_counter()
+        try:
+            self.handler(job_records, **context)
+        except Exception as e:
+            print(f"      ⚠️ Error procesando la página {context.get('page')} en el pipeline: {e}")
+        elapsed = time.perf_counter() - started_at
+        with self._stats_lock:
+            self.consumed_records += len(job_records)
+            self.consume_seconds += elapsed
+
+    def _consume_loop(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                function, args = item
+                function(*args)
+            finally:
+                self._queue.task_done()
+
+    def drain(self):
+        """Espera a que los consumidores terminen todas las páginas encoladas."""
+        if self._threads:
+            self._queue.join()
+
+    def close(self):
+        """Vacía la cola y detiene los hilos (se vuelven a crear si llega otra página)."""
+        self.drain()
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    def summary(self):
+        """Ritmo de cada etapa (registros por segundo de trabajo) y contrapresión de la corrida."""
+        with self._stats_lock:
+            return {
+                "extraccion_por_segundo": self.produced_records / self.produce_seconds if self.produce_seconds else 0.0,
+                "filtrado_por_segundo": self.consumed_records / self.consume_seconds if self.consume_seconds else 0.0,
+                "registros": self.consumed_records,
+                "cola_pico": self.peak_depth,
+                "contrapresion": self.backpressure_waits,
+                "contrapresion_segundos": self.backpressure_seconds,
+            }
+
+    def print_summary(self):
+        """Imprime el resumen y publica el ritmo de cada etapa en las métricas del ciclo."""
+        summary = self.summary()
+        if not summary["registros"]:
+            return
+        metrics.sample("pipeline_extraccion_reg_s", summary["extraccion_por_segundo"])
+        metrics.sample("pipeline_filtrado_reg_s", summary["filtrado_por_segundo"])
+        print(
+            f"   🚰 Pipeline ({self.workers} hilos): extracción {summary['extraccion_por_segundo']:.1f} reg/s, "
+            f"filtrado {summary['filtrado_por_segundo']:.1f} reg/s, cola pico {summary['cola_pico']}/{self.queue_size}, "
+            f"contrapresión {summary['contrapresion']}x ({summary['contrapresion_segundos']:.1f}s)"
+        )
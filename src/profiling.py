@@ -0,0 +1,122 @@
+import cProfile
+import io
+import os
+import pstats
+import time
+import tracemalloc
+from datetime import datetime
+from src.config import PROFILE_MODE, PROFILE_DIR, PROFILE_KEEP, PROFILE_TOP_N, shard_file_name
+
+# Archivos que no interesan en los diffs de memoria (el propio tracemalloc y el import de módulos)
+TRACEMALLOC_IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+class CycleProfiler:
+    """
+    Perfilado opcional de un ciclo de búsqueda (PROFILE_MODE en el .env).
+
+    - "cpu": cProfile del ciclo -> <PROFILE_DIR>/cycle_<fecha>.prof (para snakeviz/pstats)
+      y un resumen de texto con las PROFILE_TOP_N funciones más costosas.
+    - "memory": snapshot de tracemalloc al final de cada ciclo, comparado con el del ciclo
+      anterior -> <PROFILE_DIR>/cycle_<fecha>_memory.txt (las líneas que más crecieron).
+    - "both": ambos. "off" (por defecto): start()/stop() no hacen nada.
+
+    Solo se guardan los archivos de los últimos PROFILE_KEEP ciclos.
+    Nota: cProfile mide el hilo que lo activa (el principal); con SEARCH_WORKERS > 1 el
+    trabajo de los workers no aparece en el .prof, pero sí en el diff de memoria.
+    """
+
+    def __init__(self, mode=PROFILE_MODE, profile_dir=shard_file_name(PROFILE_DIR), keep=PROFILE_KEEP, top_n=PROFILE_TOP_N):
+        self.cpu_enabled = mode in ("cpu", "both")
+        self.memory_enabled = mode in ("memory", "both")
+        self.profile_dir = profile_dir
+        self.keep = keep
+        self.top_n = top_n
+        self._profiler = None
+        self._previous_snapshot = None
+        self._started_at = None
+
+    @property
+    def enabled(self):
+        return self.cpu_enabled or self.memory_enabled
+
+    def start(self):
+        """Empieza a perfilar un ciclo (si quedó uno abierto, lo cierra antes)."""
+        if not self.enabled:
+            return
+        if self._started_at is not None:
+            self.stop()
+
+        self._started_at = time.time()
+        if self.memory_enabled and not tracemalloc.is_tracing():
+            # 10 frames alcanzan para ubicar quién reserva sin disparar el overhead
+            tracemalloc.start(10)
+        if self.cpu_enabled:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop(self):
+        """Termina el ciclo perfilado y guarda los reportes."""
+        if not self.enabled or self._started_at is None:
+            return
+
+        os.makedirs(self.profile_dir, exist_ok=True)
+        prefix = os.path.join(self.profile_dir, "cycle_" + datetime.fromtimestamp(self._started_at).strftime("%Y%m%d_%H%M%S"))
+        self._started_at = None
+
+        try:
+            if self._profiler is not None:
+                self._profiler.disable()
+                self._write_cpu_report(prefix)
+                self._profiler = None
+            if self.memory_enabled:
+                self._write_memory_report(prefix)
+            self._rotate()
+        except Exception as e:
+            print(f"   ⚠️ No se pudo guardar el perfilado: {e}")
+
+    def _write_cpu_report(self, prefix):
+        self._profiler.dump_stats(prefix + ".prof")
+
+        output = io.StringIO()
+        stats = pstats.Stats(self._profiler, stream=output)
+        stats.sort_stats("cumulative").print_stats(self.top_n)
+        with open(prefix + ".txt", "w", encoding="utf-8") as file_handler:
+            file_handler.write(output.getvalue())
+        print(f"   🔬 Perfil de CPU guardado en {prefix}.prof (resumen en {prefix}.txt)")
+
+    def _write_memory_report(self, prefix):
+        snapshot = tracemalloc.take_snapshot().filter_traces(TRACEMALLOC_IGNORED)
+        current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+
+        lines = [f"Memoria trazada: actual {current_bytes / 1024 / 1024:.1f} MB, pico {peak_bytes / 1024 / 1024:.1f} MB", ""]
+        if self._previous_snapshot is None:
+            lines.append(f"Primer ciclo: top {self.top_n} por tamaño")
+            lines += [str(stat) for stat in snapshot.statistics("lineno")[:self.top_n]]
+        else:
+            lines.append(f"Crecimiento respecto del ciclo anterior: top {self.top_n}")
+            lines += [str(stat) for stat in snapshot.compare_to(self._previous_snapshot, "lineno")[:self.top_n]]
+        self._previous_snapshot = snapshot
+        tracemalloc.reset_peak()
+
+        with open(prefix + "_memory.txt", "w", encoding="utf-8") as file_handler:
+            file_handler.write("\n".join(lines) + "\n")
+        print(f"   🔬 Snapshot de memoria guardado en {prefix}_memory.txt ({current_bytes / 1024 / 1024:.1f} MB trazados)")
+
+    def _rotate(self):
+        """Borra los reportes de los ciclos más viejos (se conservan los últimos 'keep')."""
+        cycles = {}
+        for file_name in os.listdir(self.profile_dir):
+            if file_name.startswith("cycle_"):
+                cycle_id = file_name[len("cycle_"):len("cycle_YYYYmmdd_HHMMSS")]
+                cycles.setdefault(cycle_id, []).append(file_name)
+        for cycle_id in sorted(cycles)[:-self.keep or None]:
+            for file_name in cycles[cycle_id]:
+                os.remove(os.path.join(self.profile_dir, file_name))
+
+# Instancia global para usar en todo el proyecto
+cycle_profiler = CycleProfiler()
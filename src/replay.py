@@ -0,0 +1,392 @@
+"""
+Grabación y reproducción offline de búsquedas de LinkedIn.
+
+- PageRecorder: durante una corrida real (RECORD_DIR en el .env) guarda cada página de
+  resultados ya scrolleada, sanitizada (sin scripts, datos embebidos, imágenes ni trackers).
+  Con SEARCH_ENGINE=http guarda en cambio los fragmentos del endpoint público.
+- ReplayServer: servidor HTTP local que sirve esas páginas con la misma forma de URL
+  (incluida la paginación por 'start='), para que LinkedInBot.search() corra sin cambios.
+  También sirve los fragmentos grabados, para LinkedInHttpBot.
+- Benchmark: corre un ciclo completo contra el servidor (Chrome headless o motor HTTP) y
+  reporta tiempo por fase, llamadas a WebDriver y tarjetas por segundo.
+
+Uso:
+    python -m src.replay serve --dir recordings
+    python -m src.replay bench --dir recordings [--engine selenium|http|both] [--show-browser] [--json resultado.json]
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+MANIFEST_FILE = "manifest.json"
+RESULTS_PER_PAGE = 25
+
+# Reglas de sanitizado: nada ejecutable, nada que identifique a la cuenta, nada que salga a la red
+SANITIZE_RULES = [
+    (re.compile(r"<script\b.*?</script>", re.S | re.I), ""),
+    (re.compile(r"<noscript\b.*?</noscript>", re.S | re.I), ""),
+    (re.compile(r"<code\b.*?</code>", re.S | re.I), ""),           # Estado JSON embebido (datos del miembro)
+    (re.compile(r"<iframe\b.*?</iframe>", re.S | re.I), ""),
+    (re.compile(r"<header\b[^>]*global-nav.*?</header>", re.S | re.I), ""),  # Barra con nombre/foto
+    (re.compile(r"<(?:link|meta|base)\b[^>]*>", re.I), ""),
+    (re.compile(r"\s(?:src|srcset|data-delayed-url)=\"[^\"]*\"", re.I), ""),
+    (re.compile(r"\son[a-z]+=\"[^\"]*\"", re.I), ""),
+    # Links de ofertas sin parámetros de rastreo (refId, trackingId, eBP...)
+    (re.compile(r"(href=\"[^\"]*/jobs/view/[^\"?]+)\?[^\"]*\"", re.I), r'\1"'),
+]
+
+def sanitize_page(html):
+    """Limpia el HTML de una página de resultados antes de guardarlo."""
+    for pattern, replacement in SANITIZE_RULES:
+        html = pattern.sub(replacement, html)
+    return html
+
+class PageRecorder:
+    """
+    Guarda páginas de resultados en 'record_dir/search_<n>/page_<m>.html' (o fragmentos del
+    motor HTTP en 'fragment_<start>.html') y mantiene un manifest.json con la URL original
+    y la cantidad de páginas/fragmentos de cada búsqueda.
+    """
+
+    def __init__(self, record_dir):
+        self.record_dir = record_dir
+        self._lock = threading.Lock()
+
+    def _manifest_path(self):
+        return os.path.join(self.record_dir, MANIFEST_FILE)
+
+    def _load_manifest(self):
+        try:
+            with open(self._manifest_path(), "r", encoding="utf-8") as file_handler:
+                return json.load(file_handler)
+        except (OSError, ValueError):
+            return {"searches": {}}
+
+    def capture(self, url_index, base_url, page_num, html):
+        """Guarda una página (ya scrolleada) y actualiza el manifest."""
+        search_dir = os.path.join(self.record_dir, f"search_{url_index}")
+        os.makedirs(search_dir, exist_ok=True)
+        with open(os.path.join(search_dir, f"page_{page_num}.html"), "w", encoding="utf-8") as file_handler:
+            file_handler.write(sanitize_page(html))
+
+        self._update_manifest(url_index, base_url, "pages", page_num)
+        print(f"      💾 Página {page_num} grabada en {search_dir}")
+
+    def capture_fragment(self, url_index, base_url, start, html):
+        """Guarda un fragmento del endpoint público (motor HTTP) y actualiza el manifest."""
+        search_dir = os.path.join(self.record_dir, f"search_{url_index}")
+        os.makedirs(search_dir, exist_ok=True)
+        with open(os.path.join(search_dir, f"fragment_{start}.html"), "w", encoding="utf-8") as file_handler:
+            file_handler.write(sanitize_page(html))
+
+        self._update_manifest(url_index, base_url, "fragments", None)
+        print(f"      💾 Fragmento start={start} grabado en {search_dir}")
+
+    def _update_manifest(self, url_index, base_url, counter_name, page_num):
+        with self._lock:
+            manifest = self._load_manifest()
+            search_entry = manifest["searches"].setdefault(str(url_index), {"url": base_url, "pages": 0})
+            search_entry["url"] = base_url
+            if page_num is None:
+                search_entry[counter_name] = search_entry.get(counter_name, 0) + 1
+            else:
+                search_entry[counter_name] = max(search_entry.get(counter_name, 0), page_num)
+            manifest["recorded_at"] = datetime.now().isoformat()
+
+            temp_path = self._manifest_path() + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as file_handler:
+                json.dump(manifest, file_handler, indent=4, ensure_ascii=False)
+            os.replace(temp_path, self._manifest_path())
+
+
+# Script inyectado en cada página servida: los botones Siguiente/Anterior navegan por 'start='
+# (como LinkedIn) y 'Siguiente' queda deshabilitado en la última página grabada.
+PAGINATION_SHIM = """
+<script>
+(function () {
+    var page = %(page)d, lastPage = %(last_page)d, pageSize = %(page_size)d;
+    function goTo(targetPage) {
+        var url = new URL(location.href);
+        url.searchParams.set("start", String((targetPage - 1) * pageSize));
+        location.href = url.toString();
+    }
+    var next = document.querySelector("button.jobs-search-pagination__button--next");
+    if (next) {
+        next.disabled = page >= lastPage;
+        next.addEventListener("click", function (event) { event.preventDefault(); if (page < lastPage) goTo(page + 1); });
+    }
+    var previous = document.querySelector("button.jobs-search-pagination__button--previous");
+    if (previous) {
+        previous.disabled = page <= 1;
+        previous.addEventListener("click", function (event) { event.preventDefault(); if (page > 1) goTo(page - 1); });
+    }
+})();
+</script>
+"""
+
+EMPTY_PAGE = "<html><body><p>Sin resultados grabados.</p></body></html>"
+
+class ReplayServer:
+    """
+    Servidor HTTP local que reproduce una grabación.
+    Cada búsqueda se sirve en '/replay/<n>/jobs/search/?<query original>&start=<offset>',
+    y sus fragmentos (motor HTTP) en '/replay/<n>/jobs-guest/jobs/api/seeMoreJobPostings/search?...&start=<offset>'.
+    """
+
+    def __init__(self, record_dir, host="127.0.0.1", port=0):
+        self.record_dir = os.path.abspath(record_dir)
+        with open(os.path.join(self.record_dir, MANIFEST_FILE), "r", encoding="utf-8") as file_handler:
+            self.manifest = json.load(file_handler)
+
+        replay_server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                status, body = replay_server.render(self.path)
+                payload = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass  # Silencio: el benchmark no necesita el log de accesos
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.host, self.port = self.httpd.server_address[:2]
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="replay-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def search_urls(self):
+        """URLs locales equivalentes a las búsquedas grabadas (conservan la query original)."""
+        urls = []
+        for url_index in sorted(self.manifest["searches"], key=int):
+            original_query = urlsplit(self.manifest["searches"][url_index]["url"]).query
+            urls.append(f"http://{self.host}:{self.port}/replay/{url_index}/jobs/search/?{original_query}")
+        return urls
+
+    def render(self, request_path):
+        """Retorna (status HTTP, HTML) para una ruta pedida."""
+        parts = urlsplit(request_path)
+        fragment_match = re.match(r"^/replay/(\d+)/jobs-guest/jobs/api/seeMoreJobPostings/search/?$", parts.path)
+        if fragment_match:
+            return self.render_fragment(fragment_match.group(1), parts.query)
+
+        match = re.match(r"^/replay/(\d+)/jobs/search/?$", parts.path)
+        if not match:
+            return 404, EMPTY_PAGE
+
+        search_entry = self.manifest["searches"].get(match.group(1))
+        if not search_entry:
+            return 404, EMPTY_PAGE
+
+        start = int(parse_qs(parts.query).get("start", ["0"])[0] or 0)
+        page = start // RESULTS_PER_PAGE + 1
+        page_path = os.path.join(self.record_dir, f"search_{match.group(1)}", f"page_{page}.html")
+        if not os.path.exists(page_path):
+            return 200, EMPTY_PAGE
+
+        with open(page_path, "r", encoding="utf-8") as file_handler:
+            html = file_handler.read()
+
+        shim = PAGINATION_SHIM % {"page": page, "last_page": search_entry["pages"], "page_size": RESULTS_PER_PAGE}
+        if "</body>" in html:
+            return 200, html.replace("</body>", shim + "</body>", 1)
+        return 200, html + shim
+
+    def render_fragment(self, url_index, query):
+        """Fragmento grabado para 'start='; pasado el último, un cuerpo vacío (como LinkedIn)."""
+        if url_index not in self.manifest["searches"]:
+            return 404, ""
+        start = int(parse_qs(query).get("start", ["0"])[0] or 0)
+        fragment_path = os.path.join(self.record_dir, f"search_{url_index}", f"fragment_{start}.html")
+        if not os.path.exists(fragment_path):
+            return 200, ""
+        with open(fragment_path, "r", encoding="utf-8") as file_handler:
+            return 200, file_handler.read()
+
+
+class WebDriverCallCounter:
+    """Cuenta los comandos WebDriver (cada uno es un viaje HTTP a chromedriver)."""
+
+    def __init__(self, driver):
+        self.counts = Counter()
+        original_execute = driver.execute
+
+        def counting_execute(driver_command, params=None):
+            self.counts[driver_command] += 1
+            return original_execute(driver_command, params)
+
+        # Los WebElement también pasan por driver.execute, así que se cuentan igual
+        driver.execute = counting_execute
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+
+def run_benchmark(record_dir, headless=True, engine="selenium"):
+    """
+    Corre search() completo contra la grabación y retorna un dict con los resultados.
+    engine: "selenium" (LinkedInBot sobre las páginas) o "http" (LinkedInHttpBot sobre los fragmentos).
+    Trabaja en un directorio temporal para no tocar el historial ni el offset de Telegram reales.
+    """
+    record_dir = os.path.abspath(record_dir)
+    project_dir = os.getcwd()
+    work_dir = tempfile.mkdtemp(prefix="linkedini_bench_")
+    if os.path.exists(os.path.join(project_dir, "keywords.json")):
+        shutil.copy(os.path.join(project_dir, "keywords.json"), work_dir)
+
+    # Sin Telegram: ni notificaciones reales ni consumo de comandos pendientes
+    os.environ["TELEGRAM_BOT_TOKEN"] = ""
+    os.environ["TELEGRAM_CHAT_ID"] = ""
+    os.chdir(work_dir)
+
+    from src.driver import get_driver
+    from src.history import history
+    from src.keywords_manager import keyword_store
+    from src.linkedin import LinkedInBot
+    from src.linkedin_http import LinkedInHttpBot
+    from src.metrics import metrics
+
+    # Cada motor arranca con un historial vacío (el de work_dir), keywords releídas y métricas nuevas:
+    # con '--engine both' el segundo motor no debe encontrar las ofertas ya reservadas por el primero
+    history.reopen()
+    history.start_cycle()
+    keyword_store.invalidate()
+    metrics.start_cycle()
+
+    def collecting(bot_class):
+        class ReplayBot(bot_class):
+            """El bot sin cambios salvo que junta las notificaciones en vez de enviarlas."""
+
+            def __init__(self, driver):
+                super().__init__(driver)
+                self.notifications = []
+
+            def notify(self, message, url_index=None, page=None):
+                self.notifications.append(message)
+
+            def flush_matches(self, header, matches=None):
+                # En modo resumen contamos cada oferta, no cada mensaje agrupado
+                if matches is None:
+                    matches, self.pending_matches = self.pending_matches, []
+                self.notifications.extend(matches)
+
+        return ReplayBot
+
+    server = ReplayServer(record_dir).start()
+    driver = None
+    counter = None
+    try:
+        if engine == "http":
+            bot = collecting(LinkedInHttpBot)(None)
+            # Sin pausas de cortesía: el servidor es local
+            bot.page_delay = 0
+        else:
+            driver = get_driver(profile_dir=os.path.join(work_dir, "profile"), headless=headless)
+            counter = WebDriverCallCounter(driver)
+            bot = collecting(LinkedInBot)(driver)
+
+        start_time = time.perf_counter()
+        bot.search(urls=server.search_urls())
+        wall_seconds = time.perf_counter() - start_time
+    finally:
+        if driver:
+            driver.quit()
+        server.stop()
+        # Soltamos seen_jobs.db antes de borrar la carpeta temporal
+        history.reopen()
+        os.chdir(project_dir)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        "engine": engine,
+        "searches": len(server.manifest["searches"]),
+        "wall_seconds": wall_seconds,
+        "cards": bot.total_cards_seen,
+        "cards_per_second": bot.total_cards_seen / wall_seconds if wall_seconds else 0.0,
+        "matches": len(bot.notifications),
+        "phases": {name: {"count": len(values), "total": sum(values)} for name, values in bot.step_times.items()},
+        "webdriver_calls": counter.total if counter else 0,
+        "webdriver_calls_by_command": dict(counter.counts.most_common()) if counter else {},
+    }
+
+def print_benchmark(result):
+    print("\n========================================")
+    print(f"📊 BENCHMARK (replay offline, motor {result['engine']})")
+    print("========================================")
+    print(f"   Búsquedas: {result['searches']} | Tarjetas: {result['cards']} | Matches: {result['matches']}")
+    print(f"   Tiempo total: {result['wall_seconds']:.1f}s | {result['cards_per_second']:.2f} tarjetas/s")
+    print("   ⏱️ Por fase:")
+    for phase_name, phase in result["phases"].items():
+        print(f"      - {phase_name}: {phase['count']}x, total {phase['total']:.2f}s")
+    print(f"   🔌 Llamadas a WebDriver: {result['webdriver_calls']}")
+    for command, count in result["webdriver_calls_by_command"].items():
+        print(f"      - {command}: {count}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay offline de búsquedas de LinkedIn grabadas.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="Sirve una grabación por HTTP.")
+    serve_parser.add_argument("--dir", required=True, help="Carpeta de la grabación (RECORD_DIR).")
+    serve_parser.add_argument("--port", type=int, default=8765)
+
+    bench_parser = subparsers.add_parser("bench", help="Benchmark de search() contra una grabación.")
+    bench_parser.add_argument("--dir", required=True, help="Carpeta de la grabación (RECORD_DIR).")
+    bench_parser.add_argument("--engine", choices=["selenium", "http", "both"], default="selenium",
+                              help="Motor a medir ('both' compara tarjetas/s entre ambos).")
+    bench_parser.add_argument("--show-browser", action="store_true", help="No usar modo headless.")
+    bench_parser.add_argument("--json", help="Guardar el resultado en este archivo JSON.")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        server = ReplayServer(args.dir, port=args.port).start()
+        print(f"🎞️ Sirviendo {args.dir} en http://{server.host}:{server.port}")
+        for url in server.search_urls():
+            print(f"   🔗 {url}")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            server.stop()
+        return 0
+
+    engines = ["selenium", "http"] if args.engine == "both" else [args.engine]
+    results = {engine: run_benchmark(args.dir, headless=not args.show_browser, engine=engine) for engine in engines}
+    for engine_result in results.values():
+        print_benchmark(engine_result)
+
+    if len(results) == 2 and results["selenium"]["cards_per_second"]:
+        speedup = results["http"]["cards_per_second"] / results["selenium"]["cards_per_second"]
+        print(f"\n⚖️ Motor HTTP vs Selenium: {speedup:.1f}x tarjetas/s")
+
+    result = results if len(results) > 1 else results[engines[0]]
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file_handler:
+            json.dump(result, file_handler, indent=4)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
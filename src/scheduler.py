@@ -0,0 +1,163 @@
+import heapq
+import json
+import os
+import threading
+import time
+from src.config import (
+    SEARCH_INTERVAL, SCHEDULE_MIN_INTERVAL, SCHEDULE_MAX_INTERVAL,
+    SCHEDULE_TARGET_NEW, SCHEDULE_BATCH_WINDOW, shard_file_name,
+)
+
+# Archivo donde se guardan los intervalos aprendidos (sobreviven a un reinicio; uno por shard)
+SCHEDULE_FILE = shard_file_name("schedule.json")
+
+# Peso de la última observación en la tasa de ofertas nuevas (media móvil exponencial)
+RATE_SMOOTHING = 0.5
+
+# Factor con el que se alarga el intervalo de una búsqueda que no trajo nada nuevo
+EMPTY_RUN_BACKOFF = 1.5
+
+# Cortes anormales de una URL (excepción, sesión caída, bloqueo o rechazo del motor HTTP):
+# la pasada no revisó la búsqueda de verdad, así que no cuenta para la tasa ni el intervalo
+ABNORMAL_STOP_REASONS = {"error", "bajo_rendimiento", "bloqueo", "rechazo"}
+
+class SearchScheduler:
+    """
+    Planificador adaptativo por URL de búsqueda (reemplaza el ciclo fijo de SEARCH_INTERVAL).
+
+    - Cada URL tiene su propio intervalo, entre SCHEDULE_MIN_INTERVAL y SCHEDULE_MAX_INTERVAL minutos.
+    - Tras cada pasada se estima la tasa de ofertas nuevas por hora (media móvil) y el intervalo
+      se ajusta para encontrar unas SCHEDULE_TARGET_NEW ofertas nuevas por pasada: las búsquedas
+      con mucho movimiento se revisan seguido y las que no traen nada se espacian.
+    - Una cola de prioridad (heapq) ordena las URLs por su próxima revisión.
+    - El estado se guarda en SCHEDULE_FILE (escritura atómica) y se retoma al reiniciar.
+    Las URLs se identifican por su texto: si cambia JOB_SEARCH_URLS, las nuevas arrancan con
+    SEARCH_INTERVAL y las que ya no están se olvidan.
+    'url_indexes' son las posiciones de las URLs en JOB_SEARCH_URLS (por defecto 0..n-1); en modo
+    shards cada proceso planifica solo su parte, conservando la numeración original.
+    """
+
+    def __init__(self, urls, url_indexes=None, path=SCHEDULE_FILE, min_interval=SCHEDULE_MIN_INTERVAL, max_interval=SCHEDULE_MAX_INTERVAL,
+                 target_new=SCHEDULE_TARGET_NEW, batch_window=SCHEDULE_BATCH_WINDOW, initial_interval=SEARCH_INTERVAL):
+        self.urls = list(urls)
+        self.url_indexes = list(url_indexes) if url_indexes is not None else list(range(len(self.urls)))
+        self.path = path
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.target_new = target_new
+        self.batch_window = batch_window
+        self.initial_interval = self._clamp(initial_interval)
+        self._lock = threading.Lock()
+        self.states = {}
+        self._heap = []
+        self._load()
+
+    def _clamp(self, minutes):
+        return max(self.min_interval, min(self.max_interval, minutes))
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as file_handler:
+                saved = json.load(file_handler)
+        except (OSError, ValueError):
+            saved = {}
+
+        now = time.time()
+        for url_index, url in zip(self.url_indexes, self.urls):
+            state = saved.get(url) or {}
+            self.states[url] = {
+                "interval": self._clamp(float(state.get("interval", self.initial_interval))),
+                "rate": float(state.get("rate", 0.0)),
+                "last_run": state.get("last_run"),
+                # Las URLs nuevas (o sin fecha) se revisan en el primer ciclo
+                "next_run": float(state.get("next_run", now)),
+            }
+            heapq.heappush(self._heap, (self.states[url]["next_run"], url_index, url))
+
+    def _persist(self):
+        """Guarda el estado de forma atómica (temporal + os.replace)."""
+        try:
+            temp_path = self.path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as file_handler:
+                json.dump(self.states, file_handler, indent=2)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"   ⚠️ No se pudo guardar la planificación: {e}")
+
+    def due_urls(self, now=None):
+        """
+        Saca de la cola las URLs que ya tocan (o tocan dentro de SCHEDULE_BATCH_WINDOW minutos,
+        para aprovechar el mismo navegador) y las retorna como pares (url_index, url).
+        Cada una debe volver a la cola con record_run().
+        """
+        now = time.time() if now is None else now
+        limit = now + self.batch_window * 60
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= limit:
+                _, url_index, url = heapq.heappop(self._heap)
+                due.append((url_index, url))
+        return sorted(due)
+
+    def seconds_until_next(self, now=None):
+        """Segundos hasta la próxima URL pendiente (0 si ya hay alguna vencida)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            if not self._heap:
+                return self.initial_interval * 60
+            return max(0.0, self._heap[0][0] - now)
+
+    def requeue(self, due, now=None):
+        """Devuelve a la cola, sin cambios, URLs que no se llegaron a recorrer (ej: Chrome no arrancó)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            for url_index, url in due:
+                heapq.heappush(self._heap, (now, url_index, url))
+
+    def record_run(self, due, url_reports, now=None):
+        """
+        Reprograma las URLs de un ciclo según lo que encontró cada una.
+        'url_reports' son los reportes por URL de los bots (url_index, stop_reason, new_jobs).
+        Las URLs sin reporte o con un corte anormal (ABNORMAL_STOP_REASONS) conservan su
+        intervalo y su tasa.
+        """
+        now = time.time() if now is None else now
+        reports = {report["url_index"]: report for report in url_reports}
+        with self._lock:
+            for url_index, url in due:
+                state = self.states[url]
+                report = reports.get(url_index)
+                if report is not None and report.get("stop_reason") not in ABNORMAL_STOP_REASONS:
+                    self._update_interval(state, report.get("new_jobs", 0), now)
+                state["next_run"] = now + state["interval"] * 60
+                heapq.heappush(self._heap, (state["next_run"], url_index, url))
+            self._persist()
+
+    def _update_interval(self, state, new_jobs, now):
+        last_run = state["last_run"]
+        state["last_run"] = now
+        if last_run is None:
+            # Primera pasada: no hay ventana de tiempo contra la cual medir las novedades
+            return
+
+        hours = max((now - last_run) / 3600, 1 / 60)
+        observed_rate = new_jobs / hours
+        state["rate"] = RATE_SMOOTHING * observed_rate + (1 - RATE_SMOOTHING) * state["rate"]
+
+        if new_jobs == 0 or state["rate"] <= 0:
+            state["interval"] = self._clamp(state["interval"] * EMPTY_RUN_BACKOFF)
+        else:
+            state["interval"] = self._clamp(self.target_new / state["rate"] * 60)
+
+    def describe(self):
+        """Texto con el intervalo y la próxima revisión de cada URL (consola)."""
+        lines = ["🗓️ Planificación por búsqueda:"]
+        with self._lock:
+            for url_index, url in zip(self.url_indexes, self.urls):
+                state = self.states[url]
+                next_run = time.strftime("%H:%M", time.localtime(state["next_run"]))
+                lines.append(
+                    f"   - #{url_index + 1}: cada {state['interval']:.0f} min "
+                    f"({state['rate']:.1f} nuevas/h), próxima {next_run}"
+                )
+        return "\n".join(lines)
@@ -0,0 +1,116 @@
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# El mismo archivo SQLite del historial: un único almacén compartido entre procesos
+STATE_DB_FILE = "seen_jobs.db"
+
+# Una reserva de otro shard bloquea la oferta este tiempo (luego puede volver a analizarse)
+CLAIM_TTL_SECONDS = 3600
+
+class StateStore:
+    """
+    Estado compartido entre los procesos del modo shards (SHARD_COUNT > 1), en SQLite.
+
+    - Valores JSON por clave (listas de keywords, offset de Telegram) con una versión que
+      aumenta en cada escritura, para detectar cambios de otros procesos sin releer el valor.
+    - Reservas de ofertas entre procesos (try_claim), para que dos shards no notifiquen
+      la misma oferta si aparece en URLs de ambos.
+    - transaction() toma el lock de escritura de SQLite (BEGIN IMMEDIATE): un leer-modificar-
+      escribir dentro del bloque es atómico también entre procesos.
+    La conexión se abre recién en el primer uso.
+    """
+
+    def __init__(self, path=STATE_DB_FILE):
+        self.path = path
+        self.connection = None
+        self._lock = threading.RLock()
+        self._depth = 0
+
+    def _connect(self):
+        if self.connection is None:
+            # isolation_level=None: las transacciones se abren a mano (BEGIN IMMEDIATE)
+            self.connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS shared_state (key TEXT PRIMARY KEY, value TEXT NOT NULL, version INTEGER NOT NULL)"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS job_claims (job_key TEXT PRIMARY KEY, shard INTEGER NOT NULL, claimed_at REAL NOT NULL)"
+            )
+            # La purga por TTL recorre solo las reservas vencidas
+            self.connection.execute("CREATE INDEX IF NOT EXISTS idx_job_claims_claimed_at ON job_claims (claimed_at)")
+        return self.connection
+
+    @contextmanager
+    def transaction(self):
+        """Bloque atómico entre hilos y procesos (anidable)."""
+        with self._lock:
+            connection = self._connect()
+            self._depth += 1
+            try:
+                if self._depth == 1:
+                    connection.execute("BEGIN IMMEDIATE")
+                yield connection
+                if self._depth == 1:
+                    connection.execute("COMMIT")
+            except BaseException:
+                if self._depth == 1:
+                    connection.execute("ROLLBACK")
+                raise
+            finally:
+                self._depth -= 1
+
+    def get(self, key, default=None):
+        with self._lock:
+            row = self._connect().execute("SELECT value FROM shared_state WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def version(self, key):
+        """Versión actual del valor (0 si no existe). Consulta barata para detectar cambios."""
+        with self._lock:
+            row = self._connect().execute("SELECT version FROM shared_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def set(self, key, value):
+        with self.transaction() as connection:
+            connection.execute(
+                "INSERT INTO shared_state (key, value, version) VALUES (?, ?, 1) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, version = version + 1",
+                (key, json.dumps(value, ensure_ascii=False)),
+            )
+
+    def try_claim(self, job_key, shard, blocked_states, ttl=CLAIM_TTL_SECONDS):
+        """
+        Reserva una oferta para este shard de forma atómica entre procesos.
+        Falla si el historial compartido ya la tiene en 'blocked_states' (notificada/archivada
+        por otro shard) o si otro shard la reservó hace menos de 'ttl' segundos.
+        """
+        now = time.time()
+        placeholders = ", ".join("?" for _ in blocked_states)
+        with self.transaction() as connection:
+            row = connection.execute(
+                f"SELECT 1 FROM seen_jobs WHERE job_key = ? AND state IN ({placeholders})",
+                (job_key, *blocked_states),
+            ).fetchone()
+            if row:
+                return False
+            row = connection.execute("SELECT shard, claimed_at FROM job_claims WHERE job_key = ?", (job_key,)).fetchone()
+            if row and row[0] != shard and now - row[1] < ttl:
+                return False
+            connection.execute(
+                "INSERT OR REPLACE INTO job_claims (job_key, shard, claimed_at) VALUES (?, ?, ?)",
+                (job_key, shard, now),
+            )
+            return True
+
+    def purge_claims(self, ttl=CLAIM_TTL_SECONDS):
+        """Borra las reservas vencidas."""
+        with self.transaction() as connection:
+            connection.execute("DELETE FROM job_claims WHERE claimed_at < ?", (time.time() - ttl,))
+
+# Instancia global para usar en todo el proyecto
+state_store = StateStore()
@@ -0,0 +1,123 @@
+import queue
+import threading
+import time
+from src.driver import DriverManager, clone_profile
+from src.notifications import outbox
+
+class SearchWorkerPool:
+    """
+    Reparte las URLs de búsqueda entre N navegadores que trabajan en paralelo.
+
+    - Cada worker tiene su propio Chrome (el worker 0 usa el perfil principal,
+      el resto un clon en profile_clones/) y su propio LinkedInBot. Los navegadores
+      se mantienen vivos entre ciclos con un DriverManager por worker.
+    - Todos toman URLs de una misma cola, y comparten el historial global
+      (src/history.py) y el canal de notificaciones de Telegram.
+    - El corte por bajo rendimiento (3 páginas seguidas con pocas ofertas) aplica
+      por worker: ese worker deja de tomar URLs y el resto sigue con la cola.
+    """
+
+    def __init__(self, worker_count):
+        self.worker_count = worker_count
+        self.url_queue = queue.Queue()
+        self.stop_requested = threading.Event()
+        self.results = []
+        self._results_lock = threading.Lock()
+        self.driver_managers = {}
+
+    def _get_driver_manager(self, worker_index):
+        """DriverManager persistente del worker (el perfil se clona solo la primera vez)."""
+        if worker_index not in self.driver_managers:
+            profile_dir = None if worker_index == 0 else clone_profile(f"worker_{worker_index}")
+            self.driver_managers[worker_index] = DriverManager(profile_dir=profile_dir)
+        return self.driver_managers[worker_index]
+
+    def shutdown(self):
+        """Cierra los navegadores de todos los workers."""
+        for driver_manager in self.driver_managers.values():
+            driver_manager.quit()
+        self.driver_managers = {}
+
+    def run(self, urls, url_indexes=None):
+        """
+        Procesa todas las URLs y bloquea hasta que los workers terminan.
+        'url_indexes' conserva la numeración de JOB_SEARCH_URLS (ver LinkedInBot.search).
+        """
+        self.results = []
+        if url_indexes is None:
+            url_indexes = range(len(urls))
+        for url_index, base_url in zip(url_indexes, urls):
+            self.url_queue.put((url_index, base_url))
+
+        worker_count = min(self.worker_count, len(urls)) or 1
+        print(f"👷 Iniciando {worker_count} workers para {len(urls)} búsquedas...")
+        start_time = time.perf_counter()
+
+        threads = []
+        for worker_index in range(worker_count):
+            thread = threading.Thread(
+                target=self._worker_loop, args=(worker_index,), name=f"worker-{worker_index}", daemon=True
+            )
+            thread.start()
+            threads.append(thread)
+
+        for thread in threads:
+            thread.join()
+
+        elapsed = time.perf_counter() - start_time
+        total_cards = sum(result["cards"] for result in self.results)
+        print(f"👷 Workers terminados en {elapsed:.0f}s. Ofertas analizadas: {total_cards}")
+
+        # --- DIAGNÓSTICO DE SESIÓN (sobre el total de todos los workers) ---
+        if total_cards < 10 and not self.stop_requested.is_set():
+            outbox.enqueue(
+                f"⚠️ <b>POSIBLE SESIÓN CERRADA</b>\n"
+                f"Solo encontré <b>{total_cards} ofertas</b> en total entre {worker_count} workers.\n"
+                f"Por favor entra al servidor y verifica si LinkedIn pide login o captcha."
+            )
+
+        # Un '/stop' recibido por Telegram dentro de un worker solo cierra ese hilo:
+        # lo propagamos al hilo principal para apagar el bot como siempre.
+        if self.stop_requested.is_set():
+            raise SystemExit(0)
+        return self.results
+
+    def _worker_loop(self, worker_index):
+        from src.linkedin import LinkedInBot
+
+        driver_manager = None
+        bot = None
+        try:
+            driver_manager = self._get_driver_manager(worker_index)
+            bot = LinkedInBot(driver_manager.acquire(), driver_manager=driver_manager)
+            bot.login()
+            bot.start_run()
+
+            while not self.stop_requested.is_set():
+                try:
+                    url_index, base_url = self.url_queue.get_nowait()
+                except queue.Empty:
+                    break
+
+                if not bot.search_url(url_index, base_url):
+                    print(f"   🚨 [worker-{worker_index}] Posible sesión caída. Este worker deja de tomar URLs.")
+                    bot.aborted = True
+                    break
+
+        except SystemExit:
+            self.stop_requested.set()
+        except Exception as e:
+            print(f"❌ [worker-{worker_index}] Error: {e}")
+        finally:
+            if bot is not None:
+                # Mismo cierre que la corrida con un solo navegador (sin el aviso de sesión: lo da el pool)
+                bot.print_run_summary()
+                with self._results_lock:
+                    self.results.append({
+                        "worker": worker_index,
+                        "cards": getattr(bot, "total_cards_seen", 0),
+                        "aborted": getattr(bot, "aborted", False),
+                        "url_reports": getattr(bot, "url_reports", []),
+                    })
+            if driver_manager:
+                driver_manager.release()